@@ -4,6 +4,8 @@ from sanic import __version__
 from sys import version_info
 from pymysql import IntegrityError
 from subprocess import CalledProcessError
+from asyncio import create_subprocess_exec
+from socket import gethostname
 from .. import moca_modules as mzk
 from .. import core
 
@@ -278,4 +280,72 @@ def keep_update_tweets(interval: int) -> None:
         shell=True
     )
 
+
+def __get_ingest_queue() -> mzk.MocaStreamQueue:
+    redis = mzk.MocaRedis(
+        core.DB_CONFIG['redis']['host'],
+        int(core.DB_CONFIG['redis']['port']),
+        int(core.DB_CONFIG['redis']['db']),
+        core.DB_CONFIG['redis']['password'],
+        codec=mzk.get_codec(**core.DB_CONFIG['redis'].get('codec', {})),
+        nodes=core.DB_CONFIG['redis'].get('nodes', []),
+    )
+    redis.prefix = core.DB_CONFIG['redis']['prefix']
+    return mzk.MocaStreamQueue(redis, 'ingest-tweets', **core.DB_CONFIG.get('ingest_queue', {}))
+
+
+@console.command('enqueue-tweets')
+def enqueue_tweets(interval: int = 0) -> None:
+    """Add ingest jobs for all accounts in configs/screen_name.json, the accounts already in the queue are skipped."""
+    queue = __get_ingest_queue()
+
+    async def __enqueue() -> None:
+        await queue.create_group()
+        for screen_name in mzk.load_json_from_file(core.CONFIG_DIR.joinpath('screen_name.json')):
+            if await queue.enqueue(screen_name.lower(), screen_name) is None:
+                mzk.tsecho(f"Already in the queue -- {screen_name}", fg=mzk.tcolors.YELLOW)
+            else:
+                mzk.tsecho(f"Enqueued -- {screen_name}", fg=mzk.tcolors.GREEN)
+
+    while True:
+        mzk.run(__enqueue())
+        if interval <= 0:
+            break
+        mzk.sleep(interval)
+
+
+@console.command('ingest-worker')
+def ingest_worker(consumer: str = '', interval: int = 60) -> None:
+    """Consume the ingest jobs and save the tweets to database. run this command on any number of nodes."""
+    queue = __get_ingest_queue()
+    consumer = consumer or f'{gethostname()}-{mzk.get_my_pid()}'
+    mzk.set_process_name(f'MocaTwitterUtils({core.VERSION}) -- ingest-worker({consumer})')
+
+    async def __save_tweets(_: str, screen_name: str) -> None:
+        process = await create_subprocess_exec(
+            mzk.executable, str(core.TOP_DIR.joinpath('moca.py')), 'save-tweets', screen_name
+        )
+        if await process.wait() != 0:
+            mzk.tsecho(f"Update tweets failed -- {screen_name}", fg=mzk.tcolors.RED)
+            raise RuntimeError(f'save-tweets failed. <{screen_name}>')
+        mzk.tsecho(f"Update tweets successfully -- {screen_name}", fg=mzk.tcolors.GREEN)
+        await mzk.aio_sleep(interval)  # keep the request rate of twitter api.
+
+    mzk.run(queue.consume(consumer, __save_tweets))
+
+
+@console.command('show-dead-tweets-jobs')
+def show_dead_tweets_jobs(requeue: bool = False) -> None:
+    """Show the ingest jobs failed too many times."""
+    queue = __get_ingest_queue()
+
+    async def __show() -> None:
+        for message_id, job_id, data, reason in await queue.get_dead_letters():
+            mzk.tsecho(f"{message_id} -- {data}", fg=mzk.tcolors.RED)
+            mzk.tsecho(reason)
+        if requeue:
+            mzk.tsecho(f"Requeued {await queue.requeue_dead_letters()} jobs.", fg=mzk.tcolors.GREEN)
+
+    mzk.run(__show())
+
 # -------------------------------------------------------------------------- Console --
@@ -62,5 +62,8 @@ COUNT_TWEETS_QUERY = mzk.get_str_from_file(Path(__file__).parent.joinpath('count
 SCREEN_NAME_TO_ID_QUERY = mzk.get_str_from_file(Path(__file__).parent.joinpath('screen_name_to_id.sql')).replace(
     '[el]#moca_prefix#', DB_CONFIG['mysql']['prefix']
 )
+TWEETS_STATE_QUERY = mzk.get_str_from_file(Path(__file__).parent.joinpath('tweets_state.sql')).replace(
+    '[el]#moca_prefix#', DB_CONFIG['mysql']['prefix']
+)
 
 # -------------------------------------------------------------------------- Variables --
@@ -0,0 +1 @@
+select SQL_NO_CACHE max(tweet_id), count(1) from `[el]#moca_prefix#tweets` where user_id = %s;
\ No newline at end of file
@@ -61,7 +61,8 @@ tzlocal
 
 if __config.__LOAD_FILE__:
     from .moca_file import (
-        MocaDirectoryCache, MocaFileAppendController, MocaFileCacheController, MocaSynchronizedBinaryFile,
+        MocaDirectoryCache, MocaContentStore, MocaFileAppendController, MocaFileCacheController,
+        MocaSynchronizedBinaryFile,
         MocaSynchronizedJSONDictFile, MocaSynchronizedJSONFile, MocaSynchronizedJSONListFile, MocaSynchronizedTextFile,
         MocaWriteFileController, MocaWriteEncryptedFileController, get_str_from_file, get_str_from_file_with_cache,
         aio_get_str_from_file, aio_get_str_from_file_with_cache, get_mime_type, get_mime_type_with_cache, get_timestamp,
@@ -103,13 +104,14 @@ python-magic
 
 if __config.__LOAD_LOG__:
     from .moca_log import (
-        LogLevel, MocaFileLog, MocaAsyncFileLog
+        LogLevel, MocaFileLog, MocaAsyncFileLog, MocaEventAggregator
     )
 
 """
 This is a simple logging module.
 MocaFileLog can write logs in other thread, to return the response more quickly.
 MocaAsyncFileLog can write logs use asyncio.
+MocaEventAggregator can aggregate and sample the repeated events before writing them to a log.
 
 Requirements
 ------------
@@ -137,7 +139,10 @@ None
 # -- moca_redis --------------------------------------------------------------------------
 
 if __config.__LOAD_REDIS__:
-    from .moca_redis import MocaRedis, test_redis_connection
+    from .moca_redis import (
+        MocaRedis, MocaRedisPipeline, MocaHashRing, MocaRateLimiter, MocaRequestCounter, MocaStreamQueue,
+        test_redis_connection,
+    )
 
 """
 This module is a redis client.
@@ -148,6 +153,8 @@ redis
     The Python interface to the Redis key-value store.
 aioredis
     asyncio (PEP 3156) Redis client library.
+limits
+    Rate limiting utilities
 """
 
 # -------------------------------------------------------------------------- moca_redis --
@@ -211,8 +218,13 @@ if __config.__LOAD_UTILS__:
         try_to_obj, parser_str, en_faker, jp_faker, zh_faker, validate_argument, is_file, is_dir, get_text_from_url,
         aio_get_text_from_url, print_table, remove_extension, all_ascii, all_alnum, all_alpha, all_numeric,
         have_alnum, have_alpha, have_ascii, have_numeric, create_tor_deny_config_for_nginx, pm, pl, resize_img,
+        get_img_format, is_img_format_supported, save_resized_img,
         get_my_public_ip, get_my_public_ip_v6, get_my_public_ip_v4, update_use_github, update_moca_modules
     )
+    from .moca_utils import (
+        MocaCodec, DEFAULT_CODEC, get_codec, register_serializer, register_compressor, get_serializers,
+        get_compressors
+    )
     from .moca_utils import (  # The functions in this file, Only supports CentOS 8 and RHEL 8.
         get_centos_cpu_info, get_centos_cpu_model_name, get_centos_cpu_vendor_id, get_centos_cpu_cores,
         get_centos_cpu_cache_size, get_centos_cpu_mhz, get_centos_ssh_login_log, get_centos_accepted_ssh_login_log,
@@ -262,6 +274,14 @@ prettytable
     A simple Python library for easily displaying tabular data in a visually appealing ASCII table format
 Pillow
     The friendly PIL fork (Python Imaging Library)
+pillow-avif-plugin
+    A pillow plugin that adds avif support (optional)
+orjson
+    Fast, correct Python JSON library supporting dataclasses, datetimes, and numpy (optional codec)
+msgpack
+    MessagePack serializer (optional codec)
+brotli
+    Brotli compression format (optional codec)
 """
 
 # -------------------------------------------------------------------------- moca_utils --
@@ -468,6 +488,8 @@ brotli
     Brotli compression format
 sympy
     A computer algebra system written in pure Python
+aioredis
+    asyncio (PEP 3156) Redis client library.
 """
 
 # -------------------------------------------------------------------------- moca_dev --
@@ -475,7 +497,7 @@ sympy
 # -- moca_cache --------------------------------------------------------------------------
 
 if __config.__LOAD_CACHE__:
-    from .moca_cache import MocaSimpleCache
+    from .moca_cache import MocaSimpleCache, MocaLRUCache
 
 """
 A simple in-memory cache.
@@ -575,7 +597,8 @@ plyvel
 
 if __config.__LOAD_SANIC__:
     from .moca_sanic import (
-        MocaSanic, get_remote_address, get_args, write_cookie
+        MocaSanic, MocaAPIKeyTable, MocaAPIKey, MocaPrefixTrie, MocaRequestArgs, get_remote_address, get_args,
+        write_cookie,
     )
 
 """
@@ -627,6 +650,35 @@ tweepy
 
 # -------------------------------------------------------------------------- moca_twitter --
 
+# -- moca_http --------------------------------------------------------------------------
+
+if __config.__LOAD_HTTP__:
+    from .moca_http import MocaDownloader
+
+"""
+This module is a http client with a pooled keep-alive session.
+
+Requirements
+------------
+aiohttp
+    Async http client/server framework (asyncio)
+aiofiles
+    File support for asyncio.
+"""
+
+# -------------------------------------------------------------------------- moca_http --
+
+# -- moca_ip --------------------------------------------------------------------------
+
+if __config.__LOAD_IP__:
+    from .moca_ip import MocaIPSet, MocaIPBlacklist
+
+"""
+This module provides the ip address sets and the ip blacklist that support networks (CIDR) and expiry times.
+"""
+
+# -------------------------------------------------------------------------- moca_ip --
+
 # -- moca_bot --------------------------------------------------------------------------
 
 if __config.__LOAD_MOCA_BOT__:
@@ -0,0 +1,127 @@
+# -- Imports --------------------------------------------------------------------------
+
+from typing import (
+    Any, Dict, Hashable
+)
+from collections import OrderedDict
+from sys import getsizeof
+
+# -------------------------------------------------------------------------- Imports --
+
+# -- MocaLRUCache --------------------------------------------------------------------------
+
+
+class MocaLRUCache:
+    """
+    A least recently used cache with a memory budget.
+    When the cache is full, the data that has not been used for the longest time is removed first.
+    The size of bytes and str is the length of the data, the other objects are measured by sys.getsizeof.
+
+    Attributes
+    ----------
+    self._storage: OrderedDict
+        the cache storage, the most recently used data is at the end.
+    self._max_items: int
+        the maximum number of the data.
+    self._max_bytes: int
+        the maximum size (bytes) of all data, 0 means unlimited.
+    self._max_item_bytes: int
+        the data bigger than this size (bytes) is not cached, 0 means unlimited.
+    self._sizes: Dict[Hashable, int]
+        the size of each data.
+    self._current_bytes: int
+        the size of all data.
+    self._hits: int
+        the number of the cache hits.
+    self._misses: int
+        the number of the cache misses.
+    """
+
+    def __init__(self, max_items: int = 10000, max_bytes: int = 0, max_item_bytes: int = 0):
+        """
+        :param max_items: the maximum number of the data.
+        :param max_bytes: the maximum size (bytes) of all data, 0 means unlimited.
+        :param max_item_bytes: the data bigger than this size (bytes) is not cached, 0 means unlimited.
+        """
+        self._storage: OrderedDict = OrderedDict()
+        self._max_items: int = max_items
+        self._max_bytes: int = max_bytes
+        self._max_item_bytes: int = max_item_bytes
+        self._sizes: Dict[Hashable, int] = {}
+        self._current_bytes: int = 0
+        self._hits: int = 0
+        self._misses: int = 0
+
+    def __len__(self) -> int:
+        return len(self._storage)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._storage
+
+    @staticmethod
+    def get_size(value: Any) -> int:
+        return len(value) if isinstance(value, (bytes, bytearray, str)) else getsizeof(value)
+
+    def can_cache(self, size: int) -> bool:
+        """Can the data of this size be cached."""
+        return (self._max_item_bytes == 0 or size <= self._max_item_bytes) and \
+               (self._max_bytes == 0 or size <= self._max_bytes)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get the data, and mark it as the most recently used."""
+        try:
+            self._storage.move_to_end(key)
+            self._hits += 1
+            return self._storage[key]
+        except KeyError:
+            self._misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> bool:
+        """
+        Add the data, the least recently used data is removed if the cache is full.
+        :return: if the data is too big to cache, return False.
+        """
+        size = self.get_size(value)
+        if not self.can_cache(size):
+            return False
+        self.remove_cache(key)
+        while len(self._storage) > 0 and (
+                len(self._storage) >= self._max_items or
+                (self._max_bytes > 0 and self._current_bytes + size > self._max_bytes)
+        ):
+            self.remove_cache(next(iter(self._storage)))
+        self._storage[key] = value
+        self._sizes[key] = size
+        self._current_bytes += size
+        return True
+
+    def remove_cache(self, key: Hashable) -> None:
+        try:
+            del self._storage[key]
+            self._current_bytes -= self._sizes.pop(key, 0)
+        except KeyError:
+            pass
+
+    def clear_all(self) -> None:
+        self._storage.clear()
+        self._sizes.clear()
+        self._current_bytes = 0
+
+    @property
+    def current_bytes(self) -> int:
+        return self._current_bytes
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Return the statistics of this instance"""
+        return {
+            'entries': len(self._storage),
+            'bytes': self._current_bytes,
+            'max_items': self._max_items,
+            'max_bytes': self._max_bytes,
+            'hits': self._hits,
+            'misses': self._misses,
+        }
+
+# -------------------------------------------------------------------------- MocaLRUCache --
@@ -1,21 +1,39 @@
 # -- Imports --------------------------------------------------------------------------
 
 from typing import (
-    Optional, Any, Union
+    Optional, Any, Union, Dict, Set, List, Tuple, Iterator, BinaryIO
 )
 from pathlib import Path
+from collections import OrderedDict
+from asyncio import get_running_loop
 from gc import collect
+from sys import getsizeof
 from threading import Thread
 from time import sleep
+from struct import Struct, error as StructError
+from mmap import mmap, ACCESS_READ
+from os import replace, fstat, stat
+from pickle import UnpicklingError
 try:
-    from cloudpickle import dump, load
+    from cloudpickle import dump, load, dumps
 except (ImportError, ModuleNotFoundError):
-    from pickle import dump, load
+    from pickle import dump, load, dumps
+from pickle import loads
+try:
+    from fcntl import flock, LOCK_EX, LOCK_SH, LOCK_UN
+except (ImportError, ModuleNotFoundError):
+    flock = None  # windows, the snapshot file will not be locked.
 
 # -------------------------------------------------------------------------- Imports --
 
 # -- Variables --------------------------------------------------------------------------
 
+_SNAPSHOT_MAGIC: bytes = b'MSC1'
+_SNAPSHOT_RECORD: Struct = Struct('<BII')  # operation, key length, value length
+_SNAPSHOT_SET: int = 1
+_SNAPSHOT_DELETE: int = 2
+_MISSING = object()
+
 # -------------------------------------------------------------------------- Variables --
 
 # -- MocaSimpleCache --------------------------------------------------------------------------
@@ -27,17 +45,23 @@ class MocaSimpleCache:
     This is the first in first out cache module developed by el.ideal-ideas for Moca System.
     The pool-size is the maximum number of cache.
     System will remove old cache (one page) from memory when the cache is full.
+    If max-bytes is set, system will also remove old cache until the approximate size of all cache fits in it.
     And you can save the cache to file, or load from file manually.
+    The snapshot file only appends the changes since the last snapshot, and will be loaded use mmap.
     -- 日本語 --------------------------------------------------------------------------
     これはモカシステムのためにel.ideal-ideasによって開発された先入れ先出しのキャッシュモジュールである。
     プールサイズは保存できるキャッシュの総数です。
     キャッシュがいっぱいになると、古いものから1ページ分削除されます。
+    max-bytesが設定されている場合、キャッシュの推定サイズがその値に収まるまで古いものから削除されます。
     手動でキャッシュをファイルに保存したり、ファイルから読み込んだりすることも出来ます。
+    スナップショットファイルには前回からの変更分だけが追記され、読み込みにはmmapが使われます。
     -- 中文 --------------------------------------------------------------------------
     这是el.ideal-ideas为茉客系统开发的先入先出的缓存模块。
     pool-size的值是可以保存的缓存数量的上限。
     如果缓存到达上限，系统会从旧的缓存开始删除一页(page-size)的缓存。
+    如果设置了max-bytes，系统会从旧的缓存开始删除，直到缓存的估计大小不超过max-bytes。
     您也可以手动把缓存保存到文件，或者从文件读取缓存。
+    快照文件只会追加上次保存以后的变更，读取时使用mmap。
 
     Attributes
     ----------
@@ -47,10 +71,19 @@ class MocaSimpleCache:
         the cache pool size of this instance.
     _page_size: int
         the cache page size of this instance.
+    _max_bytes: int
+        the maximum approximate size (bytes) of all cache, 0 means unlimited.
+    _sizes: Dict[str, int]
+        the approximate size of each cache.
+    _current_bytes: int
+        the approximate size of all cache.
     _timer: float
         the auto clear timer.
     _timer_thread: Optional[Thread]
         the timer thread.
+    _changed: Optional[Set[str]]
+        the keys set or removed since the last snapshot, None means the next snapshot must contain all cache.
+        the keys removed to free space are not recorded, because other processes may still have them.
     """
 
     DEFAULT_POOL_SIZE: int = 10000
@@ -59,11 +92,13 @@ class MocaSimpleCache:
     def __init__(
             self,
             pool_size: Optional[int] = None,
-            page_size: Optional[int] = None
+            page_size: Optional[int] = None,
+            max_bytes: Optional[int] = None
     ):
         """
         :param pool_size: The pool size of this instance.
         :param page_size: The page size of this instance.
+        :param max_bytes: The maximum approximate size (bytes) of all cache. None or 0 means unlimited.
         """
         # set cache storage
         self._storage: dict = {}
@@ -71,9 +106,15 @@ class MocaSimpleCache:
         self._pool_size: int = pool_size if pool_size is not None else self.DEFAULT_POOL_SIZE
         # set page size
         self._page_size: int = page_size if page_size is not None else self.DEFAULT_PAGE_SIZE
+        # set memory budget
+        self._max_bytes: int = max_bytes if max_bytes is not None else 0
+        self._sizes: Dict[str, int] = {}
+        self._current_bytes: int = 0
         # initialize timer variable
         self._timer: float = -1
         self._timer_thread: Optional[Thread] = None
+        # initialize snapshot variable
+        self._changed: Optional[Set[str]] = None
 
     # ----------------------------------------------------------------------------
     # ----------------------------------------------------------------------------
@@ -83,15 +124,48 @@ class MocaSimpleCache:
         """remove old data in self._storage"""
         # remove old keys
         for key in list(self._storage.keys())[:limit]:
-            try:
-                del self._storage[key]
-            except KeyError:
-                pass
+            self._evict(key)
         collect()
 
     # ----------------------------------------------------------------------------
     # ----------------------------------------------------------------------------
 
+    def _remove_until_fits(self, size: int) -> None:
+        """remove old data in self._storage until the new data (size bytes) fits the memory budget."""
+        while len(self._storage) > 0 and self._current_bytes + size > self._max_bytes:
+            self._evict(next(iter(self._storage)))
+
+    # ----------------------------------------------------------------------------
+    # ----------------------------------------------------------------------------
+
+    def _evict(self, key: str) -> None:
+        """remove the data to free space, the snapshot file will not record it as removed."""
+        try:
+            del self._storage[key]
+            self._current_bytes -= self._sizes.pop(key, 0)
+            if self._changed is not None:
+                self._changed.discard(key)
+        except KeyError:
+            pass
+
+    # ----------------------------------------------------------------------------
+    # ----------------------------------------------------------------------------
+
+    @staticmethod
+    def get_size(value: Any) -> int:
+        """Return the approximate size (bytes) of the value, the items in dict, list, tuple and set are counted."""
+        size = getsizeof(value)
+        if isinstance(value, dict):
+            for key, item in value.items():
+                size += MocaSimpleCache.get_size(key) + MocaSimpleCache.get_size(item)
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            for item in value:
+                size += MocaSimpleCache.get_size(item)
+        return size
+
+    # ----------------------------------------------------------------------------
+    # ----------------------------------------------------------------------------
+
     def start_auto_clear_timer(self, seconds: float) -> None:
         """Set a timer to clear storage automatically."""
 
@@ -103,7 +177,7 @@ class MocaSimpleCache:
                         sleep(1)
                     else:
                         sleep(instance._timer)
-                        instance._storage.clear()
+                        instance.clear_all()
 
             self._timer_thread = Thread(target=__timer, args=(self,))
             self._timer_thread.start()
@@ -122,11 +196,24 @@ class MocaSimpleCache:
             key: str,
             value: Any) -> None:
         """Add a cache"""
+        # remove the old value
+        if key in self._storage:
+            self.remove_cache(key)
         # check storage size
         if len(self._storage) >= self._pool_size:
             self.remove_old_data(self._page_size)
+        # check memory budget
+        if self._max_bytes > 0:
+            size = self.get_size(value)
+            if size > self._max_bytes:
+                return None  # too large to cache.
+            self._remove_until_fits(size)
+            self._sizes[key] = size
+            self._current_bytes += size
         # save value
         self._storage[key] = value
+        if self._changed is not None:
+            self._changed.add(key)
 
     # ----------------------------------------------------------------------------
     # ----------------------------------------------------------------------------
@@ -159,6 +246,9 @@ class MocaSimpleCache:
         """Remove data from cache"""
         try:
             del self._storage[key]
+            self._current_bytes -= self._sizes.pop(key, 0)
+            if self._changed is not None:
+                self._changed.add(key)
         except KeyError:
             pass
 
@@ -173,6 +263,36 @@ class MocaSimpleCache:
     # ----------------------------------------------------------------------------
     # ----------------------------------------------------------------------------
 
+    @property
+    def current_bytes(self) -> int:
+        """Return the approximate size (bytes) of all cache"""
+        return self._current_bytes
+
+    # ----------------------------------------------------------------------------
+    # ----------------------------------------------------------------------------
+
+    @property
+    def max_bytes(self) -> int:
+        """Return the memory budget, 0 means unlimited"""
+        return self._max_bytes
+
+    # ----------------------------------------------------------------------------
+    # ----------------------------------------------------------------------------
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Return the statistics of this instance"""
+        return {
+            'entries': len(self._storage),
+            'bytes': self._current_bytes,
+            'max_bytes': self._max_bytes,
+            'pool_size': self._pool_size,
+            'page_size': self._page_size,
+        }
+
+    # ----------------------------------------------------------------------------
+    # ----------------------------------------------------------------------------
+
     @property
     def pool_size(self) -> int:
         """Return the pool size"""
@@ -205,9 +325,28 @@ class MocaSimpleCache:
     # ----------------------------------------------------------------------------
     # ----------------------------------------------------------------------------
 
+    def change_max_bytes(self,
+                         size: int) -> None:
+        """Change the memory budget, and start counting the size of cache if necessary"""
+        if size > 0 and self._max_bytes <= 0:
+            self._sizes = {key: self.get_size(value) for key, value in self._storage.items()}
+            self._current_bytes = sum(self._sizes.values())
+        elif size <= 0:
+            self._sizes = {}
+            self._current_bytes = 0
+        self._max_bytes = size
+        if size > 0:
+            self._remove_until_fits(0)
+
+    # ----------------------------------------------------------------------------
+    # ----------------------------------------------------------------------------
+
     def clear_all(self) -> None:
         """Clear all cache"""
         self._storage = {}
+        self._sizes = {}
+        self._current_bytes = 0
+        self._changed = None
 
     # ----------------------------------------------------------------------------
     # ----------------------------------------------------------------------------
@@ -239,6 +378,9 @@ class MocaSimpleCache:
         try:
             with open(str(filename), mode='rb') as cache_file:
                 self._storage = load(cache_file)
+            if self._max_bytes > 0:
+                max_bytes, self._max_bytes = self._max_bytes, 0
+                self.change_max_bytes(max_bytes)
             return True
         except (FileNotFoundError, PermissionError, OSError):
             return False
@@ -246,4 +388,182 @@ class MocaSimpleCache:
     # ----------------------------------------------------------------------------
     # ----------------------------------------------------------------------------
 
+    @staticmethod
+    def _write_record(file: BinaryIO, key: str, value: Any) -> None:
+        """Write a snapshot record, if the value is _MISSING write a delete record."""
+        raw_key = key.encode()
+        if value is _MISSING:
+            file.write(_SNAPSHOT_RECORD.pack(_SNAPSHOT_DELETE, len(raw_key), 0) + raw_key)
+        else:
+            MocaSimpleCache._write_raw_record(file, raw_key, dumps(value))
+
+    @staticmethod
+    def _write_raw_record(file: BinaryIO, raw_key: bytes, raw_value: bytes) -> None:
+        file.write(_SNAPSHOT_RECORD.pack(_SNAPSHOT_SET, len(raw_key), len(raw_value)) + raw_key + raw_value)
+
+    @staticmethod
+    def _iter_records(data: Union[bytes, mmap]) -> Iterator[Tuple[int, bytes, bytes, int]]:
+        """
+        Read the records in the snapshot data.
+        :return: (operation, key, value, the end position of the record), the broken record at the end is ignored.
+        """
+        position = len(_SNAPSHOT_MAGIC)
+        while position + _SNAPSHOT_RECORD.size <= len(data):
+            operation, key_length, value_length = _SNAPSHOT_RECORD.unpack_from(data, position)
+            position += _SNAPSHOT_RECORD.size
+            if position + key_length + value_length > len(data):
+                break
+            key = data[position:position + key_length]
+            position += key_length
+            value = data[position:position + value_length]
+            position += value_length
+            yield operation, key, value, position
+
+    # ----------------------------------------------------------------------------
+    # ----------------------------------------------------------------------------
+
+    def take_snapshot(self) -> Tuple[bool, List[Tuple[str, Any]]]:
+        """
+        Copy the changes since the last snapshot, call it on the thread that updates the cache.
+        The result can be written by write_snapshot on any thread.
+        :return: (the records contain all cache, [(key, value or _MISSING), ...])
+        """
+        changed, self._changed = self._changed, set()
+        if changed is None:
+            return True, list(self._storage.items())
+        return False, [(key, self._storage.get(key, _MISSING)) for key in changed]
+
+    # ----------------------------------------------------------------------------
+    # ----------------------------------------------------------------------------
+
+    def write_snapshot(self,
+                       filename: Union[Path, str],
+                       full: bool,
+                       records: List[Tuple[str, Any]],
+                       compact_size: int = 64 * 1024 * 1024) -> bool:
+        """
+        Write the records taken by take_snapshot to the snapshot file.
+        The records are appended to the file. The file is compacted when it is empty, larger than compact_size,
+        or the records contain all cache.
+        The compaction merges the file and the records, the data saved by the other processes is kept,
+        only the newest pool_size records are left.
+        The file is locked while writing, so many processes can share one snapshot file.
+        :param filename: file path of the snapshot file.
+        :param full: the records contain all cache.
+        :param records: the records taken by take_snapshot.
+        :param compact_size: compact the snapshot file when it is larger than this size (bytes).
+        :return: status, [success] or [failed]
+        """
+        filename = str(filename)
+        try:
+            with open(filename, mode='ab') as snapshot_file:
+                if flock is not None:
+                    flock(snapshot_file.fileno(), LOCK_EX)
+                    if fstat(snapshot_file.fileno()).st_ino != stat(filename).st_ino:
+                        # another process has rewritten the file.
+                        flock(snapshot_file.fileno(), LOCK_UN)
+                        return self.write_snapshot(filename, full, records, compact_size)
+                size = snapshot_file.tell()
+                if full or size == 0 or size > compact_size:
+                    merged: OrderedDict = OrderedDict()
+                    if size > 0:
+                        with open(filename, mode='rb') as old_file:
+                            data = old_file.read()
+                        if data[:len(_SNAPSHOT_MAGIC)] == _SNAPSHOT_MAGIC:
+                            for operation, raw_key, raw_value, _ in self._iter_records(data):
+                                merged.pop(raw_key, None)
+                                if operation == _SNAPSHOT_SET:
+                                    merged[raw_key] = raw_value
+                    for key, value in records:
+                        raw_key = key.encode()
+                        merged.pop(raw_key, None)
+                        if value is not _MISSING:
+                            merged[raw_key] = dumps(value)
+                    while len(merged) > self._pool_size:
+                        merged.popitem(last=False)
+                    with open(filename + '.tmp', mode='wb') as tmp_file:
+                        tmp_file.write(_SNAPSHOT_MAGIC)
+                        for raw_key, raw_value in merged.items():
+                            self._write_raw_record(tmp_file, raw_key, raw_value)
+                    replace(filename + '.tmp', filename)
+                else:
+                    for key, value in records:
+                        self._write_record(snapshot_file, key, value)
+                    snapshot_file.flush()
+                if flock is not None:
+                    flock(snapshot_file.fileno(), LOCK_UN)
+            return True
+        except (PermissionError, OSError):
+            return False
+
+    # ----------------------------------------------------------------------------
+    # ----------------------------------------------------------------------------
+
+    def save_snapshot(self,
+                      filename: Union[Path, str],
+                      compact_size: int = 64 * 1024 * 1024) -> bool:
+        """
+        Save the changes since the last snapshot to the snapshot file. (take_snapshot and write_snapshot)
+        Call it on the thread that updates the cache, use aio_save_snapshot in the event loop.
+        :param filename: file path of the snapshot file.
+        :param compact_size: compact the snapshot file when it is larger than this size (bytes).
+        :return: status, [success] or [failed]
+        """
+        if self.write_snapshot(filename, *self.take_snapshot(), compact_size):
+            return True
+        self._changed = None  # rewrite all cache next time.
+        return False
+
+    # ----------------------------------------------------------------------------
+    # ----------------------------------------------------------------------------
+
+    async def aio_save_snapshot(self,
+                                filename: Union[Path, str],
+                                compact_size: int = 64 * 1024 * 1024) -> bool:
+        """
+        Copy the changes in the event loop, and write them to the snapshot file in the default executor.
+        :param filename: file path of the snapshot file.
+        :param compact_size: compact the snapshot file when it is larger than this size (bytes).
+        :return: status, [success] or [failed]
+        """
+        full, records = self.take_snapshot()
+        if await get_running_loop().run_in_executor(None, self.write_snapshot, filename, full, records, compact_size):
+            return True
+        self._changed = None  # rewrite all cache next time.
+        return False
+
+    # ----------------------------------------------------------------------------
+    # ----------------------------------------------------------------------------
+
+    def load_snapshot(self,
+                      filename: Union[Path, str]) -> bool:
+        """
+        Load the cache from the snapshot file use mmap, and start recording changes for save_snapshot.
+        The broken record at the end of file (the process was killed while writing) will be ignored,
+        and the next snapshot will rewrite the file.
+        :param filename: file path of the snapshot file.
+        :return: status, [success] or [failed]
+        """
+        try:
+            with open(str(filename), mode='rb') as snapshot_file:
+                if flock is not None:
+                    flock(snapshot_file.fileno(), LOCK_SH)
+                with mmap(snapshot_file.fileno(), 0, access=ACCESS_READ) as data:
+                    if data[:len(_SNAPSHOT_MAGIC)] != _SNAPSHOT_MAGIC:
+                        return False
+                    position = len(_SNAPSHOT_MAGIC)
+                    for operation, raw_key, raw_value, position in self._iter_records(data):
+                        if operation == _SNAPSHOT_SET:
+                            self.set(raw_key.decode(), loads(raw_value))
+                        else:
+                            self.remove_cache(raw_key.decode())
+                    broken = position != len(data)
+            self._changed = None if broken else set()
+            return True
+        except (FileNotFoundError, PermissionError, OSError, ValueError, EOFError, StructError, UnpicklingError):
+            return False
+
+    # ----------------------------------------------------------------------------
+    # ----------------------------------------------------------------------------
+
 # -------------------------------------------------------------------------- MocaSimpleCache --
@@ -1,6 +1,7 @@
 # -- Imports --------------------------------------------------------------------------
 
 from .MocaSimpleCache import MocaSimpleCache
+from .MocaLRUCache import MocaLRUCache
 
 # -------------------------------------------------------------------------- Imports --
 
@@ -32,6 +32,8 @@ __LOAD_LEVELDB__ = False
 __LOAD_SANIC__ = True
 __LOAD_MMAPQ__ = False
 __LOAD_TWITTER__ = True
+__LOAD_HTTP__ = True
+__LOAD_IP__ = True
 __LOAD_MOCA_BOT__ = False
 
 # this dictionary will be loaded by moca_modules.core
@@ -1,8 +1,9 @@
 # -- Imports --------------------------------------------------------------------------
 
 from benchmarker import Benchmarker, BenchmarkerError
-from .compress_test import compress_test
+from .compress_test import compress_test, codec_test, recommend_codec
 from .json_test import json_test
+from .redis_test import redis_test
 from .benchmark import string_bench
 from .bench_funcs import (
     fibonacci_loop, fibonacci_sym, fibonacci_recursion,
@@ -30,4 +31,6 @@ brotli
     Brotli compression format
 sympy
     A computer algebra system written in pure Python
+aioredis
+    asyncio (PEP 3156) Redis client library.
 """
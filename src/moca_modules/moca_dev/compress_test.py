@@ -1,8 +1,9 @@
 # -- Imports --------------------------------------------------------------------------
 
 from typing import (
-    Dict, Tuple
+    Dict, Tuple, Any, Optional
 )
+from time import perf_counter
 from gzip import compress as gzip_compress, decompress as gzip_decompress
 from bz2 import compress as bz2_compress, decompress as bz2_decompress
 from zlib import compress as zlib_compress, decompress as zlib_decompress
@@ -11,7 +12,7 @@ from lzma import (
     compress as lzma_compress, decompress as lzma_decompress,
     FORMAT_XZ, CHECK_CRC64, CHECK_CRC32, CHECK_NONE, FORMAT_ALONE
 )
-from ..moca_utils import check_function_speed, try_print
+from ..moca_utils import check_function_speed, try_print, MocaCodec, get_serializers, get_compressors
 
 # -------------------------------------------------------------------------- Imports --
 
@@ -114,4 +115,65 @@ def compress_test(data: bytes, output: bool = True) -> Dict[str, Tuple[int, int,
     try_print('+++++++++++++++++++++++++++++++++++++++++++++++++++++', flag=output)
     return res
 
+
+def codec_test(
+        obj: Any,
+        number: int = 1000,
+        threshold: int = 1024,
+        output: bool = True
+) -> Dict[str, Tuple[int, float, float]]:
+    """
+    Compare all available serializer and compressor combinations of MocaCodec.
+    :param obj: the object to encode, use a typical value of your data.
+    :param number: the number of times to encode and decode.
+    :param threshold: only compress the data bigger than this size. (bytes)
+    :param output: if this value is True, print the results and the recommended codec to console.
+    :return: {'serializer+compressor(level)': (<size of the encoded data>, <time to encode (us)>,
+                                               <time to decode (us)>)}
+    """
+    res: Dict[str, Tuple[int, float, float]] = {}
+    try_print('+++++++++++++++++++++++++++++++++++++++++++++++++++++', flag=output)
+    for serializer in get_serializers():
+        for compressor in get_compressors():
+            for level in ((None, 1) if compressor in ('gzip', 'zlib') else (None,)):
+                key = f'{serializer}+{compressor}({"default" if level is None else level})'
+                codec = MocaCodec(serializer, compressor, threshold, level)
+                try:
+                    data = codec.dumps(obj)
+                except (TypeError, ValueError):  # orjson and msgpack can't serialize all python objects.
+                    try_print(f'{key}:\t\tnot supported.', flag=output)
+                    continue
+                start = perf_counter()
+                for _ in range(number):
+                    codec.dumps(obj)
+                encode = perf_counter() - start
+                start = perf_counter()
+                for _ in range(number):
+                    codec.loads(data)
+                decode = perf_counter() - start
+                res[key] = (len(data), round(encode / number * 1000000, 2), round(decode / number * 1000000, 2))
+                try_print(
+                    f"{key}:\t\tsize: {res[key][0]} bytes,\t "
+                    f"encode_speed: {res[key][1]} us,\t "
+                    f"decode_speed: {res[key][2]} us.",
+                    flag=output
+                )
+    try_print(f'recommended: {recommend_codec(res)}', flag=output)
+    try_print('+++++++++++++++++++++++++++++++++++++++++++++++++++++', flag=output)
+    return res
+
+
+def recommend_codec(res: Dict[str, Tuple[int, float, float]], max_size_ratio: float = 1.5) -> Optional[str]:
+    """
+    Return the fastest codec in the results of codec_test,
+    the size of the encoded data must be smaller than the smallest size * max_size_ratio.
+    """
+    if len(res) == 0:
+        return None
+    limit = min(item[0] for item in res.values()) * max_size_ratio
+    return min(
+        [key for key, item in res.items() if item[0] <= limit],
+        key=lambda key: res[key][1] + res[key][2]
+    )
+
 # -------------------------------------------------------------------------- Functions --
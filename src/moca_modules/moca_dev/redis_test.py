@@ -0,0 +1,66 @@
+# -- Imports --------------------------------------------------------------------------
+
+from typing import (
+    Dict
+)
+from time import time
+from ..moca_redis import MocaRedis
+from ..moca_utils import try_print, get_random_string
+
+# -------------------------------------------------------------------------- Imports --
+
+# -- Functions --------------------------------------------------------------------------
+
+
+async def redis_test(redis: MocaRedis, count: int = 1000, output: bool = True) -> Dict[str, int]:
+    """
+    Compare the one-by-one commands and the pipelined batch commands.
+    :param redis: the MocaRedis instance to test, the test keys will be removed after the test.
+    :param count: the number of keys.
+    :param output: if this value is True, print the results to console.
+    :return: {'test name': <time to execute (ms)>}
+    """
+    res: Dict[str, int] = {}
+    prefix = 'moca_modules_redis_test_' + get_random_string(16)
+    data = [(f'{prefix}-{i}', get_random_string(64)) for i in range(count)]
+    keys = [item[0] for item in data]
+    try_print('+++++++++++++++++++++++++++++++++++++++++++++++++++++', flag=output)
+    try_print(f'Keys: {count}', flag=output)
+    # set with expiration
+    start = time()
+    for key, value in data:
+        await redis.set(key, value, 60)
+    res['set(one by one)'] = int((time() - start) * 1000)
+    start = time()
+    await redis.set_multi(data, 60)
+    res['set_multi(pipeline)'] = int((time() - start) * 1000)
+    # get
+    start = time()
+    for key in keys:
+        await redis.get(key)
+    res['get(one by one)'] = int((time() - start) * 1000)
+    start = time()
+    await redis.get_multi(keys)
+    res['get_multi(pipeline)'] = int((time() - start) * 1000)
+    # list
+    start = time()
+    for _, value in data:
+        await redis.rpush(prefix, value)
+    res['rpush(one by one)'] = int((time() - start) * 1000)
+    start = time()
+    await redis.rpush_multi(prefix, [item[1] for item in data])
+    res['rpush_multi(pipeline)'] = int((time() - start) * 1000)
+    # delete
+    start = time()
+    for key in keys[:count // 2]:
+        await redis.delete(key)
+    res['delete(one by one, half)'] = int((time() - start) * 1000)
+    start = time()
+    await redis.delete_multi(keys[count // 2:] + [prefix])
+    res['delete_multi(pipeline, half)'] = int((time() - start) * 1000)
+    for key, value in res.items():
+        try_print(f'{key}:\t\t{value} ms.', flag=output)
+    try_print('+++++++++++++++++++++++++++++++++++++++++++++++++++++', flag=output)
+    return res
+
+# -------------------------------------------------------------------------- Functions --
@@ -0,0 +1,132 @@
+# -- Imports --------------------------------------------------------------------------
+
+from typing import (
+    Union, Optional
+)
+from pathlib import Path
+from hashlib import new as new_hash
+from uuid import uuid4
+
+# -------------------------------------------------------------------------- Imports --
+
+# -- MocaContentStore --------------------------------------------------------------------------
+
+
+class MocaContentStore:
+    """
+    A content-addressed file store.
+    The name of a file is the hash of its content and the extension. for example: '3a7bd3e2360a3d....png'
+    The files are saved in the sharded sub directories like 3a/7b/3a7bd3e2360a3d....png,
+    so a directory never contains too many entries, and the same content is saved only once.
+    The files are never modified, so the name can be used as a strong ETag.
+
+    Attributes
+    ----------
+    self._root: Path
+        the root directory of the store.
+    self._depth: int
+        the number of the sub directory levels.
+    self._width: int
+        the number of the hash characters used for a sub directory name.
+    self._hash_name: str
+        the name of the hash algorithm.
+    self._tmp_dir: Path
+        the directory for the unfinished files.
+    """
+
+    def __init__(
+            self,
+            root: Union[str, Path],
+            depth: int = 2,
+            width: int = 2,
+            hash_name: str = 'sha256',
+            tmp_dir: Optional[Union[str, Path]] = None
+    ):
+        """
+        :param root: the root directory of the store.
+        :param depth: the number of the sub directory levels.
+        :param width: the number of the hash characters used for a sub directory name.
+        :param hash_name: the name of the hash algorithm.
+        :param tmp_dir: the directory for the unfinished files, must be on the same file system as the root.
+                        if the root directory is served directly, this directory should be outside of it.
+                        None means <root>/tmp
+        """
+        self._root: Path = Path(root)
+        self._depth: int = depth
+        self._width: int = width
+        self._hash_name: str = hash_name
+        self._tmp_dir: Path = self._root.joinpath('tmp') if tmp_dir is None else Path(tmp_dir)
+        self._root.mkdir(parents=True, exist_ok=True)
+        self._tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def root(self) -> Path:
+        return self._root
+
+    @property
+    def tmp_dir(self) -> Path:
+        return self._tmp_dir
+
+    @staticmethod
+    def get_digest(name: str) -> str:
+        """Return the hash part of the name."""
+        return name.split('.', 1)[0]
+
+    def get_relative_path(self, name: str) -> str:
+        """Return the path from the root directory. for example: '3a/7b/3a7bd3e2360a3d....png'"""
+        digest = self.get_digest(name)
+        return '/'.join(
+            [digest[index * self._width:(index + 1) * self._width] for index in range(self._depth)] + [name]
+        )
+
+    def get_path(self, name: str) -> Path:
+        return self._root.joinpath(self.get_relative_path(name))
+
+    def get_tmp_path(self, suffix: str = '') -> Path:
+        """Return a unique path in the tmp directory, write the new file to it and call add_file."""
+        return self._tmp_dir.joinpath(f'{uuid4().hex}{suffix}')
+
+    def exists(self, name: str) -> bool:
+        return self.get_path(name).is_file()
+
+    def add(self, data: bytes, ext: str = '') -> str:
+        """Save the data, return the name."""
+        digest = new_hash(self._hash_name, data).hexdigest()
+        name = f'{digest}.{ext}' if ext else digest
+        path = self.get_path(name)
+        if not path.is_file():
+            tmp = self.get_tmp_path()
+            tmp.write_bytes(data)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.replace(path)
+        return name
+
+    def add_file(self, filename: Union[str, Path], ext: Optional[str] = None) -> str:
+        """
+        Move the file into the store, return the name.
+        If the same content is already saved, the file is removed.
+        :param filename: the path of the file, should be on the same file system. (for example get_tmp_path())
+        :param ext: the extension of the name, None means the extension of the file.
+        """
+        filename = Path(filename)
+        ext = filename.suffix[1:] if ext is None else ext
+        hash_obj = new_hash(self._hash_name)
+        with open(str(filename), mode='rb') as file:
+            for chunk in iter(lambda: file.read(65536), b''):
+                hash_obj.update(chunk)
+        name = f'{hash_obj.hexdigest()}.{ext}' if ext else hash_obj.hexdigest()
+        path = self.get_path(name)
+        if path.is_file():
+            filename.unlink()
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            filename.replace(path)
+        return name
+
+    def remove(self, name: str) -> None:
+        try:
+            self.get_path(name).unlink()
+        except FileNotFoundError:
+            pass
+
+# -------------------------------------------------------------------------- MocaContentStore --
@@ -27,9 +27,17 @@ class MocaDirectoryCache:
     self._use_compress: bool
         Compress files in memory.
     self._cache: Dict[str, Tuple[Optional[str], bytes]]
-        the cache of the files.
+        the cache of the files, the most recently used file is at the end.
     self._timestamp: Dict[str, float]
         The timestamp of the files.
+    self._max_bytes: int
+        The maximum size (bytes) of all cached data, 0 means unlimited.
+    self._current_bytes: int
+        The size of all cached data.
+    self._overflow: Dict[str, Optional[str]]
+        The mime-type of the files that are not cached because of the memory budget.
+        These files will be read from the disk, and moved into the memory when they are used,
+        the least recently used files in the memory are moved out to make room.
     """
 
     def __init__(
@@ -38,18 +46,24 @@ class MocaDirectoryCache:
             use_compress: bool = False,
             interval: float = 1.0,
             manual_reload: bool = False,
+            max_bytes: int = 0,
     ):
         """
         :param dir_path: The path ot the target directory.
         :param use_compress: Compress files in memory.
         :param interval: The interval (seconds) to refresh files.
         :param manual_reload: don't create the reload timer thread. You need run cache_files method manually.
+        :param max_bytes: The maximum size (bytes) of all cached data, 0 means unlimited.
+                          The files over the budget will be read from the disk.
         """
         # set parameters.
         self._dir_path: Path = Path(dir_path) if isinstance(dir_path, str) else dir_path
         self._use_compress: bool = use_compress
         self._cache: Dict[str, Tuple[Optional[str], bytes]] = {}
         self._timestamp: Dict[str, float] = {}
+        self._max_bytes: int = max_bytes
+        self._current_bytes: int = 0
+        self._overflow: Dict[str, Optional[str]] = {}
         # cache files.
         self.cache_files()
 
@@ -70,6 +84,32 @@ class MocaDirectoryCache:
     def cache(self) -> Dict[str, Tuple[Optional[str], bytes]]:
         return self._cache
 
+    @property
+    def current_bytes(self) -> int:
+        return self._current_bytes
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Return the statistics of this instance."""
+        return {
+            'entries': len(self._cache),
+            'bytes': self._current_bytes,
+            'max_bytes': self._max_bytes,
+            'overflow': len(self._overflow),
+        }
+
+    def _remove(self, path: str) -> None:
+        """Remove the file from the cache."""
+        try:
+            self._current_bytes -= len(self._cache.pop(path)[1])
+        except KeyError:
+            pass
+        self._overflow.pop(path, None)
+
     def cache_files(self) -> Dict[str, Tuple[Optional[str], bytes]]:
         """Load all files in the target directory in memory."""
         old_keys = set(self._cache.keys())
@@ -84,28 +124,56 @@ class MocaDirectoryCache:
                     timestamp = get_timestamp(path)
                     new_keys.add(path)
                     if self._timestamp.get(path) != timestamp:
+                        self._remove(path)
                         with open(path, mode='rb') as f:
                             data = f.read()
-                        self._cache[path] = (get_mime_type(path), compress(data) if self._use_compress else data)
+                        data = compress(data) if self._use_compress else data
+                        if 0 < self._max_bytes < self._current_bytes + len(data):
+                            self._overflow[path] = get_mime_type(path)
+                        else:
+                            self._cache[path] = (get_mime_type(path), data)
+                            self._current_bytes += len(data)
                         self._timestamp[path] = timestamp
             path_list.pop(0)
-        for key in old_keys:
+        for key in old_keys | set(self._overflow.keys()):
             if key not in new_keys:
-                try:
-                    del self._cache[key]
-                except KeyError:
-                    pass
+                self._remove(key)
+                self._timestamp.pop(key, None)
         return self._cache
 
+    def _promote(self, path: str, mime: Optional[str], data: bytes) -> None:
+        """Move the file from the overflow into the memory, the least recently used files are moved out."""
+        if len(data) > self._max_bytes:
+            return None
+        while len(self._cache) > 0 and self._current_bytes + len(data) > self._max_bytes:
+            old_path = next(iter(self._cache))
+            old_mime, old_data = self._cache.pop(old_path)
+            self._current_bytes -= len(old_data)
+            self._overflow[old_path] = old_mime
+        self._overflow.pop(path, None)
+        self._cache[path] = (mime, data)
+        self._current_bytes += len(data)
+
     def get(self, filename: Union[str, Path]) -> Optional[Tuple[Optional[str], bytes]]:
         """
         The response is a tuple of mime-type and the content of the file.
         If can't find the file, return None.
         """
-        res = self._cache.get(str(filename))
+        path = str(filename)
+        res = self._cache.pop(path, None)
         if res is None:
-            return None
+            mime = self._overflow.get(path)
+            if mime is None and path not in self._overflow:
+                return None
+            try:
+                with open(path, mode='rb') as f:
+                    data = f.read()
+            except (FileNotFoundError, PermissionError, OSError):
+                return None
+            self._promote(path, mime, compress(data) if self._use_compress else data)
+            return mime, data
         else:
+            self._cache[path] = res  # mark it as the most recently used.
             return res[0], decompress(res[1]) if self._use_compress else res[1]
 
 # -------------------------------------------------------------------------- MocaDirectoryCache --
@@ -5,7 +5,7 @@ from typing import (
 )
 from pathlib import Path
 from threading import Thread
-from queue import Queue
+from queue import Queue, Full
 from ..moca_core import ENCODING
 
 # -------------------------------------------------------------------------- Imports --
@@ -28,6 +28,8 @@ class MocaFileAppendController:
         The path of target file.
     self._encoding: str
         The encoding of the target file.
+    self._dropped: int
+        the number of the data dropped because the queue was full.
     """
 
     CLEAR_CMD: str = '[el]#moca_clear#'  # If you put this message in the queue, The file will be cleared.
@@ -44,6 +46,7 @@ class MocaFileAppendController:
         :param encoding: The encoding of the target file.
         :param queue: a instance of Queue class.
         :param maxsize: the maximum size of the queue, If maxsize is <= 0, the queue size is infinite.
+                        If the queue is full, the new data is dropped and counted, the caller is never blocked.
         """
         # set queue
         self._queue: Queue = queue if queue is not None else Queue(maxsize=maxsize)
@@ -51,6 +54,7 @@ class MocaFileAppendController:
         self._filename: str = str(filename)
         # set encoding
         self._encoding: str = encoding
+        self._dropped: int = 0
         # start the loop thread.
         Thread(
             target=MocaFileAppendController._write_loop,
@@ -81,9 +85,18 @@ class MocaFileAppendController:
                 except (PermissionError, OSError):
                     pass
 
-    def write(self, text: str) -> None:
-        """Add the text to the queue."""
-        self._queue.put(text)
+    def write(self, text: str) -> bool:
+        """Add the text to the queue, if the queue is full, drop the text and return False."""
+        try:
+            self._queue.put_nowait(text)
+            return True
+        except Full:
+            self._dropped += 1
+            return False
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
 
     @property
     def size(self) -> int:
@@ -28,18 +28,55 @@ class MocaFileCacheController:
         The cache of files.
     self._timestamp: Dict[str, float]
         The timestamp of the cached files.
+    self._max_bytes: int
+        The maximum size (bytes) of all cached data, 0 means unlimited.
+    self._current_bytes: int
+        The size of all cached data.
     """
 
     def __init__(
             self,
             compress_min_size: int = 1 * 1024 * 1024 * 8,  # 8MB
+            max_bytes: int = 0,
     ):
         """
         :param compress_min_size: If the file is larger than this size, It will compress.
+        :param max_bytes: The maximum size (bytes) of all cached data, the oldest cache will be removed first.
+                          0 means unlimited.
         """
         self.compress_min_size: int = compress_min_size
         self._cache: Dict[str, bytes] = {}
         self._timestamp: Dict[str, float] = {}
+        self._max_bytes: int = max_bytes
+        self._current_bytes: int = 0
+
+    @property
+    def current_bytes(self) -> int:
+        return self._current_bytes
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Return the statistics of this instance."""
+        return {
+            'entries': len(self._cache),
+            'bytes': self._current_bytes,
+            'max_bytes': self._max_bytes,
+        }
+
+    def _save(self, filename: str, data: bytes, timestamp: float) -> None:
+        """Save the data to the cache, remove the oldest cache if over the memory budget."""
+        self.clear_cache(filename)
+        if 0 < self._max_bytes < len(data):
+            return None  # too large to cache.
+        while self._max_bytes > 0 and len(self._cache) > 0 and self._current_bytes + len(data) > self._max_bytes:
+            self.clear_cache(next(iter(self._cache)))
+        self._cache[filename] = data
+        self._timestamp[filename] = timestamp
+        self._current_bytes += len(data)
 
     def _load(self, filename: str) -> bytes:
         """Cache the target file and return the content."""
@@ -51,8 +88,11 @@ class MocaFileCacheController:
         else:
             with open(filename, mode='rb') as f:
                 data = f.read()
-                self._cache[filename] = data if len(data) < self.compress_min_size else b'moca' + compress(data)
-                self._timestamp[filename] = stat(str(filename)).st_mtime
+                self._save(
+                    filename,
+                    data if len(data) < self.compress_min_size else b'moca' + compress(data),
+                    stat(str(filename)).st_mtime
+                )
             return data
 
     def load_text_file(self, filename: Union[str, Path], encoding: str = ENCODING) -> StringIO:
@@ -66,7 +106,7 @@ class MocaFileCacheController:
     def clear_cache(self, filename: Union[str, Path]) -> None:
         """Clear the cache of target file."""
         try:
-            del self._cache[str(filename)]
+            self._current_bytes -= len(self._cache.pop(str(filename)))
             del self._timestamp[str(filename)]
         except KeyError:
             pass
@@ -75,5 +115,6 @@ class MocaFileCacheController:
         """Clear all file cache."""
         self._cache = {}
         self._timestamp = {}
+        self._current_bytes = 0
 
 # -------------------------------------------------------------------------- MocaFileCacheController --
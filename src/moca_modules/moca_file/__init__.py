@@ -1,6 +1,7 @@
 # -- Imports --------------------------------------------------------------------------
 
 from .MocaDirectoryCache import MocaDirectoryCache
+from .MocaContentStore import MocaContentStore
 from .MocaFileAppendController import MocaFileAppendController
 from .MocaFileCacheController import MocaFileCacheController
 from .MocaSynchronizedBinaryFile import MocaSynchronizedBinaryFile
@@ -0,0 +1,134 @@
+# -- Imports --------------------------------------------------------------------------
+
+from typing import (
+    Optional, Union, Tuple, Dict, Any
+)
+from pathlib import Path
+from asyncio import Semaphore, TimeoutError as AsyncTimeoutError
+from os import replace, remove
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, ClientError
+from aiofiles import open as aio_open
+
+# -------------------------------------------------------------------------- Imports --
+
+# -- Moca Downloader --------------------------------------------------------------------------
+
+
+class MocaDownloader:
+    """
+    A download manager with a pooled keep-alive http session.
+    All downloads share one aiohttp session, so the TCP and TLS connections are reused.
+    The number of concurrent downloads is limited globally and per host,
+    the response body is streamed to a temporary file and moved to the target path when finished.
+    The session is created on the first download, so this class can be created outside the event loop.
+
+    Attributes
+    ----------
+    self._limit: int
+        the max number of concurrent downloads.
+    self._limit_per_host: int
+        the max number of concurrent connections to the same host.
+    self._timeout: int
+        the total timeout of a download. (seconds)
+    self._keepalive_timeout: int
+        close the idle connections after this seconds.
+    self._chunk_size: int
+        the size of the chunks written to the file. (bytes)
+    self._headers: Dict[str, str]
+        the default request headers.
+    self._session: Optional[ClientSession]
+        the shared http session.
+    self._semaphore: Optional[Semaphore]
+        the global concurrency limit.
+    """
+
+    def __init__(
+            self,
+            limit: int = 32,
+            limit_per_host: int = 8,
+            timeout: int = 10,
+            keepalive_timeout: int = 60,
+            chunk_size: int = 65536,
+            headers: Optional[Dict[str, str]] = None
+    ):
+        """
+        :param limit: the max number of concurrent downloads.
+        :param limit_per_host: the max number of concurrent connections to the same host.
+        :param timeout: the total timeout of a download. (seconds)
+        :param keepalive_timeout: close the idle connections after this seconds.
+        :param chunk_size: the size of the chunks written to the file. (bytes)
+        :param headers: the default request headers.
+        """
+        self._limit: int = limit
+        self._limit_per_host: int = limit_per_host
+        self._timeout: int = timeout
+        self._keepalive_timeout: int = keepalive_timeout
+        self._chunk_size: int = chunk_size
+        self._headers: Dict[str, str] = {} if headers is None else headers
+        self._session: Optional[ClientSession] = None
+        self._semaphore: Optional[Semaphore] = None
+
+    @property
+    def session(self) -> ClientSession:
+        """Return the shared session, create it if not exists."""
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(
+                connector=TCPConnector(
+                    limit=self._limit,
+                    limit_per_host=self._limit_per_host,
+                    keepalive_timeout=self._keepalive_timeout,
+                    ttl_dns_cache=300,
+                ),
+                timeout=ClientTimeout(total=self._timeout),
+                headers=self._headers,
+            )
+            self._semaphore = Semaphore(self._limit)
+        return self._session
+
+    async def download(self, url: str, filename: Union[Path, str], **kwargs) -> bool:
+        """
+        Download a file from url.
+        :param url: the url of the file.
+        :param filename: the path to save the file.
+        :param kwargs: the other arguments of ClientSession.get
+        :return: if the http status code is 200 return true.
+        """
+        session = self.session
+        tmp = f'{filename}.tmp'
+        async with self._semaphore:
+            try:
+                async with session.get(url, allow_redirects=True, **kwargs) as res:
+                    if res.status != 200:
+                        return False
+                    async with aio_open(tmp, mode='wb') as file:
+                        async for chunk in res.content.iter_chunked(self._chunk_size):
+                            await file.write(chunk)
+                replace(tmp, str(filename))
+                return True
+            except (ClientError, AsyncTimeoutError, OSError):
+                try:
+                    remove(tmp)
+                except OSError:
+                    pass
+                return False
+
+    async def head(self, url: str, **kwargs) -> Tuple[int, Dict[str, Any]]:
+        """
+        Send a HEAD request.
+        :return: (status code, response headers), if the request failed, return (0, {}).
+        """
+        session = self.session
+        async with self._semaphore:
+            try:
+                async with session.head(url, allow_redirects=True, **kwargs) as res:
+                    return res.status, dict(res.headers)
+            except (ClientError, AsyncTimeoutError):
+                return 0, {}
+
+    async def close(self) -> None:
+        """Close the session and all connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+# -------------------------------------------------------------------------- Moca Downloader --
@@ -0,0 +1,16 @@
+# -- Imports --------------------------------------------------------------------------
+
+from .MocaDownloader import MocaDownloader
+
+# -------------------------------------------------------------------------- Imports --
+
+"""
+This module is a http client with a pooled keep-alive session.
+
+Requirements
+------------
+aiohttp
+    Async http client/server framework (asyncio)
+aiofiles
+    File support for asyncio.
+"""
@@ -0,0 +1,235 @@
+# -- Imports --------------------------------------------------------------------------
+
+from typing import (
+    Union, Optional, List, Any, BinaryIO
+)
+from pathlib import Path
+from threading import Lock
+from time import time
+from os import stat, fstat, replace
+from .MocaIPSet import MocaIPSet
+try:
+    from fcntl import flock, LOCK_EX
+except (ImportError, ModuleNotFoundError):
+    flock = None  # windows, the log file will not be locked.
+
+# -------------------------------------------------------------------------- Imports --
+
+# -- Moca IP Blacklist --------------------------------------------------------------------------
+
+
+class MocaIPBlacklist:
+    """
+    A ip blacklist that supports single addresses, IPv4/IPv6 networks (CIDR) and expiry times.
+    The static entries are loaded from a config list, the dynamic entries (for example automatic bans)
+    are persisted to a append-only log file, every change is one line, so adding a entry never rewrites the file.
+    Some processes can share the same log file, reload_file reads only the lines appended since the last call.
+    compact_if_needed rewrites the log file when it contains too many old lines, it blocks while the file is rewritten,
+    so call it from a background thread. The appends and the compaction lock the log file,
+    so no line is lost while the file is rewritten.
+
+    log format
+    ----------
+    <time> add <address or network> <expiry time, 0 means never>
+    <time> remove <address or network>
+
+    Attributes
+    ----------
+    self._log_file: Optional[Path]
+        the log file, None means the dynamic entries are not persisted.
+    self._compact_threshold: int
+        compact the log file when the number of lines is bigger than this value and twice the number of entries.
+    self._static: MocaIPSet
+        the entries loaded from the config.
+    self._dynamic: MocaIPSet
+        the entries added at runtime.
+    self._static_source: Any
+        the config list that the static entries were loaded from.
+    self._offset: int
+        the size of the log file that was already read.
+    self._inode: int
+        the inode of the log file, it will be changed by compaction.
+    self._lines: int
+        the number of lines in the log file.
+    self._lock: Lock
+        the lock for the log file in this process.
+    """
+
+    def __init__(self, log_file: Union[str, Path, None] = None, compact_threshold: int = 10000):
+        """
+        :param log_file: the log file, None means the dynamic entries are not persisted.
+        :param compact_threshold: compact the log file when the number of lines is bigger than this value.
+        """
+        self._log_file: Optional[Path] = None if log_file is None else Path(log_file)
+        self._compact_threshold: int = compact_threshold
+        self._static: MocaIPSet = MocaIPSet()
+        self._dynamic: MocaIPSet = MocaIPSet()
+        self._static_source: Any = None
+        self._offset: int = 0
+        self._inode: int = 0
+        self._lines: int = 0
+        self._lock: Lock = Lock()
+        if self._log_file is not None:
+            self._log_file.parent.mkdir(parents=True, exist_ok=True)
+            self._log_file.touch(exist_ok=True)
+            self.reload_file()
+
+    def __len__(self) -> int:
+        return len(self._static) + len(self._dynamic)
+
+    def __contains__(self, ip: str) -> bool:
+        return self.is_in(ip)
+
+    @property
+    def static(self) -> MocaIPSet:
+        return self._static
+
+    @property
+    def dynamic(self) -> MocaIPSet:
+        return self._dynamic
+
+    def is_in(self, ip: str) -> bool:
+        """If the ip address is in the blacklist, return True."""
+        return self._dynamic.contains(ip) or self._static.contains(ip)
+
+    def set_static(self, items: Optional[List[str]]) -> List[str]:
+        """
+        Replace the static entries, if the list is not changed, do nothing.
+        :return: the invalid items.
+        """
+        if items is self._static_source:
+            return []
+        static, invalid = MocaIPSet(), []
+        for item in items or []:
+            try:
+                static.add(item)
+            except (TypeError, ValueError):
+                invalid.append(item)
+        self._static, self._static_source = static, items
+        return invalid
+
+    def add(self, network: str, ttl: float = 0, persist: bool = True) -> str:
+        """
+        Add a address or a network to the dynamic entries.
+        :param network: the ip address or the network.
+        :param ttl: remove the entry after this seconds, 0 means never.
+        :param persist: write the entry to the log file,
+                        False is used when the entry was already written by the other process,
+                        this doesn't touch the log file, so it can be called in the event loop.
+        :return: the normalized address or network.
+        """
+        expire = 0 if ttl <= 0 else time() + ttl
+        if not persist or self._log_file is None:
+            # the line is in the log file, so the entry is read again if it was added to the replaced set.
+            return self._dynamic.add(network, expire)
+        with self._lock:
+            key = self._dynamic.add(network, expire)
+            self._write(f'{time()} add {key} {expire}\n')
+        return key
+
+    def remove(self, network: str) -> None:
+        """Remove a address or a network from the dynamic entries."""
+        key = str(MocaIPSet.parse(network))
+        if self._log_file is None:
+            self._dynamic.remove(key)
+            return None
+        with self._lock:
+            self._dynamic.remove(key)
+            self._write(f'{time()} remove {key}\n')
+
+    def _open_log_file(self) -> BinaryIO:
+        """
+        Open the log file to append, and lock it until the file is closed.
+        If the file is replaced by the other process while waiting the lock, open the new file.
+        """
+        file = open(str(self._log_file), mode='ab')
+        if flock is not None:
+            flock(file.fileno(), LOCK_EX)
+            if fstat(file.fileno()).st_ino != stat(str(self._log_file)).st_ino:  # compacted by the other process.
+                file.close()
+                return self._open_log_file()
+        return file
+
+    def _write(self, line: str) -> None:
+        """Append the line to the log file, call it with the lock."""
+        data = line.encode('utf-8')
+        with self._open_log_file() as file:
+            # if there are no unread lines, this line doesn't need to be read again.
+            unread = fstat(file.fileno()).st_ino != self._inode or file.tell() != self._offset
+            file.write(data)
+        if not unread:
+            self._offset += len(data)
+            self._lines += 1
+
+    def reload_file(self) -> None:
+        """Read the lines appended by the other processes."""
+        if self._log_file is None:
+            return None
+        with self._lock:
+            self._reload_file()
+
+    def _reload_file(self) -> None:
+        try:
+            info = stat(str(self._log_file))
+        except FileNotFoundError:
+            return None
+        if info.st_ino != self._inode or info.st_size < self._offset:  # compacted by the other process.
+            # build the new set aside, the current entries are used until the whole file is read.
+            dynamic = MocaIPSet()
+            self._inode, self._offset, self._lines = info.st_ino, 0, 0
+        else:
+            dynamic = self._dynamic
+        if info.st_size != self._offset:
+            with open(str(self._log_file), mode='rb') as file:
+                file.seek(self._offset)
+                data = file.read(info.st_size - self._offset)
+            end = data.rfind(b'\n') + 1  # don't read the half-written line.
+            self._offset += end
+            for line in data[:end].decode('utf-8', errors='ignore').splitlines():
+                self._apply(dynamic, line)
+                self._lines += 1
+        self._dynamic = dynamic
+
+    @staticmethod
+    def _apply(dynamic: MocaIPSet, line: str) -> None:
+        items = line.split()
+        try:
+            if len(items) == 4 and items[1] == 'add':
+                dynamic.add(items[2], float(items[3]))
+            elif len(items) == 3 and items[1] == 'remove':
+                dynamic.remove(items[2])
+        except ValueError:
+            pass  # broken line.
+
+    def compact_if_needed(self) -> bool:
+        """
+        Compact the log file if it contains too many old lines.
+        This rewrites the log file, so don't call it in the event loop.
+        :return: the log file was compacted or not.
+        """
+        if self._lines > self._compact_threshold and self._lines > len(self._dynamic) * 2:
+            self.compact()
+            return True
+        return False
+
+    def compact(self) -> None:
+        """Remove the expired entries, and rewrite the log file with the current entries."""
+        if self._log_file is None:
+            self._dynamic.remove_expired()
+            return None
+        with self._lock:
+            # the other processes can't append while the file is locked, so their lines are reloaded or wait for
+            # the new file.
+            with self._open_log_file():
+                self._reload_file()
+                self._dynamic.remove_expired()
+                tmp = self._log_file.with_name(self._log_file.name + '.tmp')
+                now = time()
+                with open(str(tmp), mode='w', encoding='utf-8') as file:
+                    for key, expire in self._dynamic.items():
+                        file.write(f'{now} add {key} {expire}\n')
+                replace(str(tmp), str(self._log_file))
+                info = stat(str(self._log_file))
+                self._inode, self._offset, self._lines = info.st_ino, info.st_size, len(self._dynamic)
+
+# -------------------------------------------------------------------------- Moca IP Blacklist --
@@ -0,0 +1,146 @@
+# -- Imports --------------------------------------------------------------------------
+
+from typing import (
+    Dict, List, Tuple, Iterator, Optional, Union
+)
+from ipaddress import ip_address, ip_network, IPv4Network, IPv6Network
+from time import time
+
+# -------------------------------------------------------------------------- Imports --
+
+# -- Moca IP Set --------------------------------------------------------------------------
+
+
+class MocaIPSet:
+    """
+    A set of ip addresses and networks with expiry times.
+    The single addresses are saved in a dict, so the exact match is O(1).
+    The networks (CIDR) are saved in a binary radix tree per ip version,
+    the lookup walks at most 32 (IPv4) or 128 (IPv6) nodes and usually stops much earlier.
+    The expiry time 0 means the entry never expires, the expired entries are ignored and removed by remove_expired.
+
+    Attributes
+    ----------
+    self._exact: Dict[str, float]
+        the single addresses. {address: expiry time}
+    self._trees: Dict[int, list]
+        the root nodes of the radix trees. {ip version: [child 0, child 1, expiry time or None]}
+    self._networks: Dict[str, float]
+        the networks in the radix trees. {network: expiry time}
+    """
+
+    def __init__(self):
+        self._exact: Dict[str, float] = {}
+        self._trees: Dict[int, list] = {4: [None, None, None], 6: [None, None, None]}
+        self._networks: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._exact) + len(self._networks)
+
+    def __contains__(self, ip: str) -> bool:
+        return self.contains(ip)
+
+    @staticmethod
+    def parse(network: str) -> Union[IPv4Network, IPv6Network]:
+        """Parse the address or the network. for example: '192.0.2.1', '192.0.2.0/24', '2001:db8::/32'"""
+        return ip_network(network.strip(), strict=False)
+
+    def add(self, network: str, expire: float = 0) -> str:
+        """
+        Add a address or a network, if it is already added, the expiry time is updated.
+        :param network: the ip address or the network.
+        :param expire: the expiry time (unix time), 0 means never.
+        :return: the normalized address or network.
+        """
+        net = self.parse(network)
+        if net.num_addresses == 1:
+            key = str(net.network_address)
+            self._exact[key] = expire
+            return key
+        key = str(net)
+        node = self._trees[net.version]
+        value = int(net.network_address) >> (net.max_prefixlen - net.prefixlen)
+        for index in range(net.prefixlen - 1, -1, -1):
+            bit = (value >> index) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+        node[2] = expire
+        self._networks[key] = expire
+        return key
+
+    def remove(self, network: str) -> None:
+        """Remove the address or the network, the empty nodes are kept until clear is called."""
+        net = self.parse(network)
+        if net.num_addresses == 1:
+            self._exact.pop(str(net.network_address), None)
+            return None
+        node = self._trees[net.version]
+        value = int(net.network_address) >> (net.max_prefixlen - net.prefixlen)
+        for index in range(net.prefixlen - 1, -1, -1):
+            node = node[(value >> index) & 1]
+            if node is None:
+                return None
+        node[2] = None
+        self._networks.pop(str(net), None)
+
+    def get_expire(self, ip: str) -> Optional[float]:
+        """
+        Return the expiry time of the entry that contains the ip address, if not found or expired, return None.
+        If some networks contain the address, the longest expiry time is returned.
+        """
+        now = time()
+        expire = self._exact.get(ip)
+        if expire is not None and (expire == 0 or expire > now):
+            return expire
+        if len(self._networks) == 0 and ':' not in ip:
+            return None
+        try:
+            address = ip_address(ip)
+        except ValueError:
+            return None
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        if expire is None and str(address) != ip:
+            expire = self._exact.get(str(address))
+            if expire is not None and (expire == 0 or expire > now):
+                return expire
+        found: Optional[float] = None
+        node = self._trees[address.version]
+        value = int(address)
+        index = address.max_prefixlen
+        # the root node is the /0 network.
+        while node is not None:
+            if node[2] is not None:
+                if node[2] == 0:
+                    return 0
+                if node[2] > now and (found is None or node[2] > found):
+                    found = node[2]
+            index -= 1
+            if index < 0:
+                break
+            node = node[(value >> index) & 1]
+        return found
+
+    def contains(self, ip: str) -> bool:
+        return self.get_expire(ip) is not None
+
+    def items(self) -> Iterator[Tuple[str, float]]:
+        """Return all entries. (address or network, expiry time)"""
+        yield from list(self._exact.items())
+        yield from list(self._networks.items())
+
+    def remove_expired(self) -> List[str]:
+        """Remove the expired entries, return the removed addresses and networks."""
+        now = time()
+        removed = [key for key, expire in self.items() if expire != 0 and expire <= now]
+        for key in removed:
+            self.remove(key)
+        return removed
+
+    def clear(self) -> None:
+        self._exact.clear()
+        self._trees = {4: [None, None, None], 6: [None, None, None]}
+        self._networks.clear()
+
+# -------------------------------------------------------------------------- Moca IP Set --
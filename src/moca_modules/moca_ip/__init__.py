@@ -0,0 +1,10 @@
+# -- Imports --------------------------------------------------------------------------
+
+from .MocaIPSet import MocaIPSet
+from .MocaIPBlacklist import MocaIPBlacklist
+
+# -------------------------------------------------------------------------- Imports --
+
+"""
+This module provides the ip address sets and the ip blacklist that support networks (CIDR) and expiry times.
+"""
@@ -5,7 +5,7 @@ from typing import (
 )
 from plyvel import DB, Error
 from pathlib import Path
-from ..moca_utils import moca_dumps as dumps, moca_loads as loads
+from ..moca_utils import MocaCodec, DEFAULT_CODEC
 from ..moca_cache import MocaSimpleCache
 
 # -------------------------------------------------------------------------- Imports --
@@ -23,16 +23,20 @@ class MocaLevelDB:
         the level db.
     self._cache: Optional[MocaSimpleCache]
         the cache object.
+    self._codec: MocaCodec
+        the codec to serialize and compress the values.
     """
 
     def __init__(
             self,
             db: Union[Path, str],
-            cache_size: int = 0
+            cache_size: int = 0,
+            codec: Optional[MocaCodec] = None
     ):
         """
         :param db: the filename of level database.
         :param cache_size: if this value is bigger than 0, MocaLevelDB will cache response use MocaSimpleCache.
+        :param codec: the codec to serialize and compress the values, the default is DEFAULT_CODEC.
         """
         self._db: DB = DB(str(db), create_if_missing=True)
         self._cache: Optional[MocaSimpleCache]
@@ -40,18 +44,23 @@ class MocaLevelDB:
             self._cache = MocaSimpleCache(pool_size=cache_size, page_size=cache_size // 5)
         else:
             self._cache = None
+        self._codec: MocaCodec = DEFAULT_CODEC if codec is None else codec
 
     @property
     def db(self) -> DB:
         return self._db
 
+    @property
+    def codec(self) -> MocaCodec:
+        return self._codec
+
     def put(self, key: Union[bytes, str], value: Any) -> bool:
         """Add a data to core database."""
         __key = key if isinstance(key, bytes) else key.encode()
         if self._cache is not None:
             self._cache.set(str(__key), value)
         try:
-            self._db.put(__key, dumps(value))
+            self._db.put(__key, self._codec.dumps(value))
             return True
         except (Error, ValueError, TypeError):
             return False
@@ -64,7 +73,7 @@ class MocaLevelDB:
             if cache is not None:
                 return cache
         try:
-            return loads(self._db.get(__key))
+            return self._codec.loads(self._db.get(__key))
         except (Error, ValueError, TypeError):
             return default
 
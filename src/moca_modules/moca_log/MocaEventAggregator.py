@@ -0,0 +1,110 @@
+# -- Imports --------------------------------------------------------------------------
+
+from typing import (
+    Dict, Optional
+)
+from time import time
+from .LogLevel import LogLevel
+from .MocaFileLog import MocaFileLog
+
+# -------------------------------------------------------------------------- Imports --
+
+# -- MocaEventAggregator --------------------------------------------------------------------------
+
+
+class MocaEventAggregator:
+    """
+    Aggregate the repeated events (for example the requests with a unknown api key) before writing them to the log.
+    Every event is counted per source, flush writes one summary line for all sources of the interval,
+    and only a few events per second are written as they are (sampling).
+    So a flood of events never becomes a flood of log lines.
+    This class is not thread-safe, call hit and flush from the same thread. (for example the event loop)
+
+    Attributes
+    ----------
+    self._log: MocaFileLog
+        the log file.
+    self._name: str
+        the name of the event, used in the summary line.
+    self._level: int
+        the log level.
+    self._sample_rate: int
+        the maximum number of the raw events written per second.
+    self._max_sources: int
+        the maximum number of the sources shown in the summary line.
+    self._counts: Dict[str, int]
+        the number of the events per source in the current interval.
+    self._sampled: int
+        the number of the raw events written in the current second.
+    self._sample_time: int
+        the current second.
+    self._suppressed: int
+        the number of the raw events not written in the current interval.
+    self._dropped: int
+        the number of the dropped log lines when the last summary was written.
+    self._started_at: float
+        the start time of the current interval.
+    """
+
+    def __init__(self, log: MocaFileLog, name: str, level: int = LogLevel.WARNING,
+                 sample_rate: int = 1, max_sources: int = 10):
+        """
+        :param log: the log file.
+        :param name: the name of the event, used in the summary line.
+        :param level: the log level.
+        :param sample_rate: the maximum number of the raw events written per second.
+        :param max_sources: the maximum number of the sources shown in the summary line.
+        """
+        self._log: MocaFileLog = log
+        self._name: str = name
+        self._level: int = level
+        self._sample_rate: int = sample_rate
+        self._max_sources: int = max_sources
+        self._counts: Dict[str, int] = {}
+        self._sampled: int = 0
+        self._sample_time: int = 0
+        self._suppressed: int = 0
+        self._dropped: int = log.dropped
+        self._started_at: float = time()
+
+    def hit(self, source: str, message: Optional[str] = None) -> int:
+        """
+        Count a event.
+        :param source: the source of the event, for example the ip address.
+        :param message: the raw log message, it is written only if the sampling rate allows.
+        :return: the number of the events from this source in the current interval.
+        """
+        try:
+            self._counts[source] += 1
+        except KeyError:
+            self._counts[source] = 1
+        if message is not None:
+            now = int(time())
+            if now != self._sample_time:
+                self._sample_time, self._sampled = now, 0
+            if self._sampled < self._sample_rate:
+                self._sampled += 1
+                self._log.write_log(message, self._level)
+            else:
+                self._suppressed += 1
+        return self._counts[source]
+
+    def flush(self) -> None:
+        """Write the summary line of the current interval, and start the next interval."""
+        counts, self._counts = self._counts, {}
+        suppressed, self._suppressed = self._suppressed, 0
+        dropped = self._log.dropped - self._dropped
+        self._dropped += dropped
+        now = time()
+        interval, self._started_at = now - self._started_at, now
+        if len(counts) == 0 and dropped == 0:
+            return None
+        top = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:self._max_sources]
+        self._log.write_log(
+            f"<{self._name}> {sum(counts.values())} events from {len(counts)} sources in the last {int(interval)} "
+            f"seconds, {suppressed} were not logged, {dropped} log lines were dropped. "
+            f"top sources: {', '.join(f'{source}={count}' for source, count in top)}",
+            self._level
+        )
+
+# -------------------------------------------------------------------------- MocaEventAggregator --
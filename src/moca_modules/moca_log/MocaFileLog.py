@@ -34,6 +34,8 @@ class MocaFileLog(MocaFileAppendController):
         The path of target file.
     self._encoding: str
         The encoding of the target file.
+    self._dropped: int
+        the number of the logs dropped because the queue was full.
     self._log_level: int
         The log level of this instance.
     self._pid: Optional[int]
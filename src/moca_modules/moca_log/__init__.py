@@ -3,6 +3,7 @@
 from .LogLevel import LogLevel
 from .MocaFileLog import MocaFileLog
 from .MocaAsyncFileLog import MocaAsyncFileLog
+from .MocaEventAggregator import MocaEventAggregator
 
 # -------------------------------------------------------------------------- Imports --
 
@@ -10,6 +11,7 @@ from .MocaAsyncFileLog import MocaAsyncFileLog
 This is a simple logging module.
 MocaFileLog can write logs in other thread, to return the response more quickly.
 MocaAsyncFileLog can write logs use asyncio.
+MocaEventAggregator can aggregate and sample the repeated events before writing them to a log.
 
 Requirements
 ------------
@@ -0,0 +1,82 @@
+# -- Imports --------------------------------------------------------------------------
+
+from typing import (
+    List, Tuple, Hashable, Optional
+)
+from bisect import bisect, insort
+from hashlib import md5
+
+# -------------------------------------------------------------------------- Imports --
+
+# -- Moca Hash Ring --------------------------------------------------------------------------
+
+
+class MocaHashRing:
+    """
+    A consistent-hash ring with virtual nodes.
+    Adding or removing a node only moves the keys of that node's slices.
+    If a key contains a hash tag like 'user-{123}-info', only the part in the braces is hashed,
+    so the keys with the same tag are always on the same node.
+
+    Attributes
+    ----------
+    self._vnodes: int
+        the number of virtual nodes per node.
+    self._nodes: List[Hashable]
+        the nodes on the ring.
+    self._points: List[Tuple[int, Hashable]]
+        the sorted hash values of the virtual nodes.
+    """
+
+    def __init__(self, nodes: List[Hashable], vnodes: int = 160):
+        """
+        :param nodes: the nodes, for example (host, port).
+        :param vnodes: the number of virtual nodes per node, more virtual nodes make the distribution more even.
+        """
+        self._vnodes: int = vnodes
+        self._nodes: List[Hashable] = []
+        self._points: List[Tuple[int, Hashable]] = []
+        for node in nodes:
+            self.add_node(node)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    @property
+    def nodes(self) -> List[Hashable]:
+        return self._nodes.copy()
+
+    @property
+    def vnodes(self) -> int:
+        return self._vnodes
+
+    @staticmethod
+    def hash(key: str) -> int:
+        start = key.find('{')
+        if start != -1:
+            end = key.find('}', start + 1)
+            if end > start + 1:
+                key = key[start + 1:end]
+        return int.from_bytes(md5(key.encode()).digest()[:8], 'big')
+
+    def add_node(self, node: Hashable) -> None:
+        if node in self._nodes:
+            return None
+        self._nodes.append(node)
+        for index in range(self._vnodes):
+            insort(self._points, (self.hash(f'{node}#{index}'), node))
+
+    def remove_node(self, node: Hashable) -> None:
+        if node not in self._nodes:
+            return None
+        self._nodes.remove(node)
+        self._points = [point for point in self._points if point[1] != node]
+
+    def get_node(self, key: str) -> Optional[Hashable]:
+        """Return the node of the key, if the ring is empty, return None."""
+        if len(self._points) == 0:
+            return None
+        index = bisect(self._points, (self.hash(key),))
+        return self._points[index if index < len(self._points) else 0][1]
+
+# -------------------------------------------------------------------------- Moca Hash Ring --
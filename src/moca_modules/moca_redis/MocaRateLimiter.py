@@ -0,0 +1,174 @@
+# -- Imports --------------------------------------------------------------------------
+
+from typing import (
+    Optional, Tuple, Dict, List
+)
+from functools import lru_cache
+from time import time
+from math import floor
+from limits import parse_many
+from .MocaRedis import MocaRedis
+
+# -------------------------------------------------------------------------- Imports --
+
+# -- Variables --------------------------------------------------------------------------
+
+# KEYS[1]: the counter of the current window, KEYS[2]: the counter of the previous window.
+# ARGV[1]: limit, ARGV[2]: window size (seconds), ARGV[3]: weight of the previous window, ARGV[4]: wanted tokens.
+# return the number of granted tokens.
+SLIDING_WINDOW_SCRIPT: str = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local available = math.floor(tonumber(ARGV[1]) - previous * tonumber(ARGV[3]) - current)
+if available <= 0 then
+    return 0
+end
+local granted = math.min(tonumber(ARGV[4]), available)
+redis.call('INCRBY', KEYS[1], granted)
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]) * 2)
+return granted
+"""
+
+# -------------------------------------------------------------------------- Variables --
+
+# -- Moca Rate Limiter --------------------------------------------------------------------------
+
+
+class MocaRateLimiter:
+    """
+    A sliding-window rate limiter with a local token bucket.
+    The global counters are saved in redis and updated by a lua script atomically,
+    every worker leases a chunk of tokens from redis and admits requests from the local bucket,
+    so most requests don't need any network I/O.
+    The leased tokens are already counted in redis, so the global limit holds across all workers and nodes,
+    the unused tokens of a worker expire with the window.
+    If redis is None, the counters are saved in this process.
+
+    Attributes
+    ----------
+    self._redis: Optional[MocaRedis]
+        the redis database to save the global counters.
+    self._max_lease: int
+        the maximum number of tokens leased at once.
+    self._lease_divisor: int
+        a worker leases at most limit / lease_divisor tokens at once.
+    self._max_buckets: int
+        remove the expired buckets when the number of the local buckets is bigger than this value.
+    self._buckets: Dict[str, List]
+        the local buckets. key: [tokens, window index, retry time]
+    self._counters: Dict[str, int]
+        the global counters, only used when redis is None.
+    """
+
+    def __init__(
+            self,
+            redis: Optional[MocaRedis] = None,
+            max_lease: int = 100,
+            lease_divisor: int = 20,
+            max_buckets: int = 100000
+    ):
+        """
+        :param redis: the redis database to save the global counters, None means in-process counters.
+        :param max_lease: the maximum number of tokens leased at once.
+        :param lease_divisor: a worker leases at most limit / lease_divisor tokens at once.
+        :param max_buckets: remove the expired buckets when the number of the local buckets is bigger than this value.
+        """
+        self._redis: Optional[MocaRedis] = redis
+        self._max_lease: int = max_lease
+        self._lease_divisor: int = lease_divisor
+        self._max_buckets: int = max_buckets
+        self._buckets: Dict[str, List] = {}
+        self._counters: Dict[str, int] = {}
+
+    @property
+    def redis(self) -> Optional[MocaRedis]:
+        return self._redis
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def parse(rate: str) -> Tuple[Tuple[int, int], ...]:
+        """
+        Parse the rate limit string like '100/minute;1000 per hour', the result is cached.
+        :return: ((amount, seconds), ...)
+        """
+        return tuple((item.amount, item.get_expiry()) for item in parse_many(rate))
+
+    async def hit(self, rate: str, key: str, cost: int = 1) -> bool:
+        """
+        Consume the tokens from all limits in the rate string.
+        :param rate: the rate limit string.
+        :param key: the identifier. (api-key, ip, ...)
+        :param cost: the number of tokens to consume.
+        :return: if the request is allowed, return True.
+        """
+        return await self.hit_limits(self.parse(rate), key, cost)
+
+    async def hit_limits(self, limits: Tuple[Tuple[int, int], ...], key: str, cost: int = 1) -> bool:
+        """
+        Consume the tokens from the parsed limits.
+        :param limits: the result of the parse method. ((amount, seconds), ...)
+        :param key: the identifier. (api-key, ip, ...)
+        :param cost: the number of tokens to consume.
+        :return: if the request is allowed, return True.
+        """
+        for amount, seconds in limits:
+            if not await self._take(f'{key}/{amount}/{seconds}', amount, seconds, cost):
+                return False
+        return True
+
+    async def _take(self, key: str, amount: int, seconds: int, cost: int) -> bool:
+        now = time()
+        index = int(now // seconds)
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket[1] != index:
+            if len(self._buckets) >= self._max_buckets:
+                self._remove_expired_buckets(now)
+            bucket = self._buckets[key] = [0, index, 0.0]
+        if bucket[0] < cost:
+            if bucket[2] > now:  # redis rejected recently.
+                return False
+            want = max(cost - bucket[0], min(self._max_lease, amount // self._lease_divisor))
+            bucket[0] += await self._lease(key, amount, seconds, index, now, want)
+            if bucket[0] < cost:
+                # a token will slide out of the window in about seconds / amount.
+                bucket[2] = now + seconds / amount
+                return False
+        bucket[0] -= cost
+        return True
+
+    async def _lease(self, key: str, amount: int, seconds: int, index: int, now: float, want: int) -> int:
+        """Get at most `want` tokens from the sliding window counter."""
+        weight = 1 - (now % seconds) / seconds
+        # the hash tag keeps both counters on the same redis node.
+        current, previous = f'ratelimit-{{{key}}}-{index}', f'ratelimit-{{{key}}}-{index - 1}'
+        if self._redis is not None:
+            return int(await self._redis.run_script(
+                SLIDING_WINDOW_SCRIPT, [current, previous], [amount, seconds, weight, want]
+            ))
+        if len(self._counters) >= self._max_buckets:
+            self._remove_expired_buckets(now)
+        available = floor(amount - self._counters.get(previous, 0) * weight - self._counters.get(current, 0))
+        if available <= 0:
+            return 0
+        granted = min(want, available)
+        self._counters[current] = self._counters.get(current, 0) + granted
+        return granted
+
+    def _remove_expired_buckets(self, now: float) -> None:
+        """Remove the buckets and counters of the finished windows."""
+        for key in list(self._buckets.keys()):
+            seconds = int(key.rsplit('/', 1)[1])
+            if self._buckets[key][1] != int(now // seconds):
+                del self._buckets[key]
+        for key in list(self._counters.keys()):
+            name, index = key.rsplit('-', 1)
+            seconds = int(name.rsplit('/', 1)[1].rstrip('}'))
+            if int(index) < int(now // seconds) - 1:
+                del self._counters[key]
+
+    def clear(self) -> None:
+        """Remove all local buckets, the leased tokens will be lost."""
+        self._buckets.clear()
+        self._counters.clear()
+
+# -------------------------------------------------------------------------- Moca Rate Limiter --
@@ -1,14 +1,32 @@
 # -- Imports --------------------------------------------------------------------------
 
 from typing import (
-    Any, List, Dict, Tuple, Optional, Union
+    Any, List, Dict, Tuple, Optional, Union, Callable
 )
-from aioredis import create_pool
+from aioredis import create_pool, create_connection, RedisConnection, Channel, ReplyError
+from hashlib import sha1
+from urllib.parse import urlparse
+from asyncio import Task, Lock, ensure_future, sleep
+from time import time
+from inspect import isawaitable
+from traceback import print_exc
 from ssl import SSLContext
-from ..moca_utils import moca_dumps as dumps, moca_loads as loads, get_random_string
+from .MocaRedisPipeline import MocaRedisPipeline, CONNECTION_ERRORS
+from .MocaHashRing import MocaHashRing
+from ..moca_utils import MocaCodec, DEFAULT_CODEC, get_random_string
 
 # -------------------------------------------------------------------------- Imports --
 
+# -- Variables --------------------------------------------------------------------------
+
+# the commands without keys, executed on the first live node.
+KEYLESS_COMMANDS = {
+    'PING', 'INFO', 'DBSIZE', 'FLUSHDB', 'FLUSHALL', 'LASTSAVE', 'BGSAVE', 'SAVE', 'TIME', 'PUBLISH', 'SCRIPT',
+    'MULTI', 'EXEC', 'DISCARD',
+}
+
+# -------------------------------------------------------------------------- Variables --
+
 # -- Moca Redis --------------------------------------------------------------------------
 
 
@@ -34,8 +52,40 @@ class MocaRedis:
          ssl context for the redis database.
     self._pool
         the async redis connection pool.
+    self._subscriber: Optional[RedisConnection]
+        the dedicated connection for pub/sub.
+    self._subscriber_node: Optional[Tuple[str, int]]
+        the node of the pub/sub connection, the same node that publish uses.
+    self._subscriber_lock: Optional[Lock]
+        the lock to connect the pub/sub connection.
+    self._subscriber_watcher: Optional[Task]
+        the task to follow the first live node.
+    self._subscriptions: Dict[str, Callable[[Any], Any]]
+        the callbacks of the subscribed channels.
+    self._readers: Dict[str, Task]
+        the reader tasks of the subscribed channels.
+    self._instance_id: str
+        a random id of this instance, used to ignore own invalidation messages.
+    self._codec: MocaCodec
+        the codec to serialize and compress the values.
+    self._scripts: Dict[str, str]
+        the sha1 digests of the lua scripts, the script will be sent only when the server doesn't have it.
+    self._nodes: List[Tuple[str, int]]
+        all redis nodes, the first one is (host, port), pub/sub and keyless commands use the first live node.
+    self._ring: MocaHashRing
+        the consistent-hash ring of the live nodes.
+    self._pools: Dict[Tuple[str, int], Any]
+        the connection pool of every node.
+    self._down: Dict[Tuple[str, int], float]
+        the down nodes and the time to try them again.
+    self._retry_interval: int
+        try the down node again after this seconds.
     """
 
+    INVALIDATION_CHANNEL: str = 'moca-invalidation'
+    BATCH_SIZE: int = 1000  # the max number of keys in one MGET/MSET/DEL command.
+    SUBSCRIBER_CHECK_INTERVAL: float = 1  # check the node of the pub/sub connection in this seconds.
+
     def __init__(
             self,
             host: str,
@@ -44,7 +94,11 @@ class MocaRedis:
             password: str,
             minsize: int = 1,
             maxsize: int = 10,
-            ssl: Optional[SSLContext] = None):
+            ssl: Optional[SSLContext] = None,
+            codec: Optional[MocaCodec] = None,
+            nodes: Optional[List[Tuple[str, int]]] = None,
+            vnodes: int = 160,
+            retry_interval: int = 30):
         """
         :param host: the host ip address for the redis database.
         :param port: the port number for the redis database.
@@ -53,6 +107,12 @@ class MocaRedis:
         :param minsize: minimum size of the connection pool.
         :param maxsize: maximum size of the connection pool.
         :param ssl: ssl context for the redis database.
+        :param codec: the codec to serialize and compress the values, the default is DEFAULT_CODEC.
+                      the values written by the other codecs can be loaded too.
+        :param nodes: the other redis nodes, the keys are distributed by a consistent-hash ring.
+                      the keys used in one script or transaction must have the same hash tag. ('key-{tag}')
+        :param vnodes: the number of virtual nodes per node.
+        :param retry_interval: try the down node again after this seconds.
         """
         # set parameters
         self._host: str = host
@@ -63,8 +123,39 @@ class MocaRedis:
         self._maxsize: int = maxsize
         self._ssl: Optional[SSLContext] = ssl
         self._pool = None
+        self._subscriber: Optional[RedisConnection] = None
+        self._subscriber_node: Optional[Tuple[str, int]] = None
+        self._subscriber_lock: Optional[Lock] = None
+        self._subscriber_watcher: Optional[Task] = None
+        self._subscriptions: Dict[str, Callable[[Any], Any]] = {}
+        self._readers: Dict[str, Task] = {}
+        self._instance_id: str = get_random_string(32)
+        self._codec: MocaCodec = DEFAULT_CODEC if codec is None else codec
+        self._scripts: Dict[str, str] = {}
+        self._nodes: List[Tuple[str, int]] = [(host, port)]
+        for node in nodes or []:
+            if tuple(node) not in self._nodes:
+                self._nodes.append((node[0], int(node[1])))
+        self._ring: MocaHashRing = MocaHashRing(self._nodes, vnodes)
+        self._pools: Dict[Tuple[str, int], Any] = {}
+        self._down: Dict[Tuple[str, int], float] = {}
+        self._retry_interval: int = retry_interval
         self.prefix = ''
 
+    @classmethod
+    def from_url(cls, url: str, minsize: int = 1, maxsize: int = 10, codec: Optional[MocaCodec] = None) -> 'MocaRedis':
+        """Create a instance from a url like redis://:password@host:port/db"""
+        res = urlparse(url)
+        return cls(
+            res.hostname or '127.0.0.1',
+            res.port or 6379,
+            int(res.path.strip('/') or 0),
+            res.password or '',
+            minsize,
+            maxsize,
+            codec=codec
+        )
+
     @property
     def url(self) -> str:
         return f'redis://{":" if self._password != "" else ""}{self._password}' \
@@ -96,19 +187,23 @@ class MocaRedis:
     def ssl(self) -> Optional[SSLContext]:
         return self._ssl
 
+    @property
+    def codec(self) -> MocaCodec:
+        return self._codec
+
+    @property
+    def nodes(self) -> List[Tuple[str, int]]:
+        return self._nodes.copy()
+
+    @property
+    def live_nodes(self) -> List[Tuple[str, int]]:
+        return [node for node in self._nodes if node not in self._down]
+
     async def get_aio_pool(self):
         """Return a async connection pool, if not exists, create a new onw."""
         if self._pool is None:
-            pool = await create_pool((self._host, self._port),
-                                     db=self._db,
-                                     password=self._password if self._password != '' else None,
-                                     minsize=self._minsize,
-                                     maxsize=self._maxsize,
-                                     ssl=self._ssl)
-            self._pool = pool
-        else:
-            pool = self._pool
-        return pool
+            self._pool = await self.get_node_pool(self._nodes[0])
+        return self._pool
 
     async def create_aio_pool(self):
         """Create a new async connection pool."""
@@ -119,72 +214,242 @@ class MocaRedis:
                                  maxsize=self._maxsize,
                                  ssl=self._ssl)
         if self._pool is None:
-            self._pool = pool
+            self._pool = self._pools[self._nodes[0]] = pool
         return pool
 
+    async def get_node_pool(self, node: Tuple[str, int]):
+        """Return the connection pool of the node, if not exists, create a new one."""
+        pool = self._pools.get(node)
+        if pool is None:
+            pool = self._pools[node] = await create_pool(node,
+                                                         db=self._db,
+                                                         password=self._password if self._password != '' else None,
+                                                         minsize=self._minsize,
+                                                         maxsize=self._maxsize,
+                                                         ssl=self._ssl)
+        return pool
+
+    @staticmethod
+    def get_route_key(command: str, args: tuple) -> Optional[str]:
+        """Return the key used to choose the node, None means the command has no key."""
+        command = command.upper()
+        if command in KEYLESS_COMMANDS or len(args) == 0:
+            return None
+        elif command in ('EVAL', 'EVALSHA'):
+            return str(args[2]) if int(args[1]) > 0 else None
+        elif command in ('XGROUP', 'XINFO'):
+            return str(args[1])
+        elif command in ('XREAD', 'XREADGROUP'):
+            return str(args[[str(item).upper() for item in args].index('STREAMS') + 1])
+        else:
+            return args[0].decode() if isinstance(args[0], bytes) else str(args[0])
+
+    def get_node(self, key: Optional[str]) -> Tuple[str, int]:
+        """Return the live node of the key, the down nodes will be tried again after the retry interval."""
+        if len(self._down) > 0:
+            now = time()
+            for node, retry_at in list(self._down.items()):
+                if retry_at <= now:
+                    del self._down[node]
+                    self._ring.add_node(node)
+        if key is None:
+            return self.live_nodes[0]
+        return self._ring.get_node(key)
+
+    def mark_down(self, node: Tuple[str, int]) -> bool:
+        """
+        Remove the node from the ring, only the keys of this node will be moved to the other nodes.
+        The last live node will not be removed.
+        :return: if the node was removed, return True.
+        """
+        if node in self._down or len(self._ring) <= 1:
+            return False
+        self._ring.remove_node(node)
+        self._down[node] = time() + self._retry_interval
+        pool = self._pools.pop(node, None)
+        if pool is not None:
+            pool.close()
+        if self._pool is pool:
+            self._pool = None
+        return True
+
+    def group_by_node(self, keys: List[str]) -> Dict[Tuple[str, int], List[str]]:
+        """Group the keys (without prefix) by the nodes."""
+        groups: Dict[Tuple[str, int], List[str]] = {}
+        for key in keys:
+            groups.setdefault(self.get_node(f'mr-{self.prefix}-{key}'), []).append(key)
+        return groups
+
     async def execute(self, command, *args, **kwargs):
-        """Execute a redis command."""
-        pool = await self.get_aio_pool()
-        async with pool.get() as redis:
-            result = await redis.execute(command, *args, **kwargs)
-            return result
+        """Execute a redis command on the node of the key."""
+        node = self.get_node(self.get_route_key(command, args))
+        try:
+            pool = await self.get_node_pool(node)
+            async with pool.get() as redis:
+                result = await redis.execute(command, *args, **kwargs)
+                return result
+        except CONNECTION_ERRORS:
+            if not self.mark_down(node):
+                raise
+            return await self.execute(command, *args, **kwargs)
+
+    async def execute_on_all(self, command, *args, **kwargs) -> List[Any]:
+        """Execute a redis command on all live nodes."""
+        results = []
+        for node in self.live_nodes:
+            pool = await self.get_node_pool(node)
+            async with pool.get() as redis:
+                results.append(await redis.execute(command, *args, **kwargs))
+        return results
 
     async def set(self, key: str, value: Any, expiration: int = -1):
         if expiration == -1:
-            await self.execute('SET', f'mr-{self.prefix}-{key}', dumps(value))
+            await self.execute('SET', f'mr-{self.prefix}-{key}', self._codec.dumps(value))
         else:
-            await self.execute('SETEX', f'mr-{self.prefix}-{key}', expiration, dumps(value))
+            await self.execute('SETEX', f'mr-{self.prefix}-{key}', expiration, self._codec.dumps(value))
+
+    async def set_nx(self, key: str, value: Any, expiration: int = -1) -> bool:
+        """Set the value only if the key doesn't exist, return True if the value was set."""
+        args = ['SET', f'mr-{self.prefix}-{key}', self._codec.dumps(value), 'NX']
+        if expiration != -1:
+            args.extend(('EX', expiration))
+        return await self.execute(*args) is not None
+
+    def pipeline(self) -> MocaRedisPipeline:
+        """Return a pipeline, the buffered commands will be sent in one write."""
+        return MocaRedisPipeline(self)
+
+    def transaction(self) -> MocaRedisPipeline:
+        """Return a pipeline that executes the buffered commands atomically. (MULTI/EXEC)"""
+        return MocaRedisPipeline(self, transaction=True)
 
     async def set_multi(self, data: List[Tuple[str, Any]], expiration: int = -1):
+        pipe = self.pipeline()
         if expiration == -1:
-            tmp: List[Union[str, bytes]] = []
-            for value in data:
-                tmp.append(f'mr-{self.prefix}-{value[0]}')
-                tmp.append(dumps(value[1]))
-            await self.execute('MSET', *tmp)
+            values = dict(data)
+            for keys in self.group_by_node(list(values.keys())).values():
+                for index in range(0, len(keys), self.BATCH_SIZE):
+                    tmp: List[Union[str, bytes]] = []
+                    for key in keys[index:index + self.BATCH_SIZE]:
+                        tmp.append(f'mr-{self.prefix}-{key}')
+                        tmp.append(self._codec.dumps(values[key]))
+                    pipe.execute_command('MSET', *tmp)
         else:
-            pool = await self.get_aio_pool()
-            async with pool.get() as redis:
-                for value in data:
-                    await redis.execute('SETEX', f'mr-{self.prefix}-{value[0]}', expiration, dumps(value[1]))
+            for value in data:
+                pipe.set(value[0], value[1], expiration)
+        await pipe.execute()
 
     async def get(self, key: str, default: Any = None) -> Any:
         data = await self.execute('GET', f'mr-{self.prefix}-{key}')
         if data is None:
             return default
         else:
-            return loads(data)
+            return self._codec.loads(data)
 
     async def get_multi(self, keys: List[str]) -> Dict:
-        data_list = await self.execute('MGET', *[f'mr-{self.prefix}-{value}' for value in keys])
+        pipe = self.pipeline()
+        ordered: List[str] = []
+        for group in self.group_by_node(keys).values():
+            for index in range(0, len(group), self.BATCH_SIZE):
+                pipe.mget(group[index:index + self.BATCH_SIZE])
+            ordered.extend(group)
         result: Dict = {}
         index = 0
-        for data in data_list:
-            if data is None:
-                result[keys[index]] = None
-            else:
-                result[keys[index]] = loads(data)
-            index += 1
-        return result
+        for data_list in await pipe.execute():
+            for data in data_list:
+                result[ordered[index]] = data
+                index += 1
+        return {key: result.get(key) for key in keys}
+
+    async def hset(self, key: str, field: str, value: Any):
+        await self.execute('HSET', f'mr-{self.prefix}-{key}', field, self._codec.dumps(value))
+
+    async def hset_multi(self, key: str, data: Dict[str, Any], expiration: int = -1, replace: bool = False):
+        """
+        Save the fields to a hash, every field is encoded separately, so a field can be read without the others.
+        :param key: the key of the hash.
+        :param data: the fields and the values.
+        :param expiration: the expiration of the whole hash. (seconds)
+        :param replace: remove the old fields first.
+        """
+        pipe = self.transaction()
+        if replace:
+            pipe.delete(key)
+        pipe.hset_multi(key, data)
+        if expiration != -1:
+            pipe.expire(key, expiration)
+        await pipe.execute()
+
+    async def hget(self, key: str, field: str, default: Any = None) -> Any:
+        data = await self.execute('HGET', f'mr-{self.prefix}-{key}', field)
+        if data is None:
+            return default
+        else:
+            return self._codec.loads(data)
+
+    async def hmget(self, key: str, fields: List[str]) -> Dict[str, Any]:
+        """Read only the required fields of a hash, the missing fields are None."""
+        data_list = await self.execute('HMGET', f'mr-{self.prefix}-{key}', *fields)
+        return {field: self._codec.loads(data) for field, data in zip(fields, data_list)}
+
+    async def hgetall(self, key: str) -> Dict[str, Any]:
+        data = await self.execute('HGETALL', f'mr-{self.prefix}-{key}')
+        return {data[i].decode(): self._codec.loads(data[i + 1]) for i in range(0, len(data), 2)}
+
+    async def hdel(self, key: str, *fields: str):
+        await self.execute('HDEL', f'mr-{self.prefix}-{key}', *fields)
 
     async def rpush(self, key: str, value: Any):
-        await self.execute('RPUSH', f'mr-{self.prefix}-{key}', dumps(value))
+        await self.execute('RPUSH', f'mr-{self.prefix}-{key}', self._codec.dumps(value))
 
     async def lpush(self, key: str, value: Any):
-        await self.execute('LPUSH', f'mr-{self.prefix}-{key}', dumps(value))
+        await self.execute('LPUSH', f'mr-{self.prefix}-{key}', self._codec.dumps(value))
+
+    async def rpush_multi(self, key: str, values: List[Any]):
+        pipe = self.pipeline()
+        for index in range(0, len(values), self.BATCH_SIZE):
+            pipe.rpush(key, *values[index:index + self.BATCH_SIZE])
+        await pipe.execute()
+
+    async def lpush_multi(self, key: str, values: List[Any]):
+        pipe = self.pipeline()
+        for index in range(0, len(values), self.BATCH_SIZE):
+            pipe.lpush(key, *values[index:index + self.BATCH_SIZE])
+        await pipe.execute()
 
     async def rpop(self, key: str) -> Any:
-        return loads(await self.execute('RPOP', f'mr-{self.prefix}-{key}'))
+        return self._codec.loads(await self.execute('RPOP', f'mr-{self.prefix}-{key}'))
 
     async def lpop(self, key: str) -> Any:
-        return loads(await self.execute('LPOP', f'mr-{self.prefix}-{key}'))
+        return self._codec.loads(await self.execute('LPOP', f'mr-{self.prefix}-{key}'))
+
+    async def rpop_multi(self, key: str, count: int) -> List[Any]:
+        """Pop the items from the tail of the list atomically, the result doesn't contain None."""
+        pipe = self.transaction()
+        for _ in range(count):
+            pipe.rpop(key)
+        return [item for item in await pipe.execute() if item is not None]
+
+    async def lpop_multi(self, key: str, count: int) -> List[Any]:
+        """Pop the items from the head of the list atomically, the result doesn't contain None."""
+        pipe = self.transaction()
+        for _ in range(count):
+            pipe.lpop(key)
+        return [item for item in await pipe.execute() if item is not None]
+
+    async def trim_and_range(self, key: str, start: int, end: int) -> List[Any]:
+        """Trim the list and return the remaining items atomically."""
+        pipe = self.transaction()
+        pipe.ltrim(key, start, end)
+        pipe.lrange(key, 0, -1)
+        return (await pipe.execute())[1]
 
     async def lrange(self, key: str, start: int, end: int) -> Any:
         data = await self.execute('LRANGE', f'mr-{self.prefix}-{key}', start, end)
-        return [loads(item) for item in data]
+        return [self._codec.loads(item) for item in data]
 
     async def lindex(self, key: str, index: int) -> Any:
-        return loads(await self.execute('LINDEX', f'mr-{self.prefix}-{key}', index))
+        return self._codec.loads(await self.execute('LINDEX', f'mr-{self.prefix}-{key}', index))
 
     async def llen(self, key: str) -> int:
         return await self.execute('LLEN', f'mr-{self.prefix}-{key}')
@@ -196,13 +461,17 @@ class MocaRedis:
         await self.execute('DEL', f'mr-{self.prefix}-{key}')
 
     async def delete_multi(self, keys: List[str]):
-        await self.execute('DEL', *[f'mr-{self.prefix}-{value}' for value in keys])
+        pipe = self.pipeline()
+        for group in self.group_by_node(keys).values():
+            for index in range(0, len(group), self.BATCH_SIZE):
+                pipe.delete(*group[index:index + self.BATCH_SIZE])
+        await pipe.execute()
 
     async def flush_db(self):
-        await self.execute('FLUSHDB', 'ASYNC')
+        await self.execute_on_all('FLUSHDB', 'ASYNC')
 
     async def get_db_size(self):
-        return await self.execute('DBSIZE')
+        return sum(await self.execute_on_all('DBSIZE'))
 
     async def get_db_info(self):
         return (await self.execute('INFO')).decode()
@@ -225,6 +494,140 @@ class MocaRedis:
     async def decrement_by(self, key: str, value: int):
         return await self.execute('DECRBY', f'mr-{self.prefix}-{key}', value)
 
+    async def run_script(self, script: str, keys: List[str], args: List[Any]) -> Any:
+        """
+        Run a lua script atomically, use EVALSHA and only send the script body when the server doesn't cache it.
+        :param script: the lua script.
+        :param keys: the keys used by the script, the prefix will be added.
+        :param args: the arguments of the script.
+        """
+        digest = self._scripts.get(script)
+        if digest is None:
+            digest = self._scripts[script] = sha1(script.encode()).hexdigest()
+        keys = [f'mr-{self.prefix}-{key}' for key in keys]
+        try:
+            return await self.execute('EVALSHA', digest, len(keys), *keys, *args)
+        except ReplyError as e:
+            if not str(e).startswith('NOSCRIPT'):
+                raise
+            return await self.execute('EVAL', script, len(keys), *keys, *args)
+
+    async def publish(self, channel: str, message: Any) -> int:
+        """Publish a message to the channel, return the number of receivers."""
+        return await self.execute('PUBLISH', f'mr-{self.prefix}-{channel}', self._codec.dumps(message))
+
+    async def subscribe(self, channel: str, callback: Callable[[Any], Any]) -> None:
+        """
+        Subscribe the channel on a dedicated connection to the first live node, the same node that publish uses.
+        If the first live node is changed or the connection is lost, all channels will be subscribed again.
+        The callback will be called with every received message, it can be a coroutine function.
+        """
+        if channel in self._subscriptions:
+            return None
+        self._subscriptions[channel] = callback
+        if self._subscriber_lock is None:
+            self._subscriber_lock = Lock()
+        async with self._subscriber_lock:
+            if not await self._connect_subscriber():
+                await self._subscribe_channel(channel)
+        if self._subscriber_watcher is None or self._subscriber_watcher.done():
+            self._subscriber_watcher = ensure_future(self._watch_subscriber())
+
+    async def _connect_subscriber(self) -> bool:
+        """
+        Connect to the first live node and subscribe all channels, if the pub/sub connection is not on it.
+        :return: if a new connection was created, return True.
+        """
+        if self._subscriber is not None and self._subscriber.closed:
+            self.mark_down(self._subscriber_node)
+        node = self.get_node(None)
+        if self._subscriber is not None and not self._subscriber.closed and node == self._subscriber_node:
+            return False
+        if self._subscriber is not None:
+            self._subscriber.close()  # the readers of the old connection will stop.
+            self._subscriber = None
+        try:
+            self._subscriber = await create_connection(node,
+                                                       db=self._db,
+                                                       password=self._password if self._password != '' else None,
+                                                       ssl=self._ssl)
+        except CONNECTION_ERRORS:
+            if not self.mark_down(node):
+                raise
+            return await self._connect_subscriber()
+        self._subscriber_node = node
+        for channel in list(self._subscriptions.keys()):
+            await self._subscribe_channel(channel)
+        return True
+
+    async def _subscribe_channel(self, channel: str) -> None:
+        name = f'mr-{self.prefix}-{channel}'
+        await self._subscriber.execute_pubsub('SUBSCRIBE', name)
+        self._readers[channel] = ensure_future(
+            self._read_channel(self._subscriber.pubsub_channels[name], self._subscriptions[channel])
+        )
+
+    async def _watch_subscriber(self) -> None:
+        """Follow the first live node until all channels are unsubscribed."""
+        while len(self._subscriptions) > 0:
+            await sleep(self.SUBSCRIBER_CHECK_INTERVAL)
+            try:
+                async with self._subscriber_lock:
+                    if len(self._subscriptions) > 0:
+                        await self._connect_subscriber()
+            except CONNECTION_ERRORS:
+                pass  # all nodes are down, try again later.
+
+    async def _read_channel(self, channel: Channel, callback: Callable[[Any], Any]) -> None:
+        """Receive messages from the channel until it is closed."""
+        while await channel.wait_message():
+            message = await channel.get()
+            try:
+                res = callback(self._codec.loads(message))
+                if isawaitable(res):
+                    await res
+            except Exception:
+                print_exc()  # keep listening.
+
+    async def unsubscribe(self, channel: str) -> None:
+        """Unsubscribe the channel."""
+        self._subscriptions.pop(channel, None)
+        task = self._readers.pop(channel, None)
+        if task is not None and self._subscriber is not None and not self._subscriber.closed:
+            await self._subscriber.execute_pubsub('UNSUBSCRIBE', f'mr-{self.prefix}-{channel}')
+            await task
+
+    async def close_subscriber(self) -> None:
+        """Unsubscribe all channels and close the pub/sub connection."""
+        for channel in list(self._subscriptions.keys()):
+            await self.unsubscribe(channel)
+        if self._subscriber_watcher is not None:
+            self._subscriber_watcher.cancel()
+            self._subscriber_watcher = None
+        if self._subscriber is not None:
+            self._subscriber.close()
+            await self._subscriber.wait_closed()
+            self._subscriber = None
+            self._subscriber_node = None
+
+    async def invalidate(self, *keys: str) -> None:
+        """Tell all other instances that subscribe the invalidation channel to drop these keys."""
+        await self.publish(self.INVALIDATION_CHANNEL, (self._instance_id, keys))
+
+    async def add_invalidation_listener(self, callback: Callable[[str], Any], receive_own: bool = False) -> None:
+        """
+        Call the callback with every invalidated key.
+        :param callback: a function that removes the key from the local cache.
+        :param receive_own: receive the invalidation messages published by this instance.
+        """
+        def __on_message(message: Tuple[str, Tuple[str, ...]]) -> None:
+            sender, keys = message
+            if receive_own or sender != self._instance_id:
+                for key in keys:
+                    callback(key)
+
+        await self.subscribe(self.INVALIDATION_CHANNEL, __on_message)
+
     async def test_con(self) -> None:
         key = 'moca_modules_connection_test_key' + get_random_string(32)
         await self.set(key, 0)
@@ -0,0 +1,227 @@
+# -- Imports --------------------------------------------------------------------------
+
+from typing import (
+    Any, List, Tuple, Optional, Callable, Dict
+)
+from asyncio import gather
+from aioredis import ConnectionClosedError, PoolClosedError
+
+# -------------------------------------------------------------------------- Imports --
+
+# -- Variables --------------------------------------------------------------------------
+
+# the node is down, the keys will be moved to the other nodes.
+CONNECTION_ERRORS = (OSError, ConnectionClosedError, PoolClosedError)
+
+# -------------------------------------------------------------------------- Variables --
+
+# -- Moca Redis Pipeline --------------------------------------------------------------------------
+
+
+class MocaRedisPipeline:
+    """
+    Buffer redis commands and send them to the server in one write.
+    The commands are written to one connection without waiting the replies,
+    so N commands cost only one round-trip.
+    If transaction is True, the commands will be wrapped with MULTI/EXEC and executed atomically.
+
+    Usage
+    -----
+    async with redis.pipeline() as pipe:
+        pipe.set('key', 'value', 60)
+        pipe.get('key')
+    print(pipe.results)
+
+    Attributes
+    ----------
+    self._redis: MocaRedis
+        the MocaRedis instance.
+    self._transaction: bool
+        execute the commands in a MULTI/EXEC block.
+    self._commands: List[Tuple[tuple, Optional[Callable[[Any], Any]]]]
+        the buffered commands and the callbacks to convert the replies.
+    self._results: List[Any]
+        the results of the last execution.
+    """
+
+    def __init__(self, redis, transaction: bool = False):
+        """
+        :param redis: the MocaRedis instance.
+        :param transaction: execute the commands in a MULTI/EXEC block.
+        """
+        self._redis = redis
+        self._transaction: bool = transaction
+        self._commands: List[Tuple[tuple, Optional[Callable[[Any], Any]]]] = []
+        self._results: List[Any] = []
+
+    async def __aenter__(self) -> 'MocaRedisPipeline':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            await self.execute()
+        else:
+            self._commands.clear()
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    @property
+    def transaction(self) -> bool:
+        return self._transaction
+
+    @property
+    def results(self) -> List[Any]:
+        return self._results
+
+    def _key(self, key: str) -> str:
+        return f'mr-{self._redis.prefix}-{key}'
+
+    def execute_command(self, command: str, *args, callback: Optional[Callable[[Any], Any]] = None) -> None:
+        """
+        Add a raw redis command to the buffer.
+        :param command: the redis command.
+        :param args: the arguments of the command, the keys must be prefixed already.
+        :param callback: convert the reply, for example loads.
+        """
+        self._commands.append(((command, *args), callback))
+
+    async def execute(self) -> List[Any]:
+        """
+        Send all buffered commands and return the replies in the same order.
+        The commands are grouped by the nodes and every group is sent in one write,
+        if a node is down, its commands will be sent to the next node on the ring.
+        A transaction is sent to the node of the first key, so all keys must have the same hash tag.
+        """
+        commands, self._commands = self._commands, []
+        replies: List[Any] = [None] * len(commands)
+        pending = list(range(len(commands)))
+        while len(pending) > 0:
+            groups: Dict[Tuple[str, int], List[int]] = {}
+            if self._transaction:
+                groups[self._redis.get_node(self._route_key(commands[pending[0]][0]))] = pending
+            else:
+                for index in pending:
+                    groups.setdefault(self._redis.get_node(self._route_key(commands[index][0])), []).append(index)
+            pending = []
+            results = await gather(
+                *[self._send(node, [commands[index][0] for index in indexes]) for node, indexes in groups.items()],
+                return_exceptions=True
+            )
+            for (node, indexes), result in zip(groups.items(), results):
+                if isinstance(result, CONNECTION_ERRORS) and self._redis.mark_down(node):
+                    pending.extend(indexes)
+                elif isinstance(result, BaseException):
+                    raise result
+                else:
+                    for index, reply in zip(indexes, result):
+                        replies[index] = reply
+            pending.sort()
+        results: List[Any] = []
+        for reply, (_, callback) in zip(replies, commands):
+            if isinstance(reply, Exception):
+                raise reply
+            results.append(reply if callback is None else callback(reply))
+        self._results = results
+        return results
+
+    async def _send(self, node: Tuple[str, int], commands: List[tuple]) -> List[Any]:
+        """Write the commands to one connection of the node without waiting the replies."""
+        pool = await self._redis.get_node_pool(node)
+        async with pool.get() as redis:
+            if self._transaction:
+                futures = [redis.execute('MULTI')]
+                futures.extend([redis.execute(*command) for command in commands])
+                futures.append(redis.execute('EXEC'))
+                return (await gather(*futures))[-1]
+            else:
+                replies = await gather(*[redis.execute(*command) for command in commands], return_exceptions=True)
+                for reply in replies:
+                    # a broken connection fails all commands, raise it so the node will be marked down.
+                    if isinstance(reply, CONNECTION_ERRORS):
+                        raise reply
+                return replies
+
+    def _route_key(self, command: tuple) -> Optional[str]:
+        return self._redis.get_route_key(command[0], command[1:])
+
+    def set(self, key: str, value: Any, expiration: int = -1) -> None:
+        if expiration == -1:
+            self.execute_command('SET', self._key(key), self._redis.codec.dumps(value))
+        else:
+            self.execute_command('SETEX', self._key(key), expiration, self._redis.codec.dumps(value))
+
+    def get(self, key: str) -> None:
+        self.execute_command('GET', self._key(key), callback=self._redis.codec.loads)
+
+    def mget(self, keys: List[str]) -> None:
+        self.execute_command('MGET', *[self._key(key) for key in keys],
+                             callback=lambda data: [self._redis.codec.loads(item) for item in data])
+
+    def delete(self, *keys: str) -> None:
+        self.execute_command('DEL', *[self._key(key) for key in keys])
+
+    def expire(self, key: str, expiration: int) -> None:
+        self.execute_command('EXPIRE', self._key(key), expiration)
+
+    def hset_multi(self, key: str, data: Dict[str, Any]) -> None:
+        if len(data) == 0:
+            return None
+        args = []
+        for field, value in data.items():
+            args.append(field)
+            args.append(self._redis.codec.dumps(value))
+        self.execute_command('HSET', self._key(key), *args)
+
+    def hmget(self, key: str, fields: List[str]) -> None:
+        self.execute_command(
+            'HMGET', self._key(key), *fields,
+            callback=lambda data: {field: self._redis.codec.loads(item) for field, item in zip(fields, data)}
+        )
+
+    def hgetall(self, key: str) -> None:
+        self.execute_command(
+            'HGETALL', self._key(key),
+            callback=lambda data: {
+                data[i].decode(): self._redis.codec.loads(data[i + 1]) for i in range(0, len(data), 2)
+            }
+        )
+
+    def rpush(self, key: str, *values: Any) -> None:
+        self.execute_command('RPUSH', self._key(key), *[self._redis.codec.dumps(value) for value in values])
+
+    def lpush(self, key: str, *values: Any) -> None:
+        self.execute_command('LPUSH', self._key(key), *[self._redis.codec.dumps(value) for value in values])
+
+    def rpop(self, key: str) -> None:
+        self.execute_command('RPOP', self._key(key), callback=self._redis.codec.loads)
+
+    def lpop(self, key: str) -> None:
+        self.execute_command('LPOP', self._key(key), callback=self._redis.codec.loads)
+
+    def lrange(self, key: str, start: int, end: int) -> None:
+        self.execute_command('LRANGE', self._key(key), start, end,
+                             callback=lambda data: [self._redis.codec.loads(item) for item in data])
+
+    def lindex(self, key: str, index: int) -> None:
+        self.execute_command('LINDEX', self._key(key), index, callback=self._redis.codec.loads)
+
+    def llen(self, key: str) -> None:
+        self.execute_command('LLEN', self._key(key))
+
+    def ltrim(self, key: str, start: int, end: int) -> None:
+        self.execute_command('LTRIM', self._key(key), start, end)
+
+    def increment(self, key: str) -> None:
+        self.execute_command('INCR', self._key(key))
+
+    def increment_by(self, key: str, value: int) -> None:
+        self.execute_command('INCRBY', self._key(key), value)
+
+    def decrement(self, key: str) -> None:
+        self.execute_command('DECR', self._key(key))
+
+    def decrement_by(self, key: str, value: int) -> None:
+        self.execute_command('DECRBY', self._key(key), value)
+
+# -------------------------------------------------------------------------- Moca Redis Pipeline --
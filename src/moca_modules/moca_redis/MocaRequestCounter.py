@@ -0,0 +1,130 @@
+# -- Imports --------------------------------------------------------------------------
+
+from typing import (
+    Optional, Dict, List, Tuple
+)
+from time import time
+from .MocaRedis import MocaRedis
+
+# -------------------------------------------------------------------------- Imports --
+
+# -- Variables --------------------------------------------------------------------------
+
+# KEYS[1..n-1]: the counters of the previous buckets, KEYS[n]: the counter of the current bucket.
+# ARGV[1]: expiry time of the current bucket (seconds), ARGV[2]: threshold, ARGV[3..]: key, count, key, count, ...
+# return the keys over the threshold and the totals. {key, total, key, total, ...}
+SLIDING_COUNTER_SCRIPT: str = """
+local n = #KEYS
+local threshold = tonumber(ARGV[2])
+local over = {}
+for i = 3, #ARGV, 2 do
+    local total = redis.call('HINCRBY', KEYS[n], ARGV[i], tonumber(ARGV[i + 1]))
+    for j = 1, n - 1 do
+        total = total + tonumber(redis.call('HGET', KEYS[j], ARGV[i]) or '0')
+    end
+    if total > threshold then
+        over[#over + 1] = ARGV[i]
+        over[#over + 1] = total
+    end
+end
+redis.call('EXPIRE', KEYS[n], tonumber(ARGV[1]))
+return over
+"""
+
+# -------------------------------------------------------------------------- Variables --
+
+# -- Moca Request Counter --------------------------------------------------------------------------
+
+
+class MocaRequestCounter:
+    """
+    A sliding-window request counter shared by all workers.
+    The window is split into some buckets (a ring buffer), the total of a key is the sum of the buckets in the window.
+    hit only increments a local counter, so it doesn't need any network I/O,
+    flush sends the local counters to redis in one lua script call, and returns the keys over the threshold.
+    The buckets are saved in redis, so the totals are aggregated across all workers and nodes.
+    If redis is None, the buckets are saved in this process.
+
+    Attributes
+    ----------
+    self._redis: Optional[MocaRedis]
+        the redis database to save the buckets.
+    self._name: str
+        the prefix of the bucket keys, it is the hash tag of the keys. ('{name}-<bucket index>')
+    self._bucket_size: int
+        the size of a bucket (seconds).
+    self._buckets: int
+        the number of the buckets in the window.
+    self._pending: Dict[str, int]
+        the local counters that are not flushed.
+    self._local: Dict[int, Dict[str, int]]
+        the buckets, only used when redis is None. {bucket index: {key: count}}
+    """
+
+    def __init__(self, redis: Optional[MocaRedis] = None, name: str = 'request-counter',
+                 window: int = 5, buckets: int = 5):
+        """
+        :param redis: the redis database to save the buckets, None means in-process buckets.
+        :param name: the prefix of the bucket keys.
+        :param window: the size of the sliding window (seconds).
+        :param buckets: the number of the buckets in the window.
+        """
+        self._redis: Optional[MocaRedis] = redis
+        self._name: str = name
+        self._buckets: int = max(1, buckets)
+        self._bucket_size: int = max(1, window // self._buckets)
+        self._pending: Dict[str, int] = {}
+        self._local: Dict[int, Dict[str, int]] = {}
+
+    @property
+    def window(self) -> int:
+        return self._bucket_size * self._buckets
+
+    def hit(self, key: str) -> None:
+        """Count a request."""
+        try:
+            self._pending[key] += 1
+        except KeyError:
+            self._pending[key] = 1
+
+    async def flush(self, threshold: int) -> List[Tuple[str, int]]:
+        """
+        Add the local counters to the current bucket.
+        :param threshold: return the keys that the total in the window is bigger than this value.
+        :return: [(key, total), ...] the keys over the threshold, only the keys counted by this worker are checked.
+        """
+        if len(self._pending) == 0:
+            return []
+        pending, self._pending = self._pending, {}
+        index = int(time()) // self._bucket_size
+        if self._redis is None:
+            return self._flush_local(index, pending, threshold)
+        # the hash tag keeps all buckets on the same redis node, the script is routed by the oldest bucket.
+        keys = [f'{{{self._name}}}-{item}' for item in range(index - self._buckets + 1, index + 1)]
+        args = [self.window + self._bucket_size, threshold]
+        for key, count in pending.items():
+            args.append(key)
+            args.append(count)
+        result = await self._redis.run_script(SLIDING_COUNTER_SCRIPT, keys, args)
+        return [
+            (key.decode() if isinstance(key, bytes) else key, int(total))
+            for key, total in zip(result[::2], result[1::2])
+        ]
+
+    def _flush_local(self, index: int, pending: Dict[str, int], threshold: int) -> List[Tuple[str, int]]:
+        for item in [item for item in self._local if item <= index - self._buckets]:
+            del self._local[item]
+        current = self._local.setdefault(index, {})
+        over = []
+        for key, count in pending.items():
+            current[key] = current.get(key, 0) + count
+            total = sum(bucket.get(key, 0) for bucket in self._local.values())
+            if total > threshold:
+                over.append((key, total))
+        return over
+
+    def clear(self) -> None:
+        self._pending.clear()
+        self._local.clear()
+
+# -------------------------------------------------------------------------- Moca Request Counter --
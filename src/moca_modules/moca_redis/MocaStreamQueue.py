@@ -0,0 +1,295 @@
+# -- Imports --------------------------------------------------------------------------
+
+from typing import (
+    Any, List, Tuple, Optional, Callable
+)
+from asyncio import Event
+from inspect import isawaitable
+from traceback import format_exc
+from time import time
+from aioredis import ReplyError
+from .MocaRedis import MocaRedis
+
+# -------------------------------------------------------------------------- Imports --
+
+# -- Variables --------------------------------------------------------------------------
+
+# KEYS[1]: the stream, KEYS[2]: the dedupe key of the job.
+# ARGV[1]: dedupe ttl, ARGV[2]: max length of the stream, ARGV[3]: job id, ARGV[4]: data,
+# ARGV[5]: the prefix of the dedupe keys.
+# return the message id, or false if the job is already in the queue.
+# the dedupe keys of the trimmed entries and of the failed XADD are deleted, so these jobs can be enqueued again.
+ENQUEUE_SCRIPT: str = """
+if not redis.call('SET', KEYS[2], '1', 'NX', 'EX', ARGV[1]) then
+    return false
+end
+local id = redis.pcall('XADD', KEYS[1], '*', 'job', ARGV[3], 'data', ARGV[4])
+if type(id) == 'table' and id['err'] then
+    redis.call('DEL', KEYS[2])
+    return id
+end
+local over = redis.call('XLEN', KEYS[1]) - tonumber(ARGV[2])
+if over > 0 then
+    for _, entry in ipairs(redis.call('XRANGE', KEYS[1], '-', '+', 'COUNT', over)) do
+        local fields = entry[2]
+        for i = 1, #fields, 2 do
+            if fields[i] == 'job' then
+                redis.call('DEL', ARGV[5] .. fields[i + 1])
+            end
+        end
+        redis.call('XDEL', KEYS[1], entry[1])
+    end
+end
+return id
+"""
+# -------------------------------------------------------------------------- Variables --
+
+# -- Moca Stream Queue --------------------------------------------------------------------------
+
+
+class MocaStreamQueue:
+    """
+    A distributed job queue based on redis streams and consumer groups.
+    A job id can be in the queue only once, until it is acknowledged, trimmed or moved to the dead-letter stream.
+    Any number of consumers on any node can read from the same group, every message is delivered to one consumer.
+    If a consumer dies before acknowledging, the message will be claimed by another consumer after claim_idle seconds.
+    The message delivered more than max_deliveries times will be moved to the dead-letter stream.
+
+    Attributes
+    ----------
+    self._redis: MocaRedis
+        the redis database.
+    self._name: str
+        the name of the queue.
+    self._group: str
+        the name of the consumer group.
+    self._max_deliveries: int
+        the message delivered more than this value will be moved to the dead-letter stream.
+    self._claim_idle: int
+        claim the pending messages that are not acknowledged in this seconds.
+    self._dedupe_ttl: int
+        the max lifetime of the dedupe key, a job can be enqueued again after this seconds even if it is not finished.
+    self._max_length: int
+        the max length of the stream, the oldest entries will be removed.
+    """
+
+    def __init__(
+            self,
+            redis: MocaRedis,
+            name: str,
+            group: str = 'workers',
+            max_deliveries: int = 5,
+            claim_idle: int = 600,
+            dedupe_ttl: int = 86400,
+            max_length: int = 100000
+    ):
+        """
+        :param redis: the redis database.
+        :param name: the name of the queue.
+        :param group: the name of the consumer group.
+        :param max_deliveries: the message delivered more than this value will be moved to the dead-letter stream.
+        :param claim_idle: claim the pending messages that are not acknowledged in this seconds.
+        :param dedupe_ttl: the max lifetime of the dedupe key.
+        :param max_length: the max length of the stream, the oldest entries will be removed.
+        """
+        self._redis: MocaRedis = redis
+        self._name: str = name
+        self._group: str = group
+        self._max_deliveries: int = max_deliveries
+        self._claim_idle: int = claim_idle
+        self._dedupe_ttl: int = dedupe_ttl
+        self._max_length: int = max_length
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def group(self) -> str:
+        return self._group
+
+    @property
+    def stream(self) -> str:
+        # all keys of a queue have the same hash tag, so they are on the same redis node.
+        return f'stream-{{{self._name}}}'
+
+    @property
+    def dead_stream(self) -> str:
+        return f'stream-{{{self._name}}}-dead'
+
+    def _key(self, key: str) -> str:
+        return f'mr-{self._redis.prefix}-{key}'
+
+    def _job_key(self, job_id: str) -> str:
+        return f'stream-{{{self._name}}}-job-{job_id}'
+
+    async def create_group(self) -> None:
+        """Create the stream and the consumer group if not exists."""
+        try:
+            await self._redis.execute('XGROUP', 'CREATE', self._key(self.stream), self._group, '0', 'MKSTREAM')
+        except ReplyError as e:
+            if not str(e).startswith('BUSYGROUP'):
+                raise
+
+    async def enqueue(self, job_id: str, data: Any = None) -> Optional[str]:
+        """
+        Add a job to the queue.
+        :param job_id: the unique id of the job.
+        :param data: the data of the job.
+        :return: the message id, if the job is already in the queue, return None.
+        """
+        res = await self._redis.run_script(
+            ENQUEUE_SCRIPT,
+            [self.stream, self._job_key(job_id)],
+            [self._dedupe_ttl, self._max_length, job_id, self._redis.codec.dumps(data), self._key(self._job_key(''))]
+        )
+        return None if res is None else res.decode()
+
+    async def read(self, consumer: str, count: int = 1, block: int = 5000) -> List[Tuple[str, str, Any]]:
+        """
+        Read the jobs, the stale pending jobs of the dead consumers will be returned first.
+        :param consumer: the name of this consumer, must be unique in the group.
+        :param count: the max number of jobs.
+        :param block: wait the new jobs for this milliseconds, 0 means don't wait.
+        :return: [(message id, job id, data), ...]
+        """
+        jobs = await self.claim(consumer, count)
+        if len(jobs) > 0:
+            return jobs
+        args = ['XREADGROUP', 'GROUP', self._group, consumer, 'COUNT', count]
+        if block > 0:
+            args.extend(('BLOCK', block))
+        res = await self._redis.execute(*args, 'STREAMS', self._key(self.stream), '>')
+        if res is None:
+            return []
+        return [self._parse(message) for _, messages in res for message in messages]
+
+    async def claim(self, consumer: str, count: int = 10) -> List[Tuple[str, str, Any]]:
+        """
+        Claim the pending jobs that are not acknowledged in claim_idle seconds.
+        The jobs delivered too many times will be moved to the dead-letter stream.
+        :return: [(message id, job id, data), ...]
+        """
+        pending = await self._redis.execute(
+            'XPENDING', self._key(self.stream), self._group, '-', '+', count
+        )
+        ids, dead = [], []
+        for message_id, _, idle, deliveries in pending:
+            if idle >= self._claim_idle * 1000:
+                (dead if deliveries >= self._max_deliveries else ids).append(message_id)
+        jobs: List[Tuple[str, str, Any]] = []
+        for target in (ids, dead):
+            if len(target) == 0:
+                continue
+            res = await self._redis.execute(
+                'XCLAIM', self._key(self.stream), self._group, consumer, self._claim_idle * 1000, *target
+            )
+            claimed = set()
+            for message in res:
+                if message is None or message[1] is None:  # trimmed, the dedupe key was deleted by the enqueue script.
+                    continue
+                job = self._parse(message)
+                claimed.add(job[0])
+                if target is dead:
+                    await self.bury(*job, 'too many deliveries.')
+                else:
+                    jobs.append(job)
+            trimmed = [item for item in target if (item.decode() if isinstance(item, bytes) else item) not in claimed]
+            if len(trimmed) > 0:
+                # remove the trimmed entries from the pending list, or they will be claimed forever.
+                await self._redis.execute('XACK', self._key(self.stream), self._group, *trimmed)
+        return jobs
+
+    async def ack(self, message_id: str, job_id: str) -> None:
+        """The job is finished, remove it from the pending list and allow to enqueue it again."""
+        pipe = self._redis.transaction()
+        pipe.execute_command('XACK', self._key(self.stream), self._group, message_id)
+        pipe.execute_command('XDEL', self._key(self.stream), message_id)
+        pipe.delete(self._job_key(job_id))
+        await pipe.execute()
+
+    async def bury(self, message_id: str, job_id: str, data: Any, reason: str = '') -> None:
+        """Move the job to the dead-letter stream."""
+        pipe = self._redis.transaction()
+        pipe.execute_command(
+            'XADD', self._key(self.dead_stream), 'MAXLEN', '~', self._max_length, '*',
+            'job', job_id, 'data', self._redis.codec.dumps(data), 'reason', reason, 'time', str(time())
+        )
+        pipe.execute_command('XACK', self._key(self.stream), self._group, message_id)
+        pipe.execute_command('XDEL', self._key(self.stream), message_id)
+        pipe.delete(self._job_key(job_id))
+        await pipe.execute()
+
+    async def get_dead_letters(self, count: int = 100) -> List[Tuple[str, str, Any, str]]:
+        """Return the dead jobs. [(message id, job id, data, reason), ...]"""
+        res = await self._redis.execute('XRANGE', self._key(self.dead_stream), '-', '+', 'COUNT', count)
+        jobs = []
+        for message in res:
+            message_id, job_id, data = self._parse(message)
+            fields = message[1]
+            jobs.append((message_id, job_id, data, fields[fields.index(b'reason') + 1].decode()))
+        return jobs
+
+    async def requeue_dead_letters(self, count: int = 100) -> int:
+        """Move the dead jobs back to the queue, return the number of the enqueued jobs."""
+        enqueued = 0
+        for message_id, job_id, data, _ in await self.get_dead_letters(count):
+            if await self.enqueue(job_id, data) is not None:
+                enqueued += 1
+            await self._redis.execute('XDEL', self._key(self.dead_stream), message_id)
+        return enqueued
+
+    async def length(self) -> int:
+        return await self._redis.execute('XLEN', self._key(self.stream))
+
+    async def pending_count(self) -> int:
+        return (await self._redis.execute('XPENDING', self._key(self.stream), self._group))[0]
+
+    async def consume(
+            self,
+            consumer: str,
+            handler: Callable[[str, Any], Any],
+            count: int = 1,
+            block: int = 5000,
+            stop: Optional[Event] = None,
+    ) -> None:
+        """
+        Read and handle the jobs until the stop event is set.
+        If the handler raises an exception, the job will stay in the pending list and will be retried after
+        claim_idle seconds, the job failed max_deliveries times will be moved to the dead-letter stream.
+        :param consumer: the name of this consumer, must be unique in the group.
+        :param handler: handler(job id, data), can be a coroutine function.
+        :param count: the max number of jobs read at once.
+        :param block: wait the new jobs for this milliseconds.
+        :param stop: stop consuming when this event is set.
+        """
+        await self.create_group()
+        while stop is None or not stop.is_set():
+            for message_id, job_id, data in await self.read(consumer, count, block):
+                try:
+                    res = handler(job_id, data)
+                    if isawaitable(res):
+                        await res
+                except Exception:
+                    deliveries = await self._get_deliveries(message_id)
+                    if deliveries >= self._max_deliveries:
+                        await self.bury(message_id, job_id, data, format_exc())
+                else:
+                    await self.ack(message_id, job_id)
+
+    async def _get_deliveries(self, message_id: str) -> int:
+        res = await self._redis.execute(
+            'XPENDING', self._key(self.stream), self._group, message_id, message_id, 1
+        )
+        return res[0][3] if len(res) > 0 else 0
+
+    def _parse(self, message: list) -> Tuple[str, str, Any]:
+        message_id, fields = message
+        fields = dict(zip(fields[::2], fields[1::2]))
+        return (
+            message_id.decode() if isinstance(message_id, bytes) else message_id,
+            fields[b'job'].decode(),
+            self._redis.codec.loads(fields[b'data'])
+        )
+
+# -------------------------------------------------------------------------- Moca Stream Queue --
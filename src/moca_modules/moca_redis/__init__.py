@@ -1,6 +1,11 @@
 # -- Imports --------------------------------------------------------------------------
 
 from .MocaRedis import MocaRedis
+from .MocaRedisPipeline import MocaRedisPipeline
+from .MocaHashRing import MocaHashRing
+from .MocaRateLimiter import MocaRateLimiter
+from .MocaRequestCounter import MocaRequestCounter
+from .MocaStreamQueue import MocaStreamQueue
 from .utils import test_redis_connection
 
 # -------------------------------------------------------------------------- Imports --
@@ -14,4 +19,6 @@ redis
     The Python interface to the Redis key-value store.
 aioredis
     asyncio (PEP 3156) Redis client library.
+limits
+    Rate limiting utilities
 """
\ No newline at end of file
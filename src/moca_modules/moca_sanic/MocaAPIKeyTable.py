@@ -0,0 +1,151 @@
+# -- Imports --------------------------------------------------------------------------
+
+from typing import (
+    Any, Dict, List, Tuple, Optional, FrozenSet
+)
+from ..moca_redis import MocaRateLimiter
+
+# -------------------------------------------------------------------------- Imports --
+
+# -- Moca Prefix Trie --------------------------------------------------------------------------
+
+
+class MocaPrefixTrie:
+    """
+    A character trie to find the prefixes of a string.
+    If some prefixes match, the prefix added first is returned, like checking the prefixes with startswith in order.
+
+    Attributes
+    ----------
+    self._root: list
+        the root node. [children, (index, prefix, value) or None]
+    self._size: int
+        the number of the prefixes.
+    """
+
+    def __init__(self):
+        self._root: list = [{}, None]
+        self._size: int = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, prefix: str, value: Any = None) -> None:
+        """Add a prefix, if the prefix is already added, the first value is kept."""
+        node = self._root
+        for char in prefix:
+            node = node[0].setdefault(char, [{}, None])
+        if node[1] is None:
+            node[1] = (self._size, prefix, value)
+            self._size += 1
+
+    def find(self, text: str) -> Optional[Tuple[str, Any]]:
+        """Return (prefix, value) of the first added prefix of the text, if not found, return None."""
+        node = self._root
+        found = node[1]
+        for char in text:
+            node = node[0].get(char)
+            if node is None:
+                break
+            if node[1] is not None and (found is None or node[1][0] < found[0]):
+                found = node[1]
+        return None if found is None else found[1:]
+
+# -------------------------------------------------------------------------- Moca Prefix Trie --
+
+# -- Moca API Key --------------------------------------------------------------------------
+
+
+class MocaAPIKey:
+    """
+    A compiled api key.
+
+    Attributes
+    ----------
+    self.key: str
+        the api key.
+    self.status: bool
+        the api key is online.
+    self.rate: Optional[Tuple[Tuple[int, int], ...]]
+        the parsed rate limits of the key, None means unlimited.
+    self.paths: MocaPrefixTrie
+        the allowed paths, the value is the parsed rate limits of the path or None.
+    self.ips: Optional[FrozenSet[str]]
+        the allowed ip addresses, None means all ip addresses.
+    self.headers: Tuple[Tuple[str, Any], ...]
+        the required headers.
+    self.args: Tuple[Tuple[str, Any], ...]
+        the required arguments.
+    self.delay: float
+        delay the response.
+    """
+
+    __slots__ = ('key', 'status', 'rate', 'paths', 'ips', 'headers', 'args', 'delay')
+
+    def __init__(self, info: Dict[str, Any]):
+        """
+        :param info: the api key information in the api key config file.
+        """
+        self.key: str = info.get('key')
+        self.status: bool = bool(info.get('status', False))
+        rate = info.get('rate')
+        self.rate: Optional[Tuple[Tuple[int, int], ...]] = None if rate in (None, '*') else MocaRateLimiter.parse(rate)
+        self.paths: MocaPrefixTrie = MocaPrefixTrie()
+        for path_info in info.get('allowed_path', []):
+            if ':' in path_info:
+                path, path_rate = path_info.split(':', 1)
+            else:
+                path, path_rate = path_info, '*'
+            self.paths.add(path, None if path_rate == '*' else MocaRateLimiter.parse(path_rate))
+        ips = info.get('ip', '*')
+        self.ips: Optional[FrozenSet[str]] = None if ips == '*' else frozenset(ips)
+        required = info.get('required', {})
+        self.headers: Tuple[Tuple[str, Any], ...] = tuple(required.get('headers', {}).items())
+        self.args: Tuple[Tuple[str, Any], ...] = tuple(required.get('args', {}).items())
+        self.delay: float = info.get('delay', 0)
+
+# -------------------------------------------------------------------------- Moca API Key --
+
+# -- Moca API Key Table --------------------------------------------------------------------------
+
+
+class MocaAPIKeyTable:
+    """
+    The compiled api key config.
+    The table is rebuilt only when the api key list is changed, so authorizing a request only needs some dict lookups.
+
+    Attributes
+    ----------
+    self._source: Optional[list]
+        the api key list that the table was built from.
+    self._keys: Dict[str, MocaAPIKey]
+        the compiled api keys.
+    """
+
+    def __init__(self, items: Optional[List[Dict[str, Any]]] = None):
+        """
+        :param items: the api key list.
+        """
+        self._source: Optional[list] = None
+        self._keys: Dict[str, MocaAPIKey] = {}
+        if items is not None:
+            self.update(items)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def update(self, items: Optional[List[Dict[str, Any]]]) -> None:
+        """Rebuild the table if the api key list is changed. if the same key is defined twice, the first one is used."""
+        if items is self._source:
+            return None
+        keys: Dict[str, MocaAPIKey] = {}
+        for info in items or []:
+            if isinstance(info, dict) and info.get('key') is not None and info['key'] not in keys:
+                keys[info['key']] = MocaAPIKey(info)
+        self._keys = keys
+        self._source = items
+
+    def get(self, key: str) -> Optional[MocaAPIKey]:
+        return self._keys.get(key)
+
+# -------------------------------------------------------------------------- Moca API Key Table --
@@ -0,0 +1,160 @@
+# -- Imports --------------------------------------------------------------------------
+
+from typing import (
+    Any, Dict, Tuple, Optional
+)
+from sanic.request import Request
+from sanic.exceptions import InvalidUsage
+from json import JSONDecodeError
+try:
+    from ujson import loads
+except (ImportError, ModuleNotFoundError):
+    from json import loads
+from ..moca_utils import try_to_bool, validate_argument
+from ..moca_el_command import el_command_parser
+
+# -------------------------------------------------------------------------- Imports --
+
+# -- Variables --------------------------------------------------------------------------
+
+# the sources of the arguments, in the order of the lookup.
+ARGUMENT_SOURCES: Tuple[str, ...] = ('json', 'args', 'form', 'header', 'file', 'cookie')
+
+# -------------------------------------------------------------------------- Variables --
+
+# -- Moca Request Args --------------------------------------------------------------------------
+
+
+class MocaRequestArgs:
+    """
+    A view of the arguments of a request, it is built once per request and cached in request.ctx.args.
+    The json body is parsed only once, and the raw value of every key is cached,
+    so the same key is never looked up twice.
+    The values like '[el]#...#' are executed by el_command_parser only when allow_el_command is True.
+
+    Attributes
+    ----------
+    self._request: Request
+        the request.
+    self._json: Optional[dict]
+        the json body, None means it is not parsed yet.
+    self._values: Dict[Tuple[str, str], Any]
+        the cached raw values. {(key, source): value}
+    self._allow_el_command: bool
+        parse the el commands in the string arguments.
+    """
+
+    __slots__ = ('_request', '_json', '_values', '_allow_el_command')
+
+    def __init__(self, request: Request, allow_el_command: bool = False):
+        """
+        :param request: the request.
+        :param allow_el_command: parse the el commands in the string arguments.
+        """
+        self._request: Request = request
+        self._json: Optional[dict] = None
+        self._values: Dict[Tuple[str, str], Any] = {}
+        self._allow_el_command: bool = allow_el_command
+
+    @classmethod
+    def of(cls, request: Request) -> 'MocaRequestArgs':
+        """Return the cached view of the request, create it if the request doesn't have it."""
+        try:
+            return request.ctx.args
+        except AttributeError:
+            request.ctx.args = view = cls(request)
+            return view
+
+    @property
+    def json(self) -> dict:
+        if self._json is None:
+            try:
+                self._json = self._request.json if isinstance(self._request.json, dict) else {}
+            except InvalidUsage:
+                self._json = {}
+        return self._json
+
+    def _get_from(self, key: str, source: str) -> Any:
+        if source == 'json':
+            return self.json.get(key)
+        elif source == 'args':
+            return self._request.args.get(key)
+        elif source == 'form':
+            return self._request.form.get(key)
+        elif source == 'header':
+            return self._request.headers.get(key.upper().replace('_', '-'))
+        elif source == 'file':
+            return self._request.files.get(key)
+        elif source == 'cookie':
+            return self._request.cookies.get(key)
+        else:
+            raise ValueError('form_ argument is only supported  (all, json, args, form, header, file)')
+
+    def get_raw(self, key: str, from_: str = 'all') -> Any:
+        """
+        Return the raw value of the key.
+        :param key: the key, some keys can be separated by '|', the first found value is returned.
+        :param from_: the source of the value. (all, json, args, form, header, file, cookie)
+        """
+        try:
+            return self._values[(key, from_)]
+        except KeyError:
+            pass
+        data = None
+        sources = ARGUMENT_SOURCES if from_ == 'all' else (from_,)
+        for __key in key.split('|'):
+            for source in sources:
+                data = self._get_from(__key, source)
+                if data is not None:
+                    break
+            if data is not None:
+                break
+        if self._allow_el_command and type(data) is str:
+            status, value = el_command_parser(data)
+            if status:
+                data = value
+        self._values[(key, from_)] = data
+        return data
+
+    def get(self, key: str, type_: Any = None, default: Any = None,
+            validate: Optional[dict] = None, from_: str = 'all') -> Any:
+        """
+        Return the value of the key.
+        :param key: the key, some keys can be separated by '|', the first found value is returned.
+        :param type_: the type of the value, if the value is a string, try to convert it.
+        :param default: if can't found the value, or the value is invalid, return default value.
+        :param validate: the value will be passed to validate_argument function.
+        :param from_: the source of the value. (all, json, args, form, header, file, cookie)
+        """
+        data = self.get_raw(key, from_)
+        if validate is not None and not validate_argument(data, **validate):
+            return default
+        if type_ is None or type_ is any:
+            return data
+        elif type(data) is type_:
+            return data
+        elif type(data) is str and type_ is int:  # str to int
+            try:
+                return int(data)
+            except (ValueError, TypeError):
+                return default
+        elif (type(data) is int or type(data) is float) and type_ is str:  # int to str, float to str
+            return str(data)
+        elif type(data) is str and type_ is list:  # str to list
+            try:
+                data = loads(data)
+                return data if type(data) is list else default
+            except (ValueError, TypeError, JSONDecodeError):
+                return default
+        elif type(data) is str and type_ is dict:  # str to dict
+            try:
+                data = loads(data)
+                return data if type(data) is dict else default
+            except (ValueError, TypeError, JSONDecodeError):
+                return default
+        elif type(data) is str and type_ is bool:
+            return try_to_bool(data)
+        else:
+            return default
+
+# -------------------------------------------------------------------------- Moca Request Args --
@@ -2,6 +2,8 @@
 
 from .utils import get_remote_address, get_args, write_cookie
 from .MocaSanic import MocaSanic
+from .MocaAPIKeyTable import MocaAPIKeyTable, MocaAPIKey, MocaPrefixTrie
+from .MocaRequestArgs import MocaRequestArgs
 
 # -------------------------------------------------------------------------- Imports --
 
@@ -6,9 +6,7 @@ from typing import (
 from functools import partial
 from sanic.request import Request
 from sanic.response import HTTPResponse
-from sanic.exceptions import InvalidUsage
 from datetime import datetime
-from json import JSONDecodeError
 try:
     from ujson import dumps, loads
 except (ImportError, ModuleNotFoundError):
@@ -17,78 +15,10 @@ except (ImportError, ModuleNotFoundError):
     # This is done in order to ensure that the JSON response is
     # kept consistent across both ujson and inbuilt json usage.
     dumps = partial(__dumps, separators=(",", ":"))
-from ..moca_utils import try_to_bool, validate_argument
-from ..moca_el_command import el_command_parser
+from .MocaRequestArgs import MocaRequestArgs
 
 # -------------------------------------------------------------------------- Imports --
 
-# -- Private Functions --------------------------------------------------------------------------
-
-
-def __get_param(json_data: dict, request: Request, key: str,
-                type_: Any = None, default: Any = None, validate: Optional[dict] = None, from_: str = 'all') -> Any:
-    for __key in key.split('|'):
-        if from_ == 'all':
-            data = json_data.get(
-                __key,
-                request.args.get(__key,
-                                 request.form.get(__key,
-                                                  request.headers.get(__key.upper().replace('_', '-'),
-                                                                      request.files.get(__key,
-                                                                                        request.cookies.get(__key)))))
-            )
-        elif from_ == 'json':
-            data = json_data.get(__key)
-        elif from_ == 'args':
-            data = request.args.get(__key)
-        elif from_ == 'form':
-            data = request.form.get(__key)
-        elif from_ == 'header':
-            data = request.headers.get(__key.upper().replace('_', '-'))
-        elif from_ == 'file':
-            data = request.files.get(__key)
-        elif from_ == 'cookie':
-            data = request.cookies.get(__key)
-        else:
-            raise ValueError('form_ argument is only supported  (all, json, args, form, header, file)')
-        if data is not None:
-            break
-    if type(data) is str:
-        status, value = el_command_parser(data)
-        if status:
-            data = value
-    if validate is not None and not validate_argument(data, **validate):
-        return default
-    if type_ is None or type_ is any:
-        return data
-    elif type(data) is type_:
-        return data
-    elif type(data) is str and type_ is int:  # str to int
-        try:
-            return int(data)
-        except (ValueError, TypeError):
-            return default
-    elif (type(data) is int or type(data) is float) and type_ is str:  # int to str, float to str
-        return str(data)
-    elif type(data) is str and type_ is list:  # str to list
-        try:
-            data = loads(data)
-            return data if type(data) is list else default
-        except (ValueError, TypeError, JSONDecodeError):
-            return default
-    elif type(data) is str and type_ is dict:  # str to dict
-        try:
-            data = loads(data)
-            return data if type(data) is dict else default
-        except (ValueError, TypeError, JSONDecodeError):
-            return default
-    elif type(data) is str and type_ is bool:
-        return try_to_bool(data)
-    else:
-        return default
-
-# -------------------------------------------------------------------------- Private Functions --
-
 # -- Utils --------------------------------------------------------------------------
 
 
@@ -97,7 +27,7 @@ def get_remote_address(request: Request) -> str:
     return request.remote_addr if request.remote_addr != '' else request.ip
 
 
-def get_args(request: Request, *args, from_: str = 'all') -> Tuple:
+def get_args(request: Request, *args, from_: str = 'all', allow_el_command: bool = False) -> Tuple:
     """
     Get arguments.
     if args is a string, use this value as the key.
@@ -112,15 +42,12 @@ def get_args(request: Request, *args, from_: str = 'all') -> Tuple:
                                             'max_length': 32,
                                          }
     The value of from_ argument can be (all, json, args, form, header, file, cookie)
+    The arguments are read from the cached view in request.ctx.args, so the request is parsed only once.
+    If allow_el_command is True, the el commands in the string arguments are executed, don't use it for public APIs.
     """
-    try:
-        json_data = request.json if isinstance(request.json, dict) else {}
-    except InvalidUsage:
-        json_data = {}
-    return tuple([__get_param(json_data, request, key, from_=from_) if isinstance(key, str) else
-                  __get_param(json_data, request, key[0], key[1], from_=from_) if len(key) == 2 else
-                  __get_param(json_data, request, key[0], key[1], key[2], from_=from_) if len(key) == 3 else
-                  __get_param(json_data, request, key[0], key[1], key[2], key[3], from_=from_) for key in args])
+    view = MocaRequestArgs(request, True) if allow_el_command else MocaRequestArgs.of(request)
+    return tuple([view.get(key, from_=from_) if isinstance(key, str) else
+                  view.get(*key, from_=from_) for key in args])
 
 
 def write_cookie(
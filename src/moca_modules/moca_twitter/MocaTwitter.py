@@ -72,6 +72,9 @@ class MocaTwitter:
     def get_user_info(self, screen_name: str) -> dict:
         return self._api.get_user(screen_name)._json
 
+    def get_user_info_by_id(self, user_id: int) -> dict:
+        return self._api.get_user(user_id=user_id)._json
+
     def save_all_tweets_to_file(
             self,
             screen_name: str,
@@ -18,8 +18,12 @@ from .moca_utils import (
     try_to_obj, parser_str, en_faker, jp_faker, zh_faker, validate_argument, is_file, is_dir, get_text_from_url,
     aio_get_text_from_url, print_table, remove_extension, all_ascii, all_alnum, all_alpha, all_numeric,
     have_alnum, have_alpha, have_ascii, have_numeric, create_tor_deny_config_for_nginx, pm, pl, resize_img,
+    get_img_format, is_img_format_supported, save_resized_img,
     get_my_public_ip, get_my_public_ip_v6, get_my_public_ip_v4, update_use_github, update_moca_modules
 )
+from .moca_codec import (
+    MocaCodec, DEFAULT_CODEC, get_codec, register_serializer, register_compressor, get_serializers, get_compressors
+)
 from .moca_centos_utils import (  # The functions in this file, Only supports CentOS 8 and RHEL 8.
     get_centos_cpu_info, get_centos_cpu_model_name, get_centos_cpu_vendor_id, get_centos_cpu_cores,
     get_centos_cpu_cache_size, get_centos_cpu_mhz, get_centos_ssh_login_log, get_centos_accepted_ssh_login_log,
@@ -71,4 +75,12 @@ prettytable
     A simple Python library for easily displaying tabular data in a visually appealing ASCII table format
 Pillow
     The friendly PIL fork (Python Imaging Library)
+pillow-avif-plugin
+    A pillow plugin that adds avif support (optional)
+orjson
+    Fast, correct Python JSON library supporting dataclasses, datetimes, and numpy (optional codec)
+msgpack
+    MessagePack serializer (optional codec)
+brotli
+    Brotli compression format (optional codec)
 """
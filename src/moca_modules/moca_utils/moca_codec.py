@@ -0,0 +1,255 @@
+# -- Imports --------------------------------------------------------------------------
+
+from typing import (
+    Any, Callable, Dict, Tuple, Optional, List
+)
+try:
+    from cloudpickle import dumps as p_dumps, loads as p_loads
+except (ImportError, ModuleNotFoundError):
+    from pickle import dumps as p_dumps, loads as p_loads
+from gzip import compress as gzip_compress, decompress as gzip_decompress
+from zlib import compress as zlib_compress, decompress as zlib_decompress
+from lzma import compress as lzma_compress, decompress as lzma_decompress
+from functools import partial
+try:
+    from orjson import dumps as orjson_dumps, loads as orjson_loads
+except (ImportError, ModuleNotFoundError):
+    orjson_dumps = orjson_loads = None
+try:
+    from msgpack import packb, unpackb
+except (ImportError, ModuleNotFoundError):
+    packb = unpackb = None
+try:
+    from brotli import compress as brotli_compress, decompress as brotli_decompress
+except (ImportError, ModuleNotFoundError):
+    brotli_compress = brotli_decompress = None
+
+# -------------------------------------------------------------------------- Imports --
+
+# -- Variables --------------------------------------------------------------------------
+
+# tagged data: MAGIC + <serializer id: 1 byte> + <compressor id: 1 byte> + payload
+CODEC_MAGIC: bytes = b'MC'
+LEGACY_MAGIC: bytes = b'moca'  # pickle + gzip, written by the old moca_dumps.
+
+# name: (id, dumps, loads)
+_SERIALIZERS: Dict[str, Tuple[int, Callable[[Any], bytes], Callable[[bytes], Any]]] = {}
+_SERIALIZER_NAMES: Dict[int, str] = {}
+# name: (id, compress(data, level), decompress)
+_COMPRESSORS: Dict[str, Tuple[int, Callable[[bytes, Optional[int]], bytes], Callable[[bytes], bytes]]] = {}
+_COMPRESSOR_NAMES: Dict[int, str] = {}
+
+# -------------------------------------------------------------------------- Variables --
+
+# -- Registry --------------------------------------------------------------------------
+
+
+def register_serializer(name: str, id_: int, dumps: Callable[[Any], bytes], loads: Callable[[bytes], Any]) -> None:
+    """
+    Register a serializer.
+    :param name: the name of the serializer.
+    :param id_: the id saved to the header of the data, 1 ~ 255, must not be changed after the data is saved.
+    :param dumps: serialize a object to bytes.
+    :param loads: load the object from bytes.
+    """
+    if not 0 < id_ < 256:
+        raise ValueError('The id of the serializer must be 1 ~ 255.')
+    if id_ in _SERIALIZER_NAMES and _SERIALIZER_NAMES[id_] != name:
+        raise ValueError(f'The serializer id {id_} is already used by {_SERIALIZER_NAMES[id_]}.')
+    _SERIALIZERS[name] = (id_, dumps, loads)
+    _SERIALIZER_NAMES[id_] = name
+
+
+def register_compressor(
+        name: str,
+        id_: int,
+        compress: Callable[[bytes, Optional[int]], bytes],
+        decompress: Callable[[bytes], bytes]
+) -> None:
+    """
+    Register a compressor.
+    :param name: the name of the compressor.
+    :param id_: the id saved to the header of the data, 1 ~ 255, 0 means no compression.
+    :param compress: compress the data, the second argument is the compress level or None.
+    :param decompress: decompress the data.
+    """
+    if not 0 < id_ < 256:
+        raise ValueError('The id of the compressor must be 1 ~ 255.')
+    if id_ in _COMPRESSOR_NAMES and _COMPRESSOR_NAMES[id_] != name:
+        raise ValueError(f'The compressor id {id_} is already used by {_COMPRESSOR_NAMES[id_]}.')
+    _COMPRESSORS[name] = (id_, compress, decompress)
+    _COMPRESSOR_NAMES[id_] = name
+
+
+def get_serializers() -> List[str]:
+    """Return the names of the available serializers."""
+    return list(_SERIALIZERS.keys())
+
+
+def get_compressors() -> List[str]:
+    """Return the names of the available compressors."""
+    return ['none'] + list(_COMPRESSORS.keys())
+
+
+register_serializer('pickle', 1, p_dumps, p_loads)
+if orjson_dumps is not None:
+    register_serializer('orjson', 2, orjson_dumps, orjson_loads)
+if packb is not None:
+    register_serializer('msgpack', 3, partial(packb, use_bin_type=True), partial(unpackb, raw=False))
+register_compressor(
+    'gzip', 1, lambda data, level: gzip_compress(data, compresslevel=9 if level is None else level), gzip_decompress
+)
+register_compressor(
+    'zlib', 2, lambda data, level: zlib_compress(data, -1 if level is None else level), zlib_decompress
+)
+if brotli_compress is not None:
+    register_compressor(
+        'brotli', 3, lambda data, level: brotli_compress(data, quality=11 if level is None else level),
+        brotli_decompress
+    )
+register_compressor(
+    'lzma', 4, lambda data, level: lzma_compress(data, preset=level), lzma_decompress
+)
+
+# -------------------------------------------------------------------------- Registry --
+
+# -- Moca Codec --------------------------------------------------------------------------
+
+
+class MocaCodec:
+    """
+    Serialize and compress the data with the selected codecs.
+    The encoded data starts with a tagged header, so any MocaCodec can decode the data
+    written by the other codecs and the old moca_dumps.
+    The old readers can't decode the tagged header, use legacy mode until all readers are updated.
+    orjson and msgpack only support the JSON-shaped values, for example a tuple is loaded as a list.
+
+    Attributes
+    ----------
+    self._serializer: str
+        the name of the serializer.
+    self._compressor: str
+        the name of the compressor, 'none' means no compression.
+    self._threshold: int
+        only compress the data bigger than this size. (bytes)
+    self._level: Optional[int]
+        the compress level, None means the default level of the compressor.
+    self._tagged: bool
+        add the header to the data. if this value is False, the data is the plain serialized data
+        and can be read by the other languages, but the data will not be compressed.
+    self._legacy: bool
+        write the format of the old moca_dumps. (pickle, the data bigger than threshold is b'moca' + gzip data)
+        the compressor setting is ignored, the level is used as the gzip level.
+    """
+
+    def __init__(
+            self,
+            serializer: str = 'pickle',
+            compressor: str = 'zlib',
+            threshold: int = 1024,
+            level: Optional[int] = None,
+            tagged: bool = True,
+            legacy: bool = False
+    ):
+        """
+        :param serializer: the name of the serializer. pickle, orjson, msgpack or a registered name.
+        :param compressor: the name of the compressor. none, gzip, zlib, brotli, lzma or a registered name.
+        :param threshold: only compress the data bigger than this size. (bytes)
+        :param level: the compress level, None means the default level of the compressor.
+        :param tagged: add the header to the data.
+        :param legacy: write the format of the old moca_dumps, the serializer must be pickle.
+        """
+        if serializer not in _SERIALIZERS:
+            raise ValueError(f'Unknown serializer: {serializer}. available: {get_serializers()}')
+        if compressor != 'none' and compressor not in _COMPRESSORS:
+            raise ValueError(f'Unknown compressor: {compressor}. available: {get_compressors()}')
+        if legacy and serializer != 'pickle':
+            raise ValueError('The legacy format only supports the pickle serializer.')
+        self._serializer: str = serializer
+        self._compressor: str = compressor
+        self._threshold: int = threshold
+        self._level: Optional[int] = level
+        self._tagged: bool = tagged
+        self._legacy: bool = legacy
+        self._serializer_id, self._serialize, self._deserialize = _SERIALIZERS[serializer]
+
+    def __repr__(self) -> str:
+        return f'MocaCodec(serializer={self._serializer}, compressor={self._compressor}, ' \
+               f'threshold={self._threshold}, level={self._level}, tagged={self._tagged}, legacy={self._legacy})'
+
+    @property
+    def serializer(self) -> str:
+        return self._serializer
+
+    @property
+    def compressor(self) -> str:
+        return self._compressor
+
+    @property
+    def threshold(self) -> int:
+        return self._threshold
+
+    @property
+    def level(self) -> Optional[int]:
+        return self._level
+
+    @property
+    def tagged(self) -> bool:
+        return self._tagged
+
+    @property
+    def legacy(self) -> bool:
+        return self._legacy
+
+    def dumps(self, obj: Any) -> bytes:
+        """serialize and compress."""
+        data = self._serialize(obj)
+        if self._legacy:
+            return LEGACY_MAGIC + _COMPRESSORS['gzip'][1](data, self._level) if len(data) > self._threshold else data
+        if not self._tagged:
+            return data
+        if self._compressor != 'none' and len(data) > self._threshold:
+            compressor_id, compress, _ = _COMPRESSORS[self._compressor]
+            return CODEC_MAGIC + bytes((self._serializer_id, compressor_id)) + compress(data, self._level)
+        return CODEC_MAGIC + bytes((self._serializer_id, 0)) + data
+
+    def loads(self, data: Optional[bytes]) -> Any:
+        """Load the data written by any codec."""
+        if data is None:
+            return None
+        elif data[:2] == CODEC_MAGIC and len(data) >= 4 and data[2] in _SERIALIZER_NAMES:
+            payload = data[4:]
+            if data[3] != 0:
+                payload = _COMPRESSORS[_COMPRESSOR_NAMES[data[3]]][2](payload)
+            return _SERIALIZERS[_SERIALIZER_NAMES[data[2]]][2](payload)
+        elif data[:4] == LEGACY_MAGIC:
+            return p_loads(gzip_decompress(data[4:]))
+        else:
+            # the untagged data, only the serializer of this codec can read it.
+            return self._deserialize(data)
+
+
+# the old readers can read the data written by the default codec, so the rolling deploy is safe.
+# after all readers are updated, use get_codec(legacy=False) (zlib level 1 is several times faster than gzip level 9).
+DEFAULT_CODEC: MocaCodec = MocaCodec('pickle', 'gzip', 1024, None, legacy=True)
+_CODECS: Dict[tuple, MocaCodec] = {
+    ('pickle', 'gzip', 1024, None, True, True): DEFAULT_CODEC
+}
+
+
+def get_codec(
+        serializer: str = 'pickle',
+        compressor: str = 'zlib',
+        threshold: int = 1024,
+        level: Optional[int] = None,
+        tagged: bool = True,
+        legacy: bool = False
+) -> MocaCodec:
+    """Return a codec, the same settings share one instance."""
+    key = (serializer, compressor, threshold, level, tagged, legacy)
+    if key not in _CODECS:
+        _CODECS[key] = MocaCodec(serializer, compressor, threshold, level, tagged, legacy)
+    return _CODECS[key]
+
+
+# -------------------------------------------------------------------------- Moca Codec --
@@ -24,7 +24,6 @@ from io import StringIO
 from aiofiles import open as aio_open
 from uuid import uuid4
 from re import compile
-from gzip import compress, decompress
 from multiprocessing import current_process
 from pprint import pprint
 from setproctitle import setproctitle
@@ -41,13 +40,13 @@ from pygments.lexers import JsonLexer
 from pygments.formatters import TerminalFormatter
 from prettytable import PrettyTable
 from PIL import Image
+try:
+    import pillow_avif  # register the AVIF plugin to Pillow.
+except (ImportError, ModuleNotFoundError):
+    pass
 from io import BytesIO
 from shutil import copytree, rmtree, copy
 from os import remove
-try:
-    from cloudpickle import dumps as p_dumps, loads as p_loads
-except (ImportError, ModuleNotFoundError):
-    from pickle import dumps as p_dumps, loads as p_loads
 from json import JSONDecodeError
 try:
     from ujson import dump as __dump, dumps as __dumps, loads
@@ -62,6 +61,7 @@ except (ImportError, ModuleNotFoundError):
     dump = partial(__dump, separators=(",", ":"), ensure_ascii=False)
     dumps = partial(__dumps, separators=(",", ":"), ensure_ascii=False)
     is_ujson = lambda: False
+from .moca_codec import DEFAULT_CODEC
 from ..moca_core import (
     LICENSE, NEW_LINE, tz, ConsoleColor, HIRAGANA, KATAKANA, PROCESS_ID, IS_WIN, DIGITS, ENCODING, TMP_DIR,
     IS_UNIX_LIKE, SELF_PATH
@@ -714,11 +714,7 @@ def check_email_format(email: str) -> bool:
 
 def moca_dumps(obj: Any) -> bytes:
     """serialize and compress."""
-    data = p_dumps(obj)
-    if len(data) > 1024:
-        return b'moca' + compress(data)
-    else:
-        return data
+    return DEFAULT_CODEC.dumps(obj)
 
 
 def moca_dump(obj: Any, filename: Union[Path, str]) -> None:
@@ -735,12 +731,7 @@ async def moca_aio_dump(obj: Any, filename: Union[Path, str]) -> None:
 
 def moca_loads(data: Optional[bytes]) -> Any:
     """Load serialized object."""
-    if data is None:
-        return None
-    elif data[:4] == b'moca':
-        return p_loads(decompress(data[4:]))
-    else:
-        return p_loads(data)
+    return DEFAULT_CODEC.loads(data)
 
 
 def moca_load(filename: Union[Path, str]) -> Any:
@@ -1301,14 +1292,81 @@ def pl() -> None:
     print('----------------------------------------------------------------------------')
 
 
-def resize_img(file: Union[bytes, str, Path], width: int, height: int, export_format: str) -> bytes:
+def resize_img(
+        file: Union[bytes, str, Path],
+        width: Optional[int],
+        height: Optional[int],
+        export_format: str,
+        quality: Optional[int] = None,
+        resample: Optional[int] = None
+) -> bytes:
+    """
+    Resize the image and return the data in the export format.
+    :param file: the image data or the path of the image.
+    :param width: the width of the image, None means the original size.
+    :param height: the height of the image, None means the same as the width.
+    :param export_format: the Pillow format name. for example: 'PNG', 'WEBP'
+    :param quality: the quality of the lossy formats, None means the default value of Pillow.
+    :param resample: the resampling filter, None means the default filter of Pillow.
+    :return: the image data.
+    """
     img = Image.open(BytesIO(file) if isinstance(file, bytes) else file)
-    img_resize = img.resize((width, height))
+    if width is not None:
+        img = img.resize((width, width if height is None else height), resample)
+    if export_format.upper() == 'JPEG' and img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    elif img.mode == 'P' and export_format.upper() != 'GIF':
+        img = img.convert('RGBA')
     img_bytes = BytesIO()
-    img_resize.save(img_bytes, export_format)
+    img.save(img_bytes, export_format, **({} if quality is None else {'quality': quality}))
     return img_bytes.getvalue()
 
 
+def get_img_format(filename: Union[str, Path]) -> Optional[str]:
+    """Return the Pillow format name of the file extension. for example: 'icon.jpg' -> 'JPEG'"""
+    Image.init()
+    return Image.registered_extensions().get(Path(filename).suffix.lower())
+
+
+def is_img_format_supported(export_format: str) -> bool:
+    """Can Pillow save the image as this format. for example: 'webp', 'avif', 'png'"""
+    Image.init()
+    return export_format.upper() in Image.SAVE
+
+
+def save_resized_img(
+        file: Union[bytes, str, Path],
+        filename: Union[str, Path],
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        quality: Optional[int] = None
+) -> bool:
+    """
+    Resize the image and save it to the file, the format is decided by the extension of the filename.
+    The image is written to a temporary file first, so the readers never see a half-written file.
+    This function can be used in a process pool.
+    :param file: the image data or the path of the image.
+    :param filename: the path to save the image.
+    :param width: the width of the image, None means the original size.
+    :param height: the height of the image, None means the same as the width.
+    :param quality: the quality of the lossy formats, None means the default value of Pillow.
+    :return: if the image was saved, return True.
+    """
+    export_format = get_img_format(filename)
+    if export_format is None:
+        return False
+    tmp = f'{filename}.{current_process().pid}.tmp'
+    try:
+        Path(tmp).write_bytes(resize_img(file, width, height, export_format, quality, Image.LANCZOS))
+        Path(tmp).replace(filename)
+    except (OSError, ValueError, KeyError, Image.DecompressionBombError):
+        # OSError includes the broken or unsupported image. (UnidentifiedImageError)
+        if Path(tmp).is_file():
+            remove(tmp)
+        return False
+    return True
+
+
 def get_my_public_ip_v4() -> str:
     try:
         res = get_text_from_url('https://inet-ip.info/ip')
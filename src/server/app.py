@@ -2,13 +2,13 @@
 
 from sanic import Sanic, Blueprint
 from threading import Thread
-from limits.strategies import FixedWindowElasticExpiryRateLimiter
-from limits.storage import MemoryStorage, RedisStorage
-from copy import copy
+from asyncio import sleep, get_running_loop
+from concurrent.futures import ProcessPoolExecutor
 from aioredis import RedisError
 from pymysql import MySQLError
 from .middlewares import middlewares
 from .routes import blueprints
+from .routes.root import TIMESTAMP_FIELD
 from .. import moca_modules as mzk
 from .. import core
 
@@ -87,12 +87,17 @@ async def before_server_start(app_: Sanic, loop):
     app_.system_config: mzk.MocaConfig = mzk.MocaConfig(
         core.SYSTEM_CONFIG, manual_reload=True
     )
-    app_.ip_blacklist: mzk.MocaSynchronizedJSONListFile = mzk.MocaSynchronizedJSONListFile(
+    app_.ip_blacklist_config: mzk.MocaSynchronizedJSONListFile = mzk.MocaSynchronizedJSONListFile(
         core.IP_BLACKLIST_FILE, manual_reload=True, remove_duplicates=True,
     )
+    # the addresses and networks in configs/ip_blacklist.json, and the automatic bans saved in the log file.
+    app_.ip_blacklist: mzk.MocaIPBlacklist = mzk.MocaIPBlacklist(core.STORAGE_DIR.joinpath('ip_blacklist.log'))
+    for item in app_.ip_blacklist.set_static(app_.ip_blacklist_config.list):
+        mzk.print_warning(f'Invalid ip address in the ip blacklist: {item}')
     app_.api_key_config: mzk.MocaSynchronizedJSONListFile = mzk.MocaSynchronizedJSONListFile(
         core.API_KEY_FILE, manual_reload=True
     )
+    app_.api_key_table: mzk.MocaAPIKeyTable = mzk.MocaAPIKeyTable(app_.api_key_config.list)
     app_.twitter: mzk.MocaTwitter = mzk.MocaTwitter(
         core.TWITTER_CONFIG['CONSUMER_KEY'],
         core.TWITTER_CONFIG['CONSUMER_SECRET'],
@@ -100,13 +105,55 @@ async def before_server_start(app_: Sanic, loop):
         core.TWITTER_CONFIG['ACCESS_TOKEN_SECRET']
     )
     app_.dict_cache = {}
-    app_.secure_log = mzk.MocaFileLog(core.LOG_DIR.joinpath('secure.log'))
+    secure_log_config = core.SERVER_CONFIG.get('secure_log', {})
+    # the queue is bounded, when the disk can't keep up, the new lines are dropped and counted.
+    app_.secure_log = mzk.MocaFileLog(
+        core.LOG_DIR.joinpath('secure.log'), maxsize=int(secure_log_config.get('queue_size', 10000))
+    )
+    app_.secure_log_summary_interval = int(secure_log_config.get('summary_interval', 60))
+    app_.unknown_api_key_log = mzk.MocaEventAggregator(
+        app_.secure_log, 'unknown_api_key', sample_rate=int(secure_log_config.get('sample_rate', 1))
+    )
     app_.scheduler = mzk.MocaScheduler()
-    if core.SERVER_CONFIG['rate_limiter_redis_storage'] is None:
-        app_._storage_for_rate_limiter = MemoryStorage()
-    else:
-        app_._storage_for_rate_limiter = RedisStorage(core.SERVER_CONFIG['rate_limiter_redis_storage'])
-    app_.rate_limiter = FixedWindowElasticExpiryRateLimiter(app_._storage_for_rate_limiter)
+    app_.rate_limiter = mzk.MocaRateLimiter(
+        None if core.SERVER_CONFIG['rate_limiter_redis_storage'] is None else mzk.MocaRedis.from_url(
+            core.SERVER_CONFIG['rate_limiter_redis_storage']
+        ),
+        **core.SERVER_CONFIG.get('rate_limiter', {})
+    )
+    app_.downloader = mzk.MocaDownloader(**core.SERVER_CONFIG.get('downloader', {}))
+    icon_config = core.SERVER_CONFIG.get('icon', {})
+    # the icon variants are generated from the raw icon. {variant: size}
+    app_.icon_variants = {'mini': 24, 'normal': 48, 'bigger': 73, **icon_config.get('variants', {})}
+    app_.icon_formats = set()
+    for icon_format in icon_config.get('formats', []):
+        if mzk.is_img_format_supported(icon_format):
+            app_.icon_formats.add(icon_format.lower())
+        else:
+            mzk.print_warning(f'The icon format {icon_format} is not supported by Pillow.')
+    app_.icon_quality = icon_config.get('quality', None)
+    app_.icon_lazy = bool(icon_config.get('lazy', True))
+    # the image work never runs on the event loop.
+    app_.image_pool = ProcessPoolExecutor(int(icon_config.get('process_pool_size', 2)))
+    # the icons directory is served by the static route, so the unfinished files are written outside of it.
+    app_.icon_store = mzk.MocaContentStore(
+        core.STORAGE_DIR.joinpath('icons'), tmp_dir=core.STORAGE_DIR.joinpath('tmp', 'icons')
+    )
+    # {'twitter-icons-<user id>': {(variant, format): file entry}}
+    app_.icon_files = mzk.MocaLRUCache(int(icon_config.get('index_size', 100000)))
+    # the hot small icons, the files are never modified, so the cache is never invalidated.
+    app_.icon_bytes = mzk.MocaLRUCache(
+        int(icon_config.get('memory_cache_size', 10000)),
+        int(icon_config.get('memory_cache_bytes', 67108864)),
+        int(icon_config.get('memory_cache_max_file_bytes', 65536)),
+    )
+    app_.generating_icons = {}
+    app_.icon_batch_max_size = int(icon_config.get('batch_max_size', 200))
+    app_.icon_batch_concurrency = int(icon_config.get('batch_concurrency', 8))
+    app_.icon_check_fresh_ttl = int(icon_config.get('check_fresh_ttl', 3600))
+    app_.icon_check_stale_ttl = int(icon_config.get('check_stale_ttl', 86400))
+    app_.icon_revalidation_rate = icon_config.get('revalidation_rate', '10/second')
+    app_.checking_icons = set()
     try:
         app_.mysql = mzk.MocaMysql(
             core.DB_CONFIG['mysql']['host'],
@@ -135,12 +182,17 @@ async def before_server_start(app_: Sanic, loop):
             core.DB_CONFIG['redis']['password'],
             int(core.DB_CONFIG['mysql']['min_size']),
             int(core.DB_CONFIG['mysql']['max_size']),
+            codec=mzk.get_codec(**core.DB_CONFIG['redis'].get('codec', {})),
+            nodes=core.DB_CONFIG['redis'].get('nodes', []),
         )
         app_.redis.prefix = core.DB_CONFIG['redis']['prefix']
         await app_.redis.test_con()
     except KeyError as e:
         mzk.print_error(f'Redis database configuration error. missing key: {e}')
         mzk.sys_exit(1)
+    except (TypeError, ValueError) as e:
+        mzk.print_error(f'Redis codec configuration error. {e}')
+        mzk.sys_exit(1)
     except (RedisError, ConnectionRefusedError) as e:
         mzk.print_error("Can't connect to Redis database, Please check your database configuration.")
         mzk.print_error("And make sure your database is online.")
@@ -151,16 +203,61 @@ async def before_server_start(app_: Sanic, loop):
         app_.simple_cache = mzk.MocaSimpleCache(
             int(core.DB_CONFIG['simple_cache']['pool_size']),
             int(core.DB_CONFIG['simple_cache']['page_size']),
+            int(core.DB_CONFIG['simple_cache'].get('max_bytes', 0)),
         )
+        app_.negative_cache_ttl = int(core.DB_CONFIG['simple_cache'].get('negative_ttl', 300))
+        app_.snapshot_interval = int(core.DB_CONFIG['simple_cache'].get('snapshot_interval', 0))
+        app_.snapshot_file = core.STORAGE_DIR.joinpath('cache').joinpath('simple_cache.snapshot')
+        if app_.snapshot_interval > 0:
+            app_.snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+            app_.simple_cache.load_snapshot(app_.snapshot_file)
     except KeyError as e:
         mzk.print_error(f'SimpleCache configuration error. missing key: {e}')
         mzk.sys_exit(1)
+    app_.profile_fresh_ttl = int(core.DB_CONFIG.get('profile', {}).get('fresh_ttl', 86400))
+    app_.profile_stale_ttl = int(core.DB_CONFIG.get('profile', {}).get('stale_ttl', 604800))
+    # the user ids being refreshed by this worker, or by the other worker that holds the redis lock.
+    app_.refreshing_info = set()
+    # drop the local cache when other workers refreshed the data.
+    def __on_invalidate(key: str) -> None:
+        app_.simple_cache.remove_cache(key)
+        if key.startswith('twitter-info-'):
+            # the fields read by __get_info_fields in routes/root.py.
+            app_.simple_cache.remove_cache('twitter-info-fields-' + key[len('twitter-info-'):])
+        elif key.startswith('twitter-icons-'):
+            app_.icon_files.remove_cache(key)
+
+    await app_.redis.add_invalidation_listener(__on_invalidate)
+
+    # the request counters for dos detection, aggregated across all workers in redis.
+    app_.dos_detector = mzk.MocaRequestCounter(
+        app_.redis, 'dos-detect', app_.system_config.get_config('dos_detect_window', int, 5), 5
+    )
+    # the unknown api-keys per ip address for the ip ban, the log summary resets its counts, so it is not used.
+    app_.unknown_api_key_counter = mzk.MocaRequestCounter(
+        app_.redis, 'unknown-api-key', app_.system_config.get_config('unknown_api_key_window', int, 3600), 60
+    )
+
+    # ban the ip address, and tell all other workers to block it immediately.
+    async def __ban_ip(ip: str, reason: str) -> None:
+        ttl = app_.system_config.get_config('ip_ban_ttl', int, 0)
+        # persisting locks and appends the log file, so it runs in the executor.
+        await get_running_loop().run_in_executor(None, app_.ip_blacklist.add, ip, ttl)
+        app_.secure_log.write_log(f"Add {ip} to the blacklist. <{reason}>", mzk.LogLevel.WARNING)
+        await app_.redis.publish('ip-ban', (ip, ttl))
+
+    app_.ban_ip = __ban_ip
+    # the ban is already written to the log file by the sender.
+    await app_.redis.subscribe('ip-ban', lambda message: app_.ip_blacklist.add(*message, persist=False))
 
     def __reload_timer(application: Sanic) -> None:
         while True:
             mzk.sleep(1)
             application.system_config.reload_file()
+            application.ip_blacklist_config.reload_file()
+            application.ip_blacklist.set_static(application.ip_blacklist_config.list)
             application.ip_blacklist.reload_file()
+            application.ip_blacklist.compact_if_needed()
             application.api_key_config.reload_file()
 
     app_._timer_thread = Thread(target=__reload_timer, args=(app_,), daemon=True)
@@ -170,28 +267,76 @@ async def before_server_start(app_: Sanic, loop):
 async def after_server_start(app_: Sanic, loop):
     mzk.print_info(f'Started Sanic server. -- {mzk.get_my_pid()}')
 
-    # run scheduled tasks.
-    def dos_detect():
-        info = copy(app_.dict_cache.get('dos-detect'))
-        app_.dict_cache['dos-detect'] = {}
-        if info is None:
-            return None
-        for ip, count in info.items():
-            if count > core.system_config.get_config('dos_detect', int, 5000):
-                app_.ip_blacklist.append(ip)
-                app_.secure_log.write_log(
-                    f"Add {ip} to the blacklist. <dos_detection>",
-                    mzk.LogLevel.WARNING
+    # send the request counters to redis every second, and ban the ip addresses over the threshold.
+    async def __dos_detect() -> None:
+        while True:
+            await sleep(1)
+            try:
+                over = await app_.dos_detector.flush(app_.system_config.get_config('dos_detect', int, 5000))
+                for ip, _ in over:
+                    if not app_.ip_blacklist.dynamic.contains(ip):  # other workers may detect it at the same time.
+                        await app_.ban_ip(ip, 'dos_detection')
+                over = await app_.unknown_api_key_counter.flush(
+                    app_.system_config.get_config('block_ip_when_received_invalid_system_auth', int, 0)
                 )
+                for ip, _ in over:
+                    if not app_.ip_blacklist.dynamic.contains(ip):
+                        await app_.ban_ip(ip, 'api_key_checker')
+            except (RedisError, OSError) as e:
+                mzk.print_warning(f'Dos detection failed. <{e}>')
+
+    app_.add_task(__dos_detect())
+
+    # the summary is written in the event loop, the same thread as the middleware that counts the events.
+    async def __secure_log_summary() -> None:
+        while True:
+            await sleep(app_.secure_log_summary_interval)
+            app_.unknown_api_key_log.flush()
+
+    app_.add_task(__secure_log_summary())
+
+    # the changes are copied in the event loop, and written to the file in the executor.
+    async def __save_snapshot() -> None:
+        while True:
+            await sleep(app_.snapshot_interval)
+            await app_.simple_cache.aio_save_snapshot(app_.snapshot_file)
+
+    if app_.snapshot_interval > 0:
+        app_.add_task(__save_snapshot())
+
+    # load the user info of the accounts in configs/screen_name.json from redis.
+    async def __warm_up() -> None:
+        screen_names = mzk.load_json_from_file(core.CONFIG_DIR.joinpath('screen_name.json'))
+        id_keys = ['twitter-id-' + name.lower() for name in screen_names]
+        if len(id_keys) > 0:
+            user_ids = []
+            for key, user_id in (await app_.redis.get_multi(id_keys)).items():
+                if user_id is not None:
+                    app_.simple_cache.set(key, user_id)
+                    if app_.simple_cache.get(f'twitter-info-{user_id}') is None:
+                        user_ids.append(user_id)
+            pipe = app_.redis.pipeline()
+            for user_id in user_ids:
+                pipe.hgetall(f'twitter-profile-{user_id}')
+            for user_id, info in zip(user_ids, await pipe.execute()):
+                if TIMESTAMP_FIELD in info:
+                    fetched_at = info.pop(TIMESTAMP_FIELD)
+                    app_.simple_cache.set(f'twitter-info-{user_id}', (info, fetched_at))
 
-    app_.scheduler.add_event_per_second('Dos-detect', dos_detect, 5)
+    if core.DB_CONFIG['simple_cache'].get('warm_up', False):
+        app_.add_task(__warm_up())
 
 
 async def before_server_stop(app_: Sanic, loop):
     mzk.print_info(f'Stopping Sanic server. -- {mzk.get_my_pid()}')
+    await app_.redis.close_subscriber()
 
 
 async def after_server_stop(app_: Sanic, loop):
+    await app_.downloader.close()
+    app_.image_pool.shutdown(wait=False)
+    if app_.snapshot_interval > 0:
+        app_.simple_cache.save_snapshot(app_.snapshot_file)
     mzk.print_info(f'Stopped Sanic server. -- {mzk.get_my_pid()}')
 
 
@@ -211,6 +356,6 @@ app.blueprint(Blueprint.group(*blueprints, url_prefix='/moca-twitter'))
 
 
 # Static files
-app.static('/icons', str(core.STORAGE_DIR.joinpath('icon')))
+app.static('/icons', str(core.STORAGE_DIR.joinpath('icons')))
 
 # -------------------------------------------------------------------------- App --
@@ -13,6 +13,7 @@ from .dos_detection import dos_detection
 from .referer_checker import referer_checker
 from .add_time_header import add_time_header
 from .save_start_time import save_start_time
+from .classify_request import classify_request
 
 # -------------------------------------------------------------------------- Imports --
 
@@ -28,6 +29,8 @@ plugin: str = 'plugin'
 
 middlewares: Dict[str, Tuple[str, Union[Callable, SanicPlugin]]] = {
     'save_start_time': (request, save_start_time),
+    'classify_request': (request, classify_request),
+    'ip_blacklist_filter': (request, ip_blacklist_filter),
     'maintenance_flag': (request, maintenance_flag),
     'force_headers': (request, force_headers),
     'referer_checker': (request, referer_checker),
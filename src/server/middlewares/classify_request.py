@@ -0,0 +1,36 @@
+# -- Imports --------------------------------------------------------------------------
+
+from typing import (
+    Tuple
+)
+from sanic.request import Request
+
+# -------------------------------------------------------------------------- Imports --
+
+# -- Variables --------------------------------------------------------------------------
+
+# the paths that skip all checks.
+EXEMPT_PATHS: Tuple[bytes, ...] = (b'/status',)
+# the static files, they don't need the api key and the forced headers.
+STATIC_PATHS: Tuple[bytes, ...] = (b'/static', b'/web', b'/moca-twitter/static/icons/', b'/icons/')
+
+# -------------------------------------------------------------------------- Variables --
+
+# -- Middleware --------------------------------------------------------------------------
+
+
+async def classify_request(request: Request):
+    """
+    Classify the request once, the other middlewares read the result from request.ctx.
+    request.ctx.is_preflight: the request is a CORS preflight request. (OPTIONS)
+    request.ctx.is_exempt: the path skips all checks.
+    request.ctx.is_static: the path is a static file.
+    request.ctx.is_api: the request should be checked by force_headers and api_key_checker.
+    """
+    url = request.raw_url
+    request.ctx.is_preflight = is_preflight = request.method == 'OPTIONS'
+    request.ctx.is_exempt = is_exempt = url.startswith(EXEMPT_PATHS)
+    request.ctx.is_static = is_static = url.startswith(STATIC_PATHS)
+    request.ctx.is_api = not (is_preflight or is_exempt or is_static)
+
+# -------------------------------------------------------------------------- Middleware --
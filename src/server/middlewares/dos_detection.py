@@ -13,13 +13,7 @@ from ... import moca_modules as mzk
 
 
 async def dos_detection(request: Request):
-    """Count access for dos detection."""
-    ip = mzk.get_remote_address(request)
-    if request.app.dict_cache.get('dos-detect') is None:
-        request.app.dict_cache['dos-detect'] = {}
-    try:
-        request.app.dict_cache['dos-detect'][ip] += 1
-    except KeyError:
-        request.app.dict_cache['dos-detect'][ip] = 1
+    """Count access for dos detection, the counters are sent to redis by the dos detection task."""
+    request.app.dos_detector.hit(mzk.get_remote_address(request))
 
 # -------------------------------------------------------------------------- Middleware --
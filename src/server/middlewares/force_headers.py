@@ -11,13 +11,9 @@ from sanic.response import text
 
 async def force_headers(request: Request):
     """If the request is not contained all headers in `force_headers`, block it."""
-    if request.method.upper() == 'OPTIONS':
+    if request.ctx.is_preflight:
         return text('success.')
-    if not request.raw_url.startswith(b'/static') and \
-            not request.raw_url.startswith(b'/web') and \
-            not request.raw_url.startswith(b'/status') and \
-            not request.raw_url.startswith(b'/moca-twitter/static/icons/') and \
-            request.method.upper() != 'OPTIONS':
+    if request.ctx.is_api:
         headers = request.app.system_config.get_config('force_headers', dict, {})
         if len(headers) != 0:
             for key, value in headers.items():
@@ -12,7 +12,7 @@ from ... import core
 
 async def referer_checker(request: Request):
     """Check the referer header."""
-    if not request.raw_url.startswith(b'/status'):
+    if not request.ctx.is_exempt:
         config = request.app.system_config.get_config('referer', dict)
         # {
         #     "force": bool,
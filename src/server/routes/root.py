@@ -1,24 +1,57 @@
 # -- Imports --------------------------------------------------------------------------
 
+from typing import (
+    Optional, Tuple, List, Dict
+)
 from sanic import Blueprint
 from sanic.request import Request
-from sanic.response import HTTPResponse, text, json as original_json, file
+from sanic.response import HTTPResponse, text, json as original_json, raw, file_stream
 from orjson import dumps as orjson_dumps
 from functools import partial
 json = partial(original_json, dumps=orjson_dumps)
-from sanic.exceptions import Forbidden, ServerError
+from sanic.exceptions import Forbidden, ServerError, NotFound
 from time import time
+from asyncio import gather, shield, get_running_loop, Semaphore
+from io import BytesIO
+from zipfile import ZipFile, ZIP_STORED
 from pymysql import IntegrityError, MySQLError
 from dateutil.parser import parse
+from aiofiles import open as aio_open
+from mimetypes import guess_type
 from ... import moca_modules as mzk
 from ... import core
-from .utils import check_root_pass
+from .utils import check_root_pass, make_etag, conditional_response
 
 # -------------------------------------------------------------------------- Imports --
 
 # -- Private --------------------------------------------------------------------------
 
-ONE_DAY = 86400  # 1 * 60 * 60 * 24
+NEGATIVE_CACHE_API_CODES = (50, 63)  # User not found, User has been suspended.
+TIMESTAMP_FIELD = '__timestamp__'  # the fetched time in the profile hash.
+REFRESH_LOCK_TTL = 30  # only one worker refreshes a profile in this seconds.
+ICON_URL_PREFIX = '/icons/'  # the icon store is served as the static files. (see app.py)
+ICON_CHECK_USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) ' \
+                        'AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.4352.0 Safari/537.36'
+
+
+async def __get_missing_code(request: Request, screen_name: str) -> Optional[int]:
+    """If the screen_name is known as a unknown or suspended account, return the api code."""
+    key = 'twitter-missing-' + screen_name.lower()
+    api_code, expire = request.app.simple_cache.get(key, tuple, (None, 0.0))
+    if api_code is None or expire < time():
+        api_code = await request.app.redis.get(key)
+        if api_code is not None:
+            request.app.simple_cache.set(key, (api_code, time() + request.app.negative_cache_ttl))
+    if api_code is not None:
+        await request.app.redis.increment('twitter-missing-hits')
+    return api_code
+
+
+async def __set_missing_code(request: Request, screen_name: str, api_code: int) -> None:
+    """Save a short-lived negative cache for the unknown or suspended account."""
+    key = 'twitter-missing-' + screen_name.lower()
+    request.app.simple_cache.set(key, (api_code, time() + request.app.negative_cache_ttl))
+    await request.app.redis.set(key, api_code, request.app.negative_cache_ttl)
 
 
 async def __add_user(request: Request, info: dict) -> None:
@@ -57,67 +90,421 @@ async def __add_user(request: Request, info: dict) -> None:
         )
 
 
+async def __get_user_id(request: Request, screen_name: str) -> Optional[int]:
+    """Resolve the screen_name to the user id, the screen_name is case insensitive."""
+    key = 'twitter-id-' + screen_name.lower()
+    user_id = request.app.simple_cache.get(key)
+    if user_id is None:
+        user_id = await request.app.redis.get(key)
+        if user_id is None:
+            res = await request.app.mysql.execute_aio(core.SCREEN_NAME_TO_ID_QUERY, (screen_name,))
+            if len(res) > 0 and len(res[0]) > 0:
+                user_id = res[0][0]
+                await request.app.redis.set(key, user_id, request.app.profile_stale_ttl)
+        if user_id is not None:
+            request.app.simple_cache.set(key, user_id)
+    return user_id
+
+
+async def __set_user_id(request: Request, screen_name: str, user_id: int) -> None:
+    key = 'twitter-id-' + screen_name.lower()
+    if request.app.simple_cache.get(key) != user_id:
+        request.app.simple_cache.set(key, user_id)
+        await request.app.redis.set(key, user_id, request.app.profile_stale_ttl)
+        await request.app.redis.invalidate(key)
+
+
+async def __remove_user_id(request: Request, screen_name: str) -> None:
+    """The screen_name was renamed, remove the old mapping."""
+    key = 'twitter-id-' + screen_name.lower()
+    request.app.simple_cache.remove_cache(key)
+    await request.app.redis.delete(key)
+    await request.app.redis.invalidate(key)
+
+
+async def __save_info(request: Request, info: dict) -> float:
+    """Download the icon and save the user info to all caches and the database, return the fetched time."""
+    user_id = info.get('id', 0)
+    key = f'twitter-info-{user_id}'
+    fetched_at = time()
+    request.app.simple_cache.set(key, (info, fetched_at))
+    request.app.simple_cache.remove_cache(f'twitter-info-fields-{user_id}')
+    await request.app.redis.hset_multi(
+        f'twitter-profile-{user_id}', {**info, TIMESTAMP_FIELD: fetched_at}, request.app.profile_stale_ttl, True
+    )
+    # other workers must drop their local copy.
+    await request.app.redis.invalidate(key)
+    await __set_user_id(request, info.get('screen_name', ''), user_id)
+    icon_url = info.get('profile_image_url_https', None)
+    # only the raw icon is downloaded, the other variants are generated from it.
+    if icon_url and await __save_icon(request, user_id, icon_url) is not None and not request.app.icon_lazy:
+        await gather(*[__get_icon_name(request, info, variant) for variant in request.app.icon_variants])
+    try:
+        await __add_user(request, info)
+    except MySQLError:
+        request.app.simple_cache.set(key, (None, None))
+        await request.app.redis.delete(f'twitter-profile-{user_id}')
+        await request.app.redis.invalidate(key)
+        raise ServerError("Can't save twitter info to database. Please contact to the administrator.")
+    return fetched_at
+
+
+async def __fetch_info(request: Request, screen_name: str, user_id: Optional[int] = None) -> Tuple[dict, float]:
+    """
+    Get the user info from Twitter, download the icons and update all caches.
+    If the user id is known, get the info by the user id. so the renamed account can be detected.
+    """
+    api_code = await __get_missing_code(request, screen_name)
+    if api_code is not None:
+        raise mzk.TweepError(f'Unknown or suspended account. <{screen_name}>', api_code=api_code)
+    try:
+        if user_id is None:
+            info = request.app.twitter.get_user_info(screen_name)
+        else:
+            info = request.app.twitter.get_user_info_by_id(user_id)
+    except mzk.TweepError as e:
+        if e.api_code in NEGATIVE_CACHE_API_CODES:
+            await __set_missing_code(request, screen_name, e.api_code)
+        raise
+    fetched_at = await __save_info(request, info)
+    if info.get('screen_name', '').lower() != screen_name.lower():
+        # the account was renamed, the screen_name may be used by another account now.
+        await __remove_user_id(request, screen_name)
+        return await __fetch_info(request, screen_name)
+    return info, fetched_at
+
+
+async def __refresh_info(request: Request, screen_name: str, user_id: int) -> None:
+    """Refresh the user info in background."""
+    try:
+        await __fetch_info(request, screen_name, user_id)
+    except (mzk.TweepError, ServerError):
+        pass  # keep serving the stale data until the hard expiry.
+    finally:
+        request.app.refreshing_info.discard(user_id)
+        await request.app.redis.delete(f'refresh-{user_id}')
+
+
+async def __get_info_entry(request: Request, screen_name: str, force_refresh=False) -> Tuple[dict, float]:
+    """
+    Return the user info and the time it was fetched from Twitter.
+    If the data is older than profile.fresh_ttl, return it anyway and refresh it in background,
+    only the data older than profile.stale_ttl will block the request.
+    """
+    user_id = await __get_user_id(request, screen_name)
+    if user_id is not None and not force_refresh:
+        key = f'twitter-info-{user_id}'
+        info, fetched_at = request.app.simple_cache.get(key, tuple, (None, None))
+        if info is None or (time() - fetched_at) > request.app.profile_fresh_ttl:
+            entry = await request.app.redis.hgetall(f'twitter-profile-{user_id}')
+            if TIMESTAMP_FIELD in entry and (info is None or entry[TIMESTAMP_FIELD] > fetched_at):
+                fetched_at = entry.pop(TIMESTAMP_FIELD)
+                info = entry
+                request.app.simple_cache.set(key, (info, fetched_at))
+        if info is not None and info.get('screen_name', '').lower() != screen_name.lower():
+            # the mapping is older than the data, the account was renamed.
+            await __remove_user_id(request, screen_name)
+            return await __fetch_info(request, screen_name)
+        if info is not None:
+            age = time() - fetched_at
+            if age <= request.app.profile_fresh_ttl:
+                return info, fetched_at
+            elif age <= request.app.profile_stale_ttl:
+                # the local set avoids asking redis again, the redis lock allows only one worker to refresh it.
+                if user_id not in request.app.refreshing_info:
+                    request.app.refreshing_info.add(user_id)
+                    if await request.app.redis.set_nx(f'refresh-{user_id}', mzk.get_my_pid(), REFRESH_LOCK_TTL):
+                        request.app.add_task(__refresh_info(request, screen_name, user_id))
+                    else:
+                        get_running_loop().call_later(
+                            REFRESH_LOCK_TTL, request.app.refreshing_info.discard, user_id
+                        )
+                return info, fetched_at
+    return await __fetch_info(request, screen_name, user_id)
+
+
 async def __get_info(request: Request, screen_name: str, force_refresh=False) -> dict:
-    if not force_refresh:
-        info, timestamp = request.app.simple_cache.get('twitter-info-' + screen_name, tuple, (None, None))
-        if info is None or (time() - timestamp) > 86400:
-            info = await request.app.redis.get('twitter-info-' + screen_name)
-    else:
-        info = None
-    if info is None:
-        info = request.app.twitter.get_user_info(screen_name)
-        request.app.simple_cache.set('twitter-info-' + screen_name, (info, time()))
-        await request.app.redis.set('twitter-info-' + screen_name, info, ONE_DAY)
-        icon_url = info.get('profile_image_url_https', None)
-        icon_ext = icon_url.split('.')[-1]
-        if icon_url is not None:
-            core.STORAGE_DIR.joinpath('icon').joinpath(info.get('screen_name', '_')).mkdir(parents=True, exist_ok=True)
-            await mzk.aio_wget(
-                icon_url,
-                core.STORAGE_DIR.joinpath('icon').joinpath(info.get('screen_name', '_')).joinpath(f'normal.{icon_ext}')
-            )
-            await mzk.aio_wget(
-                icon_url.replace('_normal', '_mini'),
-                core.STORAGE_DIR.joinpath('icon').joinpath(info.get('screen_name', '_')).joinpath(f'mini.{icon_ext}')
+    return (await __get_info_entry(request, screen_name, force_refresh))[0]
+
+
+async def __get_info_fields(request: Request, screen_name: str, *fields: str) -> Tuple[dict, float]:
+    """
+    Return only the required fields of the user info and the time it was fetched from Twitter.
+    If the info is not in the local cache, read only these fields from redis instead of the whole profile,
+    the fields are cached in twitter-info-fields-<user id> and dropped with twitter-info-<user id>.
+    """
+    user_id = await __get_user_id(request, screen_name)
+    if user_id is not None and request.app.simple_cache.get(f'twitter-info-{user_id}', tuple, (None,))[0] is None:
+        key = f'twitter-info-fields-{user_id}'
+        data, fetched_at = request.app.simple_cache.get(key, tuple, (None, None))
+        if data is None or (time() - fetched_at) > request.app.profile_fresh_ttl or \
+                any(field not in data for field in fields):
+            cached = data
+            data = await request.app.redis.hmget(
+                f'twitter-profile-{user_id}', ['screen_name', TIMESTAMP_FIELD, *fields]
             )
-            await mzk.aio_wget(
-                icon_url.replace('_normal', '_bigger'),
-                core.STORAGE_DIR.joinpath('icon').joinpath(info.get('screen_name', '_')).joinpath(f'bigger.{icon_ext}')
+            if cached is not None and data[TIMESTAMP_FIELD] == fetched_at:
+                data = {**cached, **data}  # the other routes read the other fields of the same profile.
+            fetched_at = data.pop(TIMESTAMP_FIELD)
+            if fetched_at is not None:
+                request.app.simple_cache.set(key, (data, fetched_at))
+        if fetched_at is not None and (time() - fetched_at) <= request.app.profile_fresh_ttl and \
+                isinstance(data['screen_name'], str) and data['screen_name'].lower() == screen_name.lower():
+            return {**data, 'id': user_id}, fetched_at
+    return await __get_info_entry(request, screen_name)
+
+
+async def __get_icon_index(request: Request, key: str) -> dict:
+    """Return a icon index saved as a redis hash, the index is cached in the local cache."""
+    index = request.app.simple_cache.get(key, dict)
+    if index is None:
+        index = await request.app.redis.hgetall(key)
+        request.app.simple_cache.set(key, index)
+    return index
+
+
+async def __set_icon_index(request: Request, key: str, data: dict, replace: bool = False) -> None:
+    await request.app.redis.hset_multi(key, data, replace=replace)
+    request.app.simple_cache.remove_cache(key)
+    request.app.icon_files.remove_cache(key)
+    await request.app.redis.invalidate(key)
+
+
+async def __save_icon(request: Request, user_id: int, url: str) -> Optional[str]:
+    """
+    Download the raw icon to the icon store, return the name of the file.
+    If the icon url is not changed, the download is skipped.
+    """
+    key = f'twitter-icons-{user_id}'
+    index = await __get_icon_index(request, key)
+    if index.get('url') == url and index.get('raw') is not None and request.app.icon_store.exists(index['raw']):
+        return index['raw']
+    tmp = request.app.icon_store.get_tmp_path()
+    if not await request.app.downloader.download(url.replace('_normal', ''), tmp):
+        return None
+    raw = await get_running_loop().run_in_executor(None, request.app.icon_store.add_file, tmp, url.split('.')[-1])
+    await __set_icon_index(request, key, {'url': url, 'raw': raw}, True)
+    return raw
+
+
+async def __make_icon(request: Request, raw: str, variant: str, icon_format: str) -> Optional[str]:
+    """Generate the icon variant from the raw icon in the process pool, return the name of the file."""
+    tmp = request.app.icon_store.get_tmp_path(f'.{icon_format}')
+    if not await get_running_loop().run_in_executor(
+            request.app.image_pool, mzk.save_resized_img, str(request.app.icon_store.get_path(raw)), str(tmp),
+            request.app.icon_variants.get(variant), None, request.app.icon_quality
+    ):
+        return None
+    name = await get_running_loop().run_in_executor(None, request.app.icon_store.add_file, tmp)
+    # the variants belong to the raw icon, so the same icons (default icons) share the variants.
+    await __set_icon_index(request, f'twitter-icon-variants-{raw}', {f'{variant}.{icon_format}': name})
+    return name
+
+
+async def __get_icon_name(
+        request: Request, info: dict, variant: str, icon_format: Optional[str] = None
+) -> Optional[str]:
+    """
+    Return the name of the icon in the icon store, the missing icon is downloaded or generated.
+    The concurrent requests for the same icon wait for the same job.
+    """
+    url = info.get('profile_image_url_https')
+    if not url:
+        return None
+    raw = await __save_icon(request, info.get('id', 0), url)
+    if raw is None:
+        return None
+    icon_format = icon_format or raw.rsplit('.', 1)[-1]
+    if variant == 'raw' and raw.endswith(f'.{icon_format}'):
+        return raw
+    name = (await __get_icon_index(request, f'twitter-icon-variants-{raw}')).get(f'{variant}.{icon_format}')
+    if name is None or not request.app.icon_store.exists(name):
+        key = (raw, variant, icon_format)
+        job = request.app.generating_icons.get(key)
+        if job is None:
+            job = request.app.generating_icons[key] = get_running_loop().create_task(
+                __make_icon(request, raw, variant, icon_format)
             )
-            await mzk.aio_wget(
-                icon_url.replace('_normal', ''),
-                core.STORAGE_DIR.joinpath('icon').joinpath(info.get('screen_name', '_')).joinpath(f'raw.{icon_ext}')
-            )
-        try:
-            await __add_user(request, info)
-        except MySQLError:
-            request.app.simple_cache.set('twitter-info-' + screen_name, (None, None))
-            await request.app.redis.delete('twitter-info-' + screen_name)
-            raise ServerError("Can't save twitter info to database. Please contact to the administrator.")
-    return info
+            job.add_done_callback(lambda _: request.app.generating_icons.pop(key, None))
+        name = await shield(job)
+    return name
+
+
+async def __get_icon_file_entry(
+        request: Request, screen_name: str, variant: str, icon_format: Optional[str] = None
+) -> tuple:
+    """
+    Return (name, path, size, mtime, mime type, Content-Disposition, expiry) of the icon file.
+    The entries are indexed in memory by the user id, and dropped when the icon of the user is changed.
+    """
+    user_id = await __get_user_id(request, screen_name)
+    files = request.app.icon_files.get(f'twitter-icons-{user_id}') if user_id is not None else None
+    entry = None if files is None else files.get((variant, icon_format))
+    if entry is not None and entry[6] > time():
+        return entry
+    info, _ = await __get_info_fields(request, screen_name, 'profile_image_url_https')
+    name = await __get_icon_name(request, info, variant, icon_format)
+    if name is None:
+        info = await __get_info(request, screen_name, True)
+        name = await __get_icon_name(request, info, variant, icon_format)
+    if name is None:
+        raise NotFound("Can't get the icon.")
+    path = request.app.icon_store.get_path(name)
+    stat = path.stat()
+    filename = f"{info.get('screen_name', screen_name)}-{variant}.{name.rsplit('.', 1)[-1]}"
+    entry = (
+        name, str(path), stat.st_size, stat.st_mtime, guess_type(path.name)[0] or 'application/octet-stream',
+        f'attachment; filename="{filename}"', time() + request.app.profile_fresh_ttl
+    )
+    key = f"twitter-icons-{info.get('id', 0)}"
+    files = request.app.icon_files.get(key)
+    if files is None:
+        files = {}
+        request.app.icon_files.set(key, files)
+    files[(variant, icon_format)] = entry
+    return entry
+
+
+async def __get_icon_file(
+        request: Request, screen_name: str, variant: str, icon_format: Optional[str] = None
+) -> HTTPResponse:
+    """
+    Return the icon file, the name of the file is the hash of the content, so it is used as the ETag.
+    The small icons are served from the memory, the others are streamed from the disk.
+    """
+    name, path, size, mtime, mime, disposition, _ = await __get_icon_file_entry(
+        request, screen_name, variant, icon_format
+    )
+    headers = {'Content-Disposition': disposition}
+
+    async def __create_response() -> HTTPResponse:
+        data = request.app.icon_bytes.get(name)
+        if data is None and request.app.icon_bytes.can_cache(size):
+            async with aio_open(path, mode='rb') as icon:
+                data = await icon.read()
+            request.app.icon_bytes.set(name, data)
+        if data is not None:
+            return raw(data, content_type=mime, headers=headers)
+        return await file_stream(path, mime_type=mime, headers=headers)
+
+    return await conditional_response(
+        request, f'"{request.app.icon_store.get_digest(name)}"', __create_response, mtime
+    )
+
+
+def __get_icon_options(request: Request, variant: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """Parse and check the variant and format arguments, if the variant is None, get it from the arguments."""
+    icon_format, *_ = mzk.get_args(request, ('format', str, None, {'max_length': 8}))
+    if variant is None:
+        variant, *_ = mzk.get_args(request, ('variant|size', str, None, {'max_length': 16}))
+    if variant is None or (variant != 'raw' and variant not in request.app.icon_variants):
+        raise Forbidden('variant parameter format error.')
+    if icon_format is not None and icon_format.lower() not in request.app.icon_formats:
+        raise Forbidden('format parameter format error.')
+    return variant, None if icon_format is None else icon_format.lower()
+
+
+async def __get_icon_response(request: Request, variant: Optional[str] = None) -> HTTPResponse:
+    screen_name, *_ = mzk.get_args(
+        request,
+        ('screen_name|name', str, None, {'max_length': 32}),
+    )
+    if screen_name is None:
+        raise Forbidden('screen_name parameter format error.')
+    variant, icon_format = __get_icon_options(request, variant)
+    return await __get_icon_file(request, screen_name, variant, icon_format)
+
+
+async def __get_icon_file_entries(
+        request: Request, screen_names: List[str], variant: str, icon_format: Optional[str] = None
+) -> Dict[str, Optional[tuple]]:
+    """
+    Return the file entries of the icons, the missing icons are downloaded concurrently.
+    The number of the concurrent downloads is limited by icon.batch_concurrency.
+    If can't get the icon, the entry is None.
+    """
+    semaphore = Semaphore(request.app.icon_batch_concurrency)
+
+    async def __get_entry(screen_name: str) -> Optional[tuple]:
+        async with semaphore:
+            try:
+                return await __get_icon_file_entry(request, screen_name, variant, icon_format)
+            except (mzk.TweepError, NotFound, ServerError):
+                return None
+
+    return dict(zip(screen_names, await gather(*[__get_entry(screen_name) for screen_name in screen_names])))
+
+
+def __pack_icons(entries: Dict[str, Optional[tuple]]) -> bytes:
+    """Pack the icon files to a zip file, the images are already compressed, so the files are only stored."""
+    buffer = BytesIO()
+    with ZipFile(buffer, mode='w', compression=ZIP_STORED) as zip_file:
+        for screen_name, entry in entries.items():
+            if entry is not None:
+                zip_file.write(entry[1], f"{screen_name}.{entry[0].rsplit('.', 1)[-1]}")
+    return buffer.getvalue()
 
 
 async def __get_description(request: Request, screen_name: str) -> str:
-    info = await __get_info(request, screen_name)
-    return info.get('description', '')
+    info, _ = await __get_info_fields(request, screen_name, 'description')
+    return info.get('description') or ''
+
+
+async def __head_icon_url(request: Request, url: str) -> Optional[bool]:
+    """Check the icon url with a HEAD request, if the request failed, return None."""
+    status, _ = await request.app.downloader.head(url, headers={'User-Agent': ICON_CHECK_USER_AGENT})
+    return None if status == 0 else status == 200
+
+
+async def __set_icon_url_state(request: Request, url: str, valid: bool) -> None:
+    key = 'twitter-icon-valid-' + url
+    request.app.simple_cache.set(key, (valid, time()))
+    await request.app.redis.set(key, (valid, time()), request.app.icon_check_stale_ttl)
+
+
+async def __revalidate_icon_url(request: Request, url: str) -> None:
+    """Check the icon url in background."""
+    try:
+        valid = await __head_icon_url(request, url)
+        if valid is not None:
+            await __set_icon_url_state(request, url, valid)
+    finally:
+        request.app.checking_icons.discard(url)
+
+
+async def __is_valid_icon_url(request: Request, url: str) -> bool:
+    """
+    Check the icon url, the result is cached in memory and redis.
+    The result older than icon.check_fresh_ttl is used and revalidated in background at a bounded rate,
+    only the result older than icon.check_stale_ttl will block the request.
+    """
+    key = 'twitter-icon-valid-' + url
+    valid, checked_at = request.app.simple_cache.get(key, tuple, (None, 0.0))
+    if valid is None or (time() - checked_at) > request.app.icon_check_fresh_ttl:
+        entry = await request.app.redis.get(key)
+        if entry is not None and entry[1] > checked_at:
+            valid, checked_at = entry
+            # the orjson and msgpack codecs load a tuple as a list.
+            request.app.simple_cache.set(key, (valid, checked_at))
+    if valid is None or (time() - checked_at) > request.app.icon_check_stale_ttl:
+        valid = await __head_icon_url(request, url)
+        if valid is None:
+            return True  # can't reach Twitter, don't refresh the user info.
+        await __set_icon_url_state(request, url, valid)
+    elif (time() - checked_at) > request.app.icon_check_fresh_ttl and url not in request.app.checking_icons:
+        if await request.app.rate_limiter.hit(request.app.icon_revalidation_rate, 'icon-revalidation'):
+            request.app.checking_icons.add(url)
+            request.app.add_task(__revalidate_icon_url(request, url))
+    return valid
 
 
 async def __get_icon(request: Request, screen_name: str) -> dict:
-    # Warning!!
-    # This function will check the icon url per request.
-    # If reach the rate limit, Maybe blocked by Twitter.
-    info = await __get_info(request, screen_name)
-    url = info.get('profile_image_url_https', '')
-    status = mzk.wcheck(
-        url,
-        headers={
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) '
-                          'AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.4352.0 Safari/537.36'
-        }
-    )
-    if not status:
+    info, _ = await __get_info_fields(request, screen_name, 'profile_image_url_https')
+    url = info.get('profile_image_url_https') or ''
+    if not await __is_valid_icon_url(request, url):
         info = await __get_info(request, screen_name, force_refresh=True)
         url = info.get('profile_image_url_https', '')
+        await __set_icon_url_state(request, url, True)
     return {
         'normal': url,
         'mini': url.replace('_normal', '_mini'),
@@ -126,6 +513,13 @@ async def __get_icon(request: Request, screen_name: str) -> dict:
     }
 
 
+async def __get_tweets_etag(request: Request, user_id: int) -> str:
+    """Create a ETag from the latest tweet id and the number of saved tweets."""
+    res = await request.app.mysql.execute_aio(core.TWEETS_STATE_QUERY, (user_id,))
+    max_id, count = res[0] if len(res) > 0 and len(res[0]) > 1 else (None, 0)
+    return make_etag(f'{user_id}-{max_id}-{count}'.encode())
+
+
 async def __save_user_timeline(request: Request, screen_name: str) -> None:
     info = await __get_info(request, screen_name)
     user_id = info.get('id', 0)
@@ -166,7 +560,10 @@ async def get_user_info(request: Request) -> HTTPResponse:
     if screen_name is None:
         raise Forbidden('screen_name parameter format error.')
     try:
-        return json(await __get_info(request, screen_name))
+        info, fetched_at = await __get_info_entry(request, screen_name)
+        return await conditional_response(
+            request, make_etag(f"{info.get('id', 0)}-{fetched_at}".encode()), lambda: json(info), fetched_at
+        )
     except mzk.TweepError:
         raise ServerError('Could not get info from Twitter.')
 
@@ -180,7 +577,11 @@ async def get_description(request: Request) -> HTTPResponse:
     if screen_name is None:
         raise Forbidden('screen_name parameter format error.')
     try:
-        return text(await __get_description(request, screen_name))
+        info, fetched_at = await __get_info_fields(request, screen_name, 'description')
+        description = info.get('description') or ''
+        return await conditional_response(
+            request, make_etag(description.encode()), lambda: text(description), fetched_at
+        )
     except mzk.TweepError:
         raise ServerError('Could not get info from Twitter.')
 
@@ -194,83 +595,77 @@ async def get_icon(request: Request) -> HTTPResponse:
     if screen_name is None:
         raise Forbidden('screen_name parameter format error.')
     try:
-        return json(await __get_icon(request, screen_name))
+        urls = await __get_icon(request, screen_name)
+        return await conditional_response(request, make_etag(urls['normal'].encode()), lambda: json(urls))
     except mzk.TweepError:
         raise ServerError('Could not get info from Twitter.')
 
 
 @root.route('/get-normal-icon', {'GET', 'POST', 'OPTIONS'})
 async def get_normal_icon(request: Request) -> HTTPResponse:
-    screen_name, *_ = mzk.get_args(
-        request,
-        ('screen_name|name', str, None, {'max_length': 32}),
-    )
-    if screen_name is None:
-        raise Forbidden('screen_name parameter format error.')
-    path = core.STORAGE_DIR.joinpath('icon').joinpath(screen_name)
-    if not path.is_dir():
-        await __get_info(request, screen_name, True)
-    for icon in path.iterdir():
-        if icon.name.startswith('normal'):
-            return await file(str(icon), filename=f'{screen_name}-{icon.name}')
+    return await __get_icon_response(request, 'normal')
 
 
 @root.route('/get-mini-icon', {'GET', 'POST', 'OPTIONS'})
 async def get_mini_icon(request: Request) -> HTTPResponse:
-    screen_name, *_ = mzk.get_args(
-        request,
-        ('screen_name|name', str, None, {'max_length': 32}),
-    )
-    if screen_name is None:
-        raise Forbidden('screen_name parameter format error.')
-    path = core.STORAGE_DIR.joinpath('icon').joinpath(screen_name)
-    if not path.is_dir():
-        await __get_info(request, screen_name, True)
-    for icon in path.iterdir():
-        if icon.name.startswith('mini'):
-            return await file(str(icon), filename=f'{screen_name}-{icon.name}')
+    return await __get_icon_response(request, 'mini')
 
 
 @root.route('/get-bigger-icon', {'GET', 'POST', 'OPTIONS'})
 async def get_bigger_icon(request: Request) -> HTTPResponse:
-    screen_name, *_ = mzk.get_args(
-        request,
-        ('screen_name|name', str, None, {'max_length': 32}),
-    )
-    if screen_name is None:
-        raise Forbidden('screen_name parameter format error.')
-    path = core.STORAGE_DIR.joinpath('icon').joinpath(screen_name)
-    if not path.is_dir():
-        await __get_info(request, screen_name, True)
-    for icon in path.iterdir():
-        if icon.name.startswith('bigger'):
-            return await file(str(icon), filename=f'{screen_name}-{icon.name}')
+    return await __get_icon_response(request, 'bigger')
 
 
 @root.route('/get-raw-icon', {'GET', 'POST', 'OPTIONS'})
 async def get_raw_icon(request: Request) -> HTTPResponse:
-    screen_name, *_ = mzk.get_args(
+    return await __get_icon_response(request, 'raw')
+
+
+@root.route('/get-icon-file', {'GET', 'POST', 'OPTIONS'})
+async def get_icon_file(request: Request) -> HTTPResponse:
+    return await __get_icon_response(request)
+
+
+@root.route('/get-icons', {'GET', 'POST', 'OPTIONS'})
+async def get_icons(request: Request) -> HTTPResponse:
+    """
+    Get many icons at once.
+    pack=json returns {screen_name: the url of the icon or null}, pack=zip returns a zip file of the icons.
+    """
+    screen_names, variant, pack, *_ = mzk.get_args(
         request,
-        ('screen_name|name', str, None, {'max_length': 32}),
+        ('screen_names|names', list, None),
+        ('variant|size', str, 'normal', {'max_length': 16}),
+        ('pack', str, 'json', {'is_in': ['json', 'zip']}),
     )
-    if screen_name is None:
-        raise Forbidden('screen_name parameter format error.')
-    path = core.STORAGE_DIR.joinpath('icon').joinpath(screen_name)
-    if not path.is_dir():
-        await __get_info(request, screen_name, True)
-    for icon in path.iterdir():
-        if icon.name.startswith('raw'):
-            return await file(str(icon), filename=f'{screen_name}-{icon.name}')
+    # the query string and the form value is a json string, so the number of names is checked after the conversion.
+    if screen_names is None or not 1 <= len(screen_names) <= request.app.icon_batch_max_size or \
+            not all(isinstance(screen_name, str) and 0 < len(screen_name) <= 32 for screen_name in screen_names):
+        raise Forbidden('screen_names parameter format error.')
+    variant, icon_format = __get_icon_options(request, variant)
+    entries = await __get_icon_file_entries(request, list(dict.fromkeys(screen_names)), variant, icon_format)
+    etag = make_etag('|'.join(
+        [pack] + [f'{screen_name}:{None if entry is None else entry[0]}' for screen_name, entry in entries.items()]
+    ).encode())
+
+    async def __create_response() -> HTTPResponse:
+        if pack == 'zip':
+            return raw(
+                await get_running_loop().run_in_executor(None, __pack_icons, entries),
+                content_type='application/zip',
+                headers={'Content-Disposition': 'attachment; filename="icons.zip"'}
+            )
+        return json({
+            screen_name: None if entry is None else ICON_URL_PREFIX + request.app.icon_store.get_relative_path(entry[0])
+            for screen_name, entry in entries.items()
+        })
+
+    return await conditional_response(request, etag, __create_response)
 
 
 @root.route('/static/icons/<screen_name>', {'GET', 'POST', 'OPTIONS'})
 async def icons(request: Request, screen_name) -> HTTPResponse:
-    path = core.STORAGE_DIR.joinpath('icon').joinpath(screen_name)
-    if not path.is_dir():
-        await __get_info(request, screen_name, True)
-    for icon in path.iterdir():
-        if icon.name.startswith('raw'):
-            return await file(str(icon), filename=f'{screen_name}-{icon.name}')
+    return await __get_icon_file(request, screen_name, 'raw')
 
 
 @root.route('/save-tweets', {'GET', 'POST', 'OPTIONS'})
@@ -300,9 +695,12 @@ async def get_tweets(request: Request) -> HTTPResponse:
     if screen_name is None:
         raise Forbidden('screen_name parameter format error.')
     info = await __get_info(request, screen_name)
-    return json(
-        await request.app.mysql.execute_aio(core.GET_TWEETS_QUERY, (info.get('id', 0),))
-    )
+    user_id = info.get('id', 0)
+
+    async def __create_response() -> HTTPResponse:
+        return json(await request.app.mysql.execute_aio(core.GET_TWEETS_QUERY, (user_id,)))
+
+    return await conditional_response(request, await __get_tweets_etag(request, user_id), __create_response)
 
 
 @root.route('/get-latest-tweets', {'GET', 'POST', 'OPTIONS'})
@@ -314,13 +712,18 @@ async def get_latest_tweets(request: Request) -> HTTPResponse:
     if screen_name is None:
         raise Forbidden('screen_name parameter format error.')
     info = await __get_info(request, screen_name)
-    res = await request.app.mysql.execute_aio(core.GET_TWEETS_QUERY, (info.get('id', 0),))
-    if len(res) > 0 and len(res[0]) > 0:
-        data = list(res)
-        data.sort(key=lambda x: parse(x[3]), reverse=True)
-        return json(data[:8192])
-    else:
-        return json([])
+    user_id = info.get('id', 0)
+
+    async def __create_response() -> HTTPResponse:
+        res = await request.app.mysql.execute_aio(core.GET_TWEETS_QUERY, (user_id,))
+        if len(res) > 0 and len(res[0]) > 0:
+            data = list(res)
+            data.sort(key=lambda x: parse(x[3]), reverse=True)
+            return json(data[:8192])
+        else:
+            return json([])
+
+    return await conditional_response(request, await __get_tweets_etag(request, user_id), __create_response)
         
 
 @root.route('/check-saved-tweets-count', {'GET', 'POST', 'OPTIONS'})
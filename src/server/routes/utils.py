@@ -1,7 +1,14 @@
 # -- Imports --------------------------------------------------------------------------
 
+from typing import (
+    Optional, Callable, Union, Awaitable
+)
 from sanic.request import Request
+from sanic.response import HTTPResponse
 from sanic.exceptions import Forbidden
+from hashlib import md5
+from inspect import isawaitable
+from email.utils import formatdate, parsedate_to_datetime
 from ... import moca_modules as mzk
 
 # -------------------------------------------------------------------------- Imports --
@@ -14,4 +21,54 @@ def check_root_pass(request: Request) -> None:
     if root_pass != request.app.system_config.get_config('root_pass'):
         raise Forbidden('Invalid root password.')
 
+
+def make_etag(data: bytes) -> str:
+    """Create a strong ETag from the data."""
+    return f'"{md5(data).hexdigest()}"'
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[float] = None) -> bool:
+    """Check If-None-Match and If-Modified-Since headers."""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or \
+               etag in [item.strip().replace('W/', '', 1) for item in if_none_match.split(',')]
+    if_modified_since = request.headers.get('If-Modified-Since')
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError, IndexError):
+            return False
+    return False
+
+
+async def conditional_response(
+        request: Request,
+        etag: str,
+        create_response: Callable[[], Union[HTTPResponse, Awaitable[HTTPResponse]]],
+        last_modified: Optional[float] = None,
+) -> HTTPResponse:
+    """
+    Return 304 if the client already has this version, otherwise create the response.
+    ETag, Cache-Control and Last-Modified headers will be added to the response.
+    :param request: the request object.
+    :param etag: the ETag of the current version.
+    :param create_response: create the full response, only called when the client has an old version.
+    :param last_modified: the unix time the data was updated.
+    """
+    # the routes are protected by the api key, so the shared caches (proxy, CDN) must not store the response.
+    headers = {
+        'ETag': etag,
+        'Cache-Control': f"private, max-age={request.app.system_config.get_config('cache_control_max_age', int, 60)}",
+    }
+    if last_modified is not None:
+        headers['Last-Modified'] = formatdate(last_modified, usegmt=True)
+    if is_not_modified(request, etag, last_modified):
+        return HTTPResponse(status=304, headers=headers)
+    response = create_response()
+    if isawaitable(response):
+        response = await response
+    response.headers.update(headers)
+    return response
+
 # -------------------------------------------------------------------------- Utils --
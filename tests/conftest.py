@@ -0,0 +1,55 @@
+# -- Imports --------------------------------------------------------------------------
+
+import sys
+import pytest
+from types import ModuleType
+from pathlib import Path
+from threading import Thread
+from typing import Tuple
+
+# -------------------------------------------------------------------------- Imports --
+
+# -- Packages --------------------------------------------------------------------------
+
+# src/__init__.py starts the console, and src/moca_modules/__init__.py tries to install the missing requirements,
+# so the tests import the sub packages (src.moca_modules.moca_xxx) without running these two files.
+ROOT: Path = Path(__file__).resolve().parent.parent
+
+for __name, __path in (('src', ROOT.joinpath('src')), ('src.moca_modules', ROOT.joinpath('src', 'moca_modules'))):
+    if __name not in sys.modules:
+        __module = ModuleType(__name)
+        __module.__path__ = [str(__path)]
+        sys.modules[__name] = __module
+
+# -------------------------------------------------------------------------- Packages --
+
+# -- Fixtures --------------------------------------------------------------------------
+
+
+@pytest.fixture
+def redis_server():
+    """
+    Return a function that starts a fake redis server on a random port and returns its address.
+    The fake server closes the connection after an error reply, so the lua scripts are loaded in advance
+    instead of going through the NOSCRIPT fallback of MocaRedis.run_script.
+    """
+    fakeredis = pytest.importorskip('fakeredis')
+    servers = []
+
+    def __start(*scripts: str) -> Tuple[str, int]:
+        if len(scripts) > 0:
+            pytest.importorskip('lupa')
+        server = fakeredis.TcpFakeServer(('127.0.0.1', 0), server_type='redis')
+        Thread(target=server.serve_forever, daemon=True).start()
+        client = fakeredis.FakeStrictRedis(server=server.fake_server)
+        for script in scripts:
+            client.script_load(script)
+        servers.append(server)
+        return server.server_address
+
+    yield __start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+# -------------------------------------------------------------------------- Fixtures --
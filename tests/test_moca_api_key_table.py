@@ -0,0 +1,87 @@
+from src.moca_modules.moca_sanic.MocaAPIKeyTable import MocaPrefixTrie, MocaAPIKeyTable
+
+
+def find_by_startswith(prefixes, text):
+    """The linear scan that the trie replaces."""
+    for prefix in prefixes:
+        if text.startswith(prefix):
+            return prefix
+    return None
+
+
+def test_prefix_trie_first_added_prefix_wins():
+    trie = MocaPrefixTrie()
+    trie.add('/moca-twitter/get-icon', 1)
+    trie.add('/moca-twitter', 2)
+    trie.add('/moca-twitter', 3)  # the first value is kept.
+    assert len(trie) == 2
+    assert trie.find('/moca-twitter/get-icon/el') == ('/moca-twitter/get-icon', 1)
+    assert trie.find('/moca-twitter/get-user') == ('/moca-twitter', 2)
+    assert trie.find('/moca') is None
+    assert trie.find('') is None
+    # the shorter prefix added first wins, like startswith in order.
+    trie = MocaPrefixTrie()
+    trie.add('/a', 1)
+    trie.add('/a/b', 2)
+    assert trie.find('/a/b/c') == ('/a', 1)
+
+
+def test_prefix_trie_empty_prefix():
+    trie = MocaPrefixTrie()
+    trie.add('/private', 1)
+    trie.add('', 2)
+    assert trie.find('/private/x') == ('/private', 1)
+    assert trie.find('/public') == ('', 2)
+
+
+def test_prefix_trie_matches_startswith():
+    prefixes = ['/a/b', '/a', '/ab', '/b/c/d', '/', '/b/c', '/a/b/c']
+    trie = MocaPrefixTrie()
+    for prefix in prefixes:
+        trie.add(prefix)
+    for text in ['/a/b/c', '/ab/c', '/b/c/d/e', '/b/x', '/', 'x', '/a']:
+        found = trie.find(text)
+        assert (None if found is None else found[0]) == find_by_startswith(prefixes, text)
+
+
+def test_api_key_table():
+    items = [
+        {
+            'key': 'key-1',
+            'status': True,
+            'rate': '100/minute',
+            'allowed_path': ['/moca-twitter/get-icon:10/second', '/moca-twitter'],
+            'ip': ['127.0.0.1'],
+            'required': {'headers': {'X-Moca': 'yes'}, 'args': {'lang': 'ja'}},
+            'delay': 0.5,
+        },
+        {'key': 'key-2', 'rate': '*', 'allowed_path': ['/']},
+        {'key': 'key-1', 'status': False},  # duplicated, ignored.
+        {'status': True},  # no key, ignored.
+        'broken',
+    ]
+    table = MocaAPIKeyTable(items)
+    assert len(table) == 2
+    key = table.get('key-1')
+    assert key.status and key.rate == ((100, 60),)
+    assert key.paths.find('/moca-twitter/get-icon/el') == ('/moca-twitter/get-icon', ((10, 1),))
+    assert key.paths.find('/moca-twitter/get-user') == ('/moca-twitter', None)
+    assert key.paths.find('/status') is None
+    assert key.ips == frozenset(['127.0.0.1'])
+    assert key.headers == (('X-Moca', 'yes'),) and key.args == (('lang', 'ja'),)
+    assert key.delay == 0.5
+    key = table.get('key-2')
+    assert not key.status and key.rate is None and key.ips is None
+    assert table.get('key-3') is None
+
+
+def test_api_key_table_is_rebuilt_only_when_the_list_is_changed():
+    items = [{'key': 'key-1'}]
+    table = MocaAPIKeyTable(items)
+    key = table.get('key-1')
+    table.update(items)
+    assert table.get('key-1') is key
+    table.update([{'key': 'key-2'}])
+    assert table.get('key-1') is None and table.get('key-2') is not None
+    table.update(None)
+    assert len(table) == 0
@@ -0,0 +1,67 @@
+import pytest
+from gzip import decompress
+from pickle import loads
+from src.moca_modules.moca_utils.moca_codec import (
+    MocaCodec, DEFAULT_CODEC, CODEC_MAGIC, LEGACY_MAGIC, get_codec, get_serializers, get_compressors
+)
+
+VALUE = {'id': 1, 'name': 'moca', 'tags': ['a', 'b'], 'text': 'x' * 4096}
+
+
+def old_moca_loads(data):
+    """moca_loads before the codecs were added."""
+    return loads(decompress(data[4:])) if data[:4] == b'moca' else loads(data)
+
+
+@pytest.mark.parametrize('serializer', get_serializers())
+@pytest.mark.parametrize('compressor', get_compressors())
+def test_round_trip(serializer, compressor):
+    codec = MocaCodec(serializer, compressor, threshold=16)
+    data = codec.dumps(VALUE)
+    assert data[:2] == CODEC_MAGIC
+    assert codec.loads(data) == VALUE
+    # the tagged data can be read by any codec.
+    assert MocaCodec('pickle', 'none').loads(data) == VALUE
+
+
+def test_default_codec_writes_the_legacy_format():
+    small, large = DEFAULT_CODEC.dumps((1, 2)), DEFAULT_CODEC.dumps(VALUE)
+    assert large[:4] == LEGACY_MAGIC
+    assert old_moca_loads(small) == (1, 2)
+    assert old_moca_loads(large) == VALUE
+    assert DEFAULT_CODEC.loads(large) == VALUE
+
+
+def test_legacy_requires_pickle():
+    with pytest.raises(ValueError):
+        MocaCodec('orjson', legacy=True)
+
+
+def test_tagged_codec_reads_legacy_data():
+    codec = get_codec('pickle', 'zlib', 1024, 1)
+    assert codec.loads(DEFAULT_CODEC.dumps(VALUE)) == VALUE
+    assert codec.loads(DEFAULT_CODEC.dumps('small')) == 'small'
+
+
+def test_get_codec_shares_instances():
+    assert get_codec('pickle', 'zlib') is get_codec('pickle', 'zlib')
+    assert get_codec('pickle', 'gzip', 1024, None, True, True) is DEFAULT_CODEC
+
+
+@pytest.mark.parametrize('serializer', [name for name in ('orjson', 'msgpack') if name in get_serializers()])
+def test_json_shaped_serializers_load_tuples_as_lists(serializer):
+    codec = MocaCodec(serializer)
+    assert codec.loads(codec.dumps((True, 1.5))) == [True, 1.5]
+
+
+def test_untagged_msgpack_is_not_read_as_pickle():
+    if 'msgpack' not in get_serializers():
+        pytest.skip('msgpack is not installed.')
+    codec = MocaCodec('msgpack', tagged=False)
+    data = codec.dumps({})
+    assert data[:1] == b'\x80'  # the empty map looks like a pickle header.
+    assert codec.loads(data) == {}
+
+
+def test_loads_none():
+    assert DEFAULT_CODEC.loads(None) is None
@@ -0,0 +1,24 @@
+from src.moca_modules.moca_file.MocaContentStore import MocaContentStore
+
+
+def test_add_is_content_addressed(tmp_path):
+    store = MocaContentStore(tmp_path.joinpath('store'))
+    name = store.add(b'icon', 'png')
+    assert name == store.add(b'icon', 'png')
+    assert store.get_relative_path(name) == f'{name[:2]}/{name[2:4]}/{name}'
+    assert store.get_path(name).read_bytes() == b'icon'
+    store.remove(name)
+    assert not store.exists(name)
+
+
+def test_tmp_dir_outside_of_the_root(tmp_path):
+    root, tmp_dir = tmp_path.joinpath('icons'), tmp_path.joinpath('tmp', 'icons')
+    store = MocaContentStore(root, tmp_dir=tmp_dir)
+    tmp = store.get_tmp_path('.png')
+    assert tmp.parent == tmp_dir
+    tmp.write_bytes(b'icon')
+    name = store.add_file(tmp)
+    assert name.endswith('.png') and store.exists(name)
+    assert list(tmp_dir.iterdir()) == []
+    # only the finished files are in the root directory.
+    assert [path for path in root.rglob('*') if path.is_file()] == [store.get_path(name)]
@@ -0,0 +1,26 @@
+from src.moca_modules.moca_file.MocaDirectoryCache import MocaDirectoryCache
+
+
+def test_overflow_file_is_promoted_on_read(tmp_path):
+    for name in ('a', 'b', 'c'):
+        tmp_path.joinpath(name).write_bytes(name.encode() * 10)
+    cache = MocaDirectoryCache(tmp_path, manual_reload=True, max_bytes=20)
+    assert cache.stats['entries'] == 2 and cache.stats['overflow'] == 1
+    overflow = next(iter(cache._overflow))
+    assert cache.get(overflow)[1] == open(overflow, mode='rb').read()
+    # the file is in the memory now, and the least recently used file was moved out.
+    assert overflow in cache.cache
+    assert cache.stats['entries'] == 2 and cache.stats['overflow'] == 1
+    assert cache.current_bytes <= 20
+
+
+def test_recently_used_file_stays_in_memory(tmp_path):
+    for name in ('a', 'b', 'c'):
+        tmp_path.joinpath(name).write_bytes(name.encode() * 10)
+    cache = MocaDirectoryCache(tmp_path, manual_reload=True, max_bytes=20)
+    hot = next(iter(cache.cache))
+    overflow = next(iter(cache._overflow))
+    cache.get(hot)
+    cache.get(overflow)
+    assert hot in cache.cache
+    assert cache.get(str(tmp_path.joinpath('missing'))) is None
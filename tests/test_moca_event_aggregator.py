@@ -0,0 +1,42 @@
+from src.moca_modules.moca_log.MocaEventAggregator import MocaEventAggregator
+
+
+class FakeLog:
+    """Collect the log lines instead of writing them."""
+
+    def __init__(self):
+        self.lines = []
+        self.dropped = 0
+
+    def write_log(self, message, level):
+        self.lines.append(message)
+
+
+def test_sampling_and_summary():
+    log = FakeLog()
+    aggregator = MocaEventAggregator(log, 'unknown_api_key', sample_rate=2)
+    counts = [aggregator.hit('192.0.2.1', 'raw') for _ in range(5)]
+    counts.append(aggregator.hit('192.0.2.2', 'raw'))
+    aggregator.hit('192.0.2.2')
+    assert counts == [1, 2, 3, 4, 5, 1]
+    # only sample_rate raw events per second. (the hits may cross a second boundary)
+    assert log.lines == ['raw'] * len(log.lines) and 2 <= len(log.lines) <= 4
+    log.lines.clear()
+    log.dropped = 3
+    aggregator.flush()
+    assert len(log.lines) == 1
+    assert log.lines[0].startswith('<unknown_api_key> 7 events from 2 sources')
+    assert '3 log lines were dropped' in log.lines[0]
+    assert log.lines[0].endswith('top sources: 192.0.2.1=5, 192.0.2.2=2')
+
+
+def test_flush_resets_the_counts():
+    log = FakeLog()
+    aggregator = MocaEventAggregator(log, 'unknown_api_key')
+    aggregator.hit('192.0.2.1')
+    aggregator.flush()
+    assert aggregator.hit('192.0.2.1') == 1
+    aggregator.flush()
+    # nothing happened in the interval, no summary.
+    aggregator.flush()
+    assert len(log.lines) == 2
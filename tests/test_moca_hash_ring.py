@@ -0,0 +1,48 @@
+from src.moca_modules.moca_redis.MocaHashRing import MocaHashRing
+
+NODES = [('127.0.0.1', 6379), ('127.0.0.1', 6380), ('127.0.0.1', 6381)]
+KEYS = [f'key-{index}' for index in range(3000)]
+
+
+def test_hash_tag():
+    assert MocaHashRing.hash('user-{123}-info') == MocaHashRing.hash('123')
+    assert MocaHashRing.hash('a-{123}') == MocaHashRing.hash('b-{123}-{456}')
+    # an empty tag is ignored.
+    assert MocaHashRing.hash('a-{}') != MocaHashRing.hash('b-{}')
+    ring = MocaHashRing(NODES)
+    assert len({ring.get_node(f'counter-{{ip}}-{index}') for index in range(100)}) == 1
+
+
+def test_distribution():
+    ring = MocaHashRing(NODES)
+    counts = {node: 0 for node in NODES}
+    for key in KEYS:
+        counts[ring.get_node(key)] += 1
+    assert min(counts.values()) > len(KEYS) / len(NODES) * 0.7
+
+
+def test_only_the_keys_of_the_removed_node_move():
+    ring = MocaHashRing(NODES)
+    before = {key: ring.get_node(key) for key in KEYS}
+    ring.remove_node(NODES[1])
+    assert len(ring) == 2 and NODES[1] not in ring.nodes
+    for key in KEYS:
+        if before[key] != NODES[1]:
+            assert ring.get_node(key) == before[key]
+        else:
+            assert ring.get_node(key) in (NODES[0], NODES[2])
+    # the node gets the same keys back.
+    ring.add_node(NODES[1])
+    assert {key: ring.get_node(key) for key in KEYS} == before
+
+
+def test_add_and_remove():
+    ring = MocaHashRing([], vnodes=10)
+    assert ring.get_node('key') is None
+    ring.add_node(NODES[0])
+    ring.add_node(NODES[0])
+    assert len(ring) == 1 and len(ring._points) == 10
+    assert ring.get_node('key') == NODES[0]
+    ring.remove_node(NODES[1])
+    ring.remove_node(NODES[0])
+    assert len(ring) == 0 and ring.get_node('key') is None
@@ -0,0 +1,32 @@
+from io import BytesIO
+from PIL import Image
+from src.moca_modules.moca_utils.moca_utils import resize_img, save_resized_img
+
+
+def create_img(mode: str = 'RGBA', img_format: str = 'PNG') -> bytes:
+    data = BytesIO()
+    Image.new(mode, (64, 64)).save(data, img_format)
+    return data.getvalue()
+
+
+def test_resize_img():
+    img = Image.open(BytesIO(resize_img(create_img(), 32, 16, 'png')))
+    assert img.format == 'PNG' and img.size == (32, 16)
+    # the height is the same as the width, and the alpha channel is removed for jpeg.
+    img = Image.open(BytesIO(resize_img(create_img(), 24, None, 'JPEG', quality=50)))
+    assert img.format == 'JPEG' and img.size == (24, 24)
+    assert Image.open(BytesIO(resize_img(create_img('P'), None, None, 'WEBP'))).size == (64, 64)
+
+
+def test_save_resized_img(tmp_path):
+    filename = tmp_path.joinpath('icon.jpg')
+    assert save_resized_img(create_img(), str(filename), 48)
+    assert Image.open(filename).size == (48, 48)
+    assert not save_resized_img(create_img(), str(tmp_path.joinpath('icon.unknown')), 48)
+
+
+def test_save_broken_img(tmp_path):
+    filename = tmp_path.joinpath('icon.png')
+    assert not save_resized_img(b'not an image', str(filename), 48)
+    assert not save_resized_img(str(tmp_path.joinpath('missing.png')), str(filename), 48)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,143 @@
+from time import time
+from ipaddress import ip_address, ip_network
+from multiprocessing import get_context
+from src.moca_modules.moca_ip.MocaIPSet import MocaIPSet
+from src.moca_modules.moca_ip.MocaIPBlacklist import MocaIPBlacklist
+
+
+def test_exact_and_networks():
+    ip_set = MocaIPSet()
+    assert ip_set.add(' 192.0.2.1 ') == '192.0.2.1'
+    assert ip_set.add('198.51.100.7/24') == '198.51.100.0/24'
+    assert ip_set.add('2001:db8::/32') == '2001:db8::/32'
+    assert len(ip_set) == 3
+    assert '192.0.2.1' in ip_set and '192.0.2.2' not in ip_set
+    assert '198.51.100.255' in ip_set and '198.51.101.0' not in ip_set
+    assert '2001:db8:1::1' in ip_set and '2001:db9::1' not in ip_set
+    # the ipv4-mapped ipv6 address.
+    assert '::ffff:198.51.100.1' in ip_set and '::ffff:192.0.2.1' in ip_set
+    assert 'not an ip' not in ip_set
+    ip_set.remove('198.51.100.0/24')
+    assert '198.51.100.1' not in ip_set and len(ip_set) == 2
+
+
+def test_zero_prefix_network():
+    ip_set = MocaIPSet()
+    ip_set.add('0.0.0.0/0')
+    assert '192.0.2.1' in ip_set and '255.255.255.255' in ip_set
+    assert '2001:db8::1' not in ip_set
+    ip_set.add('::/0')
+    assert '2001:db8::1' in ip_set
+    ip_set.remove('0.0.0.0/0')
+    assert '192.0.2.1' not in ip_set
+
+
+def test_nested_networks_and_expiry():
+    now = time()
+    ip_set = MocaIPSet()
+    ip_set.add('10.0.0.0/8', now + 100)
+    ip_set.add('10.1.0.0/16', now + 200)
+    ip_set.add('10.1.2.0/24', now - 1)
+    # the longest expiry time of the matching networks.
+    assert ip_set.get_expire('10.1.2.3') == now + 200
+    assert ip_set.get_expire('10.2.0.1') == now + 100
+    ip_set.add('10.0.0.0/8')
+    assert ip_set.get_expire('10.1.2.3') == 0
+    assert ip_set.remove_expired() == ['10.1.2.0/24']
+    ip_set.clear()
+    assert len(ip_set) == 0 and '10.0.0.1' not in ip_set
+
+
+def test_matches_ipaddress():
+    networks = ['10.0.0.0/8', '10.20.30.0/23', '172.16.0.0/12', '192.168.1.128/25', '100.64.0.0/10']
+    ip_set = MocaIPSet()
+    for network in networks:
+        ip_set.add(network)
+    for index in range(0, 2 ** 32, 2 ** 32 // 5000 + 7):
+        ip = str(ip_address(index))
+        assert (ip in ip_set) == any(ip_address(ip) in ip_network(network) for network in networks), ip
+
+
+def test_blacklist_log_file(tmp_path):
+    log_file = tmp_path.joinpath('ip-blacklist.log')
+    first, second = MocaIPBlacklist(log_file), MocaIPBlacklist(log_file)
+    first.set_static(['203.0.113.0/24'])
+    assert first.set_static(['203.0.113.0/24', 'broken']) == ['broken']
+    first.add('192.0.2.1')
+    first.add('198.51.100.0/24', ttl=60)
+    assert '203.0.113.1' in first and '192.0.2.1' in first
+    assert '192.0.2.1' not in second
+    second.reload_file()
+    assert '192.0.2.1' in second and '198.51.100.1' in second
+    first.remove('192.0.2.1')
+    second.reload_file()
+    assert '192.0.2.1' not in second
+    # a new instance reads all lines.
+    assert '198.51.100.1' in MocaIPBlacklist(log_file)
+
+
+def test_blacklist_compact(tmp_path):
+    log_file = tmp_path.joinpath('ip-blacklist.log')
+    first, second = MocaIPBlacklist(log_file), MocaIPBlacklist(log_file)
+    for index in range(10):
+        first.add(f'192.0.2.{index}')
+        first.remove(f'192.0.2.{index}')
+    second.add('198.51.100.1')  # not read by the first instance yet.
+    first.add('192.0.2.1', ttl=-1)
+    first.compact()
+    assert len(log_file.read_text().splitlines()) == 2
+    assert '198.51.100.1' in first
+    # the second instance appends to the new file and reads it again.
+    second.add('198.51.100.2')
+    second.reload_file()
+    assert '198.51.100.1' in second and '192.0.2.1' in second
+    first.reload_file()
+    assert '198.51.100.2' in first
+
+
+def add_many(log_file, start: int) -> None:
+    blacklist = MocaIPBlacklist(log_file, compact_threshold=20)
+    for index in range(start, start + 300):
+        blacklist.add(f'10.0.{index // 256}.{index % 256}')
+        blacklist.remove('192.0.2.1')
+        blacklist.compact_if_needed()
+
+
+def test_blacklist_compact_while_other_processes_append(tmp_path):
+    log_file = tmp_path.joinpath('ip-blacklist.log')
+    MocaIPBlacklist(log_file)
+    context = get_context('fork')
+    processes = [context.Process(target=add_many, args=(str(log_file), index * 300)) for index in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert len(MocaIPBlacklist(log_file).dynamic) == 1200
+
+
+def test_blacklist_compact_only_when_called(tmp_path):
+    log_file = tmp_path.joinpath('ip-blacklist.log')
+    blacklist = MocaIPBlacklist(log_file, compact_threshold=20)
+    for index in range(30):
+        blacklist.add('192.0.2.1')
+    assert len(log_file.read_text().splitlines()) == 30
+    assert blacklist.compact_if_needed()
+    assert len(log_file.read_text().splitlines()) == 1
+    assert not blacklist.compact_if_needed()
+
+
+def test_blacklist_reload_replaced_file(tmp_path):
+    log_file = tmp_path.joinpath('ip-blacklist.log')
+    first, second = MocaIPBlacklist(log_file), MocaIPBlacklist(log_file)
+    first.add('192.0.2.1')
+    second.reload_file()
+    dynamic = second.dynamic
+    first.add('192.0.2.2')
+    first.compact()
+    second.reload_file()
+    # the new set is built aside and replaces the old one, the old one is never cleared.
+    assert second.dynamic is not dynamic and '192.0.2.1' in dynamic
+    assert '192.0.2.1' in second and '192.0.2.2' in second
+    # the entries that were not persisted by this process are kept until the file is replaced.
+    second.add('198.51.100.1', persist=False)
+    assert '198.51.100.1' in second
@@ -0,0 +1,83 @@
+from asyncio import run
+from importlib import import_module
+from src.moca_modules.moca_redis.MocaRedis import MocaRedis
+from src.moca_modules.moca_redis.MocaRateLimiter import MocaRateLimiter, SLIDING_WINDOW_SCRIPT
+
+
+async def hit_many(limiter, rate, key, times):
+    return [await limiter.hit(rate, key) for _ in range(times)]
+
+
+def test_parse():
+    assert MocaRateLimiter.parse('100/minute;1000 per hour') == ((100, 60), (1000, 3600))
+
+
+def test_local_limit():
+    limiter = MocaRateLimiter()
+    assert run(hit_many(limiter, '10/day', 'ip', 12)) == [True] * 10 + [False] * 2
+    # the other keys have their own buckets.
+    assert run(limiter.hit('10/day', 'other-ip'))
+
+
+def test_lease_a_chunk_of_tokens():
+    limiter = MocaRateLimiter(lease_divisor=5)
+    assert run(limiter.hit('100/day', 'ip'))
+    # one request leased 100 / 5 tokens, 19 of them are left in the local bucket.
+    assert sum(limiter._counters.values()) == 20
+    assert limiter._buckets['ip/100/86400'][0] == 19
+    # the max lease caps the chunk.
+    limiter = MocaRateLimiter(max_lease=3, lease_divisor=1)
+    assert run(limiter.hit('100/day', 'ip', cost=2))
+    assert sum(limiter._counters.values()) == 3
+
+
+def test_rejected_bucket_does_not_lease_again():
+    limiter = MocaRateLimiter()
+    calls = []
+    lease = limiter._lease
+
+    async def counted_lease(*args):
+        calls.append(args)
+        return await lease(*args)
+
+    limiter._lease = counted_lease
+    assert run(hit_many(limiter, '2/day', 'ip', 5)) == [True, True, False, False, False]
+    # a small limit is leased one token at a time, only the first rejection asks redis.
+    assert len(calls) == 3
+
+
+def test_multiple_limits():
+    limiter = MocaRateLimiter()
+    assert run(hit_many(limiter, '5/hour;3/day', 'ip', 4)) == [True] * 3 + [False]
+
+
+def test_sliding_window(monkeypatch):
+    now = [86400.0 * 1000]
+    monkeypatch.setattr(import_module('src.moca_modules.moca_redis.MocaRateLimiter'), 'time', lambda: now[0])
+    limiter = MocaRateLimiter(lease_divisor=1)
+    assert run(hit_many(limiter, '10/minute', 'ip', 11)) == [True] * 10 + [False]
+    # half of the previous window is still counted.
+    now[0] += 90
+    assert run(hit_many(limiter, '10/minute', 'ip', 6)) == [True] * 5 + [False]
+    # the expired buckets and counters are removed.
+    now[0] += 120
+    limiter._remove_expired_buckets(now[0])
+    assert limiter._buckets == {} and limiter._counters == {}
+
+
+def test_global_limit_on_redis(redis_server):
+    host, port = redis_server(SLIDING_WINDOW_SCRIPT)
+
+    async def main():
+        redis = MocaRedis(host, port, 0, '')
+        workers = [MocaRateLimiter(redis, lease_divisor=4) for _ in range(3)]
+        results = []
+        for _ in range(10):
+            for worker in workers:
+                results.append(await worker.hit('20/day', 'api-key'))
+        # every worker leased its tokens from the same counter.
+        return results.count(True), [worker._buckets['api-key/20/86400'][0] for worker in workers]
+
+    allowed, left = run(main())
+    assert allowed + sum(left) == 20
+    assert allowed == 20
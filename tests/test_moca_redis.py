@@ -0,0 +1,116 @@
+from asyncio import run, sleep
+from aioredis import ConnectionClosedError
+from src.moca_modules.moca_redis.MocaRedis import MocaRedis
+
+NODES = [('127.0.0.1', 6379), ('127.0.0.1', 6380), ('127.0.0.1', 6381)]
+
+
+class BrokenPool:
+    """A connection pool of the node that went down while the commands were sent."""
+
+    def get(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def execute(self, *args):
+        raise ConnectionClosedError('Reader at end of file')
+
+    def close(self):
+        pass
+
+
+def test_route_key():
+    assert MocaRedis.get_route_key('GET', ('key',)) == 'key'
+    assert MocaRedis.get_route_key('set', (b'key', 1)) == 'key'
+    assert MocaRedis.get_route_key('PUBLISH', ('channel', 'message')) is None
+    assert MocaRedis.get_route_key('EVALSHA', ('sha', 2, 'a', 'b', 1)) == 'a'
+    assert MocaRedis.get_route_key('EVALSHA', ('sha', 0, 1)) is None
+    assert MocaRedis.get_route_key('XGROUP', ('CREATE', 'stream', 'group', '0')) == 'stream'
+    assert MocaRedis.get_route_key('XREADGROUP', ('GROUP', 'g', 'c', 'COUNT', 1, 'STREAMS', 'stream', '>')) == 'stream'
+
+
+def test_mark_down():
+    redis = MocaRedis(*NODES[0], 0, '', nodes=NODES[1:], retry_interval=30)
+    keys = [f'key-{index}' for index in range(1000)]
+    before = {key: redis.get_node(key) for key in keys}
+    assert redis.get_node(None) == NODES[0]
+    assert redis.mark_down(NODES[0])
+    assert not redis.mark_down(NODES[0])
+    # the keyless commands and the pub/sub go to the next live node.
+    assert redis.get_node(None) == NODES[1]
+    for key in keys:
+        if before[key] != NODES[0]:
+            assert redis.get_node(key) == before[key]
+    # the last live node is never removed.
+    assert redis.mark_down(NODES[1])
+    assert not redis.mark_down(NODES[2])
+    assert redis.live_nodes == [NODES[2]]
+    # the down nodes are tried again after the retry interval.
+    redis._down = {node: 0 for node in redis._down}
+    assert {key: redis.get_node(key) for key in keys} == before
+    assert redis.live_nodes == NODES
+
+
+def test_set_nx(redis_server):
+    address = redis_server()
+
+    async def main():
+        redis = MocaRedis(*address, 0, '')
+        assert await redis.set_nx('lock', 1, 30)
+        assert not await redis.set_nx('lock', 2, 30)
+        assert await redis.get('lock') == 1
+        assert 0 < await redis.execute('TTL', 'mr--lock') <= 30
+        await redis.delete('lock')
+        assert await redis.set_nx('lock', 3)
+        assert await redis.execute('TTL', 'mr--lock') == -1
+
+    run(main())
+
+
+def test_pipeline_marks_the_broken_node_down(redis_server):
+    first, second = redis_server(), redis_server()
+
+    async def main():
+        redis = MocaRedis(*first, 0, '', nodes=[second])
+        keys = [f'key-{index}' for index in range(20)]
+        broken = redis.get_node(keys[0])
+        redis._pools[broken] = BrokenPool()
+        await redis.set_multi([(key, key) for key in keys])
+        assert broken in redis._down
+        assert await redis.get_multi(keys) == {key: key for key in keys}
+
+    run(main())
+
+
+def test_subscribe_follows_the_first_live_node(redis_server, monkeypatch):
+    monkeypatch.setattr(MocaRedis, 'SUBSCRIBER_CHECK_INTERVAL', 0.05)
+    first, second = redis_server(), redis_server()
+
+    async def main():
+        redis = MocaRedis(*first, 0, '', nodes=[second])
+        received = []
+        await redis.subscribe('channel', received.append)
+        assert redis._subscriber_node == first
+        await redis.publish('channel', 1)
+        # the first node is down, publish and subscribe move to the second node.
+        redis.mark_down(first)
+        await sleep(0.2)
+        assert redis._subscriber_node == second
+        assert await redis.publish('channel', 2) == 1
+        await sleep(0.1)
+        assert received == [1, 2]
+        # the first node is back.
+        redis._down[first] = 0
+        await sleep(0.2)
+        assert redis._subscriber_node == first
+        await redis.publish('channel', 3)
+        await sleep(0.1)
+        await redis.close_subscriber()
+        return received
+
+    assert run(main()) == [1, 2, 3]
@@ -0,0 +1,42 @@
+from json import dumps
+from urllib.parse import quote, urlencode
+from sanic.request import Request
+from sanic.compat import Header
+from src.moca_modules.moca_sanic.utils import get_args
+from src.moca_modules.moca_sanic.MocaRequestArgs import MocaRequestArgs
+
+NAMES = [f'user_{index:05d}' for index in range(30)]
+
+
+def create_request(url: str, method: str = 'GET', body: bytes = b'', content_type: str = '') -> Request:
+    headers = Header({'content-type': content_type} if content_type else {})
+    request = Request(url.encode(), headers, '1.1', method, None, None)
+    request.body = body
+    return request
+
+
+def test_list_from_the_query_string():
+    request = create_request('/get-icons?screen_names=' + quote(dumps(NAMES)))
+    # the raw value is the json string, longer than the number of names.
+    assert len(MocaRequestArgs.of(request).get_raw('screen_names|names')) > 200
+    assert get_args(request, ('screen_names|names', list, None))[0] == NAMES
+    assert get_args(create_request('/get-icons?names=%5B%5D'), ('screen_names|names', list, None))[0] == []
+    assert get_args(create_request('/get-icons?names=broken'), ('screen_names|names', list, None))[0] is None
+
+
+def test_list_from_the_form_and_the_json_body():
+    form = create_request(
+        '/get-icons', 'POST', urlencode({'names': dumps(NAMES)}).encode(), 'application/x-www-form-urlencoded'
+    )
+    assert get_args(form, ('screen_names|names', list, None))[0] == NAMES
+    body = create_request('/get-icons', 'POST', dumps({'screen_names': NAMES}).encode(), 'application/json')
+    assert get_args(body, ('screen_names|names', list, None))[0] == NAMES
+
+
+def test_validate_and_cache():
+    request = create_request('/get-icons?variant=normal&pack=tar')
+    variant, pack = get_args(
+        request, ('variant|size', str, 'bigger', {'max_length': 16}), ('pack', str, 'json', {'is_in': ['json', 'zip']})
+    )
+    assert (variant, pack) == ('normal', 'json')
+    assert MocaRequestArgs.of(request) is MocaRequestArgs.of(request)
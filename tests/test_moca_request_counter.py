@@ -0,0 +1,81 @@
+from asyncio import run
+from importlib import import_module
+from src.moca_modules.moca_redis.MocaRedis import MocaRedis
+from src.moca_modules.moca_redis.MocaRequestCounter import MocaRequestCounter, SLIDING_COUNTER_SCRIPT
+
+# (seconds from the start, hits per key) the window is 10 seconds and 5 buckets of 2 seconds.
+STEPS = [
+    (0, {'a': 3, 'b': 1}),
+    (1, {'a': 3}),
+    (2, {'a': 2, 'b': 4}),  # the next bucket.
+    (5, {'b': 1}),
+    (9, {'a': 1}),
+    (10, {'a': 1, 'b': 1}),  # the first bucket slid out of the window.
+    (13, {'b': 2}),
+    (30, {'a': 1}),  # all buckets slid out of the window.
+]
+EXPECTED = [
+    [('a', 3)],
+    [('a', 6)],
+    [('a', 8), ('b', 5)],
+    [('b', 6)],
+    [('a', 9)],
+    [('a', 4), ('b', 6)],
+    [('b', 4)],
+    [],
+]
+
+
+async def run_steps(counter, now):
+    start = now[0]
+    results = []
+    for seconds, hits in STEPS:
+        now[0] = start + seconds
+        for key, count in hits.items():
+            for _ in range(count):
+                counter.hit(key)
+        results.append(sorted(await counter.flush(2)))
+    return results
+
+
+def patch_time(monkeypatch):
+    now = [1000000.0]
+    monkeypatch.setattr(import_module('src.moca_modules.moca_redis.MocaRequestCounter'), 'time', lambda: now[0])
+    return now
+
+
+def test_local_buckets(monkeypatch):
+    now = patch_time(monkeypatch)
+    counter = MocaRequestCounter(None, 'test', 10, 5)
+    assert counter.window == 10
+    assert run(counter.flush(0)) == []
+    assert run(run_steps(counter, now)) == EXPECTED
+    # the old buckets are removed.
+    assert len(counter._local) == 1
+
+
+def test_redis_buckets(monkeypatch, redis_server):
+    now = patch_time(monkeypatch)
+    nodes = [redis_server(SLIDING_COUNTER_SCRIPT) for _ in range(3)]
+
+    async def main():
+        redis = MocaRedis(*nodes[0], 0, '', nodes=nodes[1:])
+        counter = MocaRequestCounter(redis, 'test', 10, 5)
+        # the buckets are on the same node, even if the script is routed by the other bucket.
+        assert len({redis.get_node(f'mr--{{test}}-{index}') for index in range(100)}) == 1
+        return await run_steps(counter, now)
+
+    assert run(main()) == EXPECTED
+
+
+def test_long_window(monkeypatch):
+    now = patch_time(monkeypatch)
+    # the unknown api-key counter, the hits in the different minutes are added up.
+    counter = MocaRequestCounter(None, 'test', 3600, 60)
+    for minute in range(5):
+        now[0] += 60
+        counter.hit('192.0.2.1')
+        assert run(counter.flush(3)) == ([('192.0.2.1', minute + 1)] if minute >= 3 else [])
+    now[0] += 3600
+    counter.hit('192.0.2.1')
+    assert run(counter.flush(0)) == [('192.0.2.1', 1)]
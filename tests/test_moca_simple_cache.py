@@ -0,0 +1,55 @@
+from asyncio import run
+from src.moca_modules.moca_cache.MocaSimpleCache import MocaSimpleCache
+
+
+def test_snapshot_round_trip(tmp_path):
+    filename = tmp_path.joinpath('cache.snapshot')
+    cache = MocaSimpleCache()
+    cache.set('a', (1, 2))
+    cache.set('b', {'x': 1})
+    assert cache.save_snapshot(filename)
+    cache.set('c', 'new')
+    cache.remove_cache('a')
+    assert cache.save_snapshot(filename)
+    loaded = MocaSimpleCache()
+    assert loaded.load_snapshot(filename)
+    assert loaded.get('a') is None
+    assert loaded.get('b') == {'x': 1}
+    assert loaded.get('c') == 'new'
+
+
+def test_full_rewrite_keeps_entries_of_other_processes(tmp_path):
+    filename = tmp_path.joinpath('cache.snapshot')
+    worker1, worker2 = MocaSimpleCache(), MocaSimpleCache()
+    worker1.set('one', 1)
+    assert worker1.save_snapshot(filename)
+    worker2.set('two', 2)
+    assert worker2.save_snapshot(filename)  # the first snapshot of worker2 rewrites the file.
+    loaded = MocaSimpleCache()
+    loaded.load_snapshot(filename)
+    assert loaded.get('one') == 1 and loaded.get('two') == 2
+
+
+def test_evicted_keys_are_not_deleted_from_snapshot(tmp_path):
+    filename = tmp_path.joinpath('cache.snapshot')
+    worker1, worker2 = MocaSimpleCache(), MocaSimpleCache(pool_size=2, page_size=1)
+    worker1.set('shared', 'value')
+    worker1.save_snapshot(filename)
+    worker2.load_snapshot(filename)
+    worker2.set('a', 1)
+    worker2.set('b', 2)  # 'shared' is evicted from worker2 only.
+    assert worker2.get('shared') is None
+    worker2.save_snapshot(filename)
+    loaded = MocaSimpleCache()
+    loaded.load_snapshot(filename)
+    assert loaded.get('shared') == 'value'
+
+
+def test_aio_save_snapshot(tmp_path):
+    filename = tmp_path.joinpath('cache.snapshot')
+    cache = MocaSimpleCache()
+    cache.set('a', 1)
+    assert run(cache.aio_save_snapshot(filename))
+    loaded = MocaSimpleCache()
+    loaded.load_snapshot(filename)
+    assert loaded.get('a') == 1
@@ -0,0 +1,117 @@
+import pytest
+from asyncio import run, Event
+from aioredis import ReplyError
+from src.moca_modules.moca_redis.MocaRedis import MocaRedis
+from src.moca_modules.moca_redis.MocaStreamQueue import MocaStreamQueue, ENQUEUE_SCRIPT
+
+
+@pytest.fixture
+def address(redis_server):
+    return redis_server(ENQUEUE_SCRIPT)
+
+
+def test_enqueue_and_ack(address):
+    async def main():
+        queue = MocaStreamQueue(MocaRedis(*address, 0, ''), 'test')
+        await queue.create_group()
+        assert await queue.enqueue('job-1', {'id': 1}) is not None
+        assert await queue.enqueue('job-1', {'id': 1}) is None
+        jobs = await queue.read('consumer-a', 10, 0)
+        assert [(job_id, data) for _, job_id, data in jobs] == [('job-1', {'id': 1})]
+        assert await queue.pending_count() == 1
+        # the pending job is still deduplicated.
+        assert await queue.enqueue('job-1', {'id': 1}) is None
+        await queue.ack(jobs[0][0], 'job-1')
+        assert await queue.pending_count() == 0
+        assert await queue.length() == 0
+        assert await queue.enqueue('job-1', {'id': 1}) is not None
+
+    run(main())
+
+
+def test_claim_and_bury(address):
+    async def main():
+        queue = MocaStreamQueue(MocaRedis(*address, 0, ''), 'test', max_deliveries=2, claim_idle=0)
+        await queue.create_group()
+        await queue.enqueue('job-1', 'data')
+        # consumer-a died before acknowledging.
+        (message_id, _, _), = await queue.read('consumer-a', 1, 0)
+        claimed = await queue.claim('consumer-b')
+        assert [(item[0], item[1]) for item in claimed] == [(message_id, 'job-1')]
+        # delivered twice, the next claim moves it to the dead-letter stream.
+        assert await queue.claim('consumer-c') == []
+        assert await queue.pending_count() == 0
+        dead = await queue.get_dead_letters()
+        assert [(job_id, data, reason) for _, job_id, data, reason in dead] == [
+            ('job-1', 'data', 'too many deliveries.')
+        ]
+        assert await queue.requeue_dead_letters() == 1
+        assert await queue.get_dead_letters() == []
+        assert await queue.length() == 1
+
+    run(main())
+
+
+def test_consume(address):
+    async def main():
+        queue = MocaStreamQueue(MocaRedis(*address, 0, ''), 'test', max_deliveries=1)
+        # consume creates the group, and reads the jobs enqueued before it.
+        await queue.enqueue('ok', 1)
+        await queue.enqueue('ng', 2)
+        stop, handled = Event(), []
+
+        def handler(job_id, data):
+            handled.append(job_id)
+            if len(handled) == 2:
+                stop.set()
+            if job_id == 'ng':
+                raise ValueError(data)
+
+        await queue.consume('consumer-a', handler, 10, 0, stop)
+        assert handled == ['ok', 'ng']
+        assert await queue.pending_count() == 0
+        (_, job_id, _, reason), = await queue.get_dead_letters()
+        assert job_id == 'ng' and 'ValueError' in reason
+        # both jobs can be enqueued again.
+        assert await queue.enqueue('ok', 1) is not None
+        assert await queue.enqueue('ng', 2) is not None
+
+    run(main())
+
+
+def test_trimmed_jobs_can_be_enqueued_again(address):
+    async def main():
+        queue = MocaStreamQueue(MocaRedis(*address, 0, ''), 'test', max_length=2, claim_idle=0)
+        await queue.create_group()
+        await queue.enqueue('job-1', 1)
+        (message_id, _, _), = await queue.read('consumer-a', 1, 0)
+        await queue.enqueue('job-2', 2)
+        await queue.enqueue('job-3', 3)
+        assert await queue.length() == 2
+        # job-1 was trimmed while it was pending.
+        assert await queue.enqueue('job-1', 1) is not None
+        assert await queue.enqueue('job-4', 4) is not None
+        # job-2 was trimmed before it was delivered.
+        assert await queue.enqueue('job-2', 2) is not None
+        # the trimmed message is removed from the pending list.
+        claimed = await queue.claim('consumer-b')
+        assert message_id not in [item[0] for item in claimed]
+        assert await queue.pending_count() == 0
+
+    run(main())
+
+
+def test_failed_enqueue_deletes_the_dedupe_key(address):
+    async def main():
+        redis = MocaRedis(*address, 0, '')
+        queue = MocaStreamQueue(redis, 'test')
+        await redis.execute('SET', queue._key(queue.stream), 'not a stream')
+        with pytest.raises(ReplyError):
+            await queue.enqueue('job-1', 1)
+        # the fake server closes the connection after an error reply.
+        redis = MocaRedis(*address, 0, '')
+        queue = MocaStreamQueue(redis, 'test')
+        await redis.execute('DEL', queue._key(queue.stream))
+        assert await queue.enqueue('job-1', 1) is not None
+
+    run(main())